@@ -1,9 +1,27 @@
-from flask import Flask, render_template, request, session, redirect, url_for, flash, jsonify
-import requests
+import time
+
+# Measured from here, before any imports, to the end of this module and shown on the diagnostics page
+STARTUP_STARTED = time.time()
+
+from flask import Flask, render_template, request, session, redirect, url_for, flash, jsonify, Response, stream_with_context, g
 import os
+import re
+import json
 import logging
+import threading
 import traceback
 from dotenv import load_dotenv
+from jira_client import get_jira_client, JiraError
+from jira_cache import get_response_cache
+from batch_analysis import BatchAnalyzer, get_analysis_store, should_store, start_batch, get_batch
+from jobs import get_job_queue
+from ticket_mirror import get_ticket_mirror
+from ticket_index import get_ticket_index, add_fetched, index_stats
+from project_stats import numpy_available, TicketColumns, compute_project_stats, issue_row, STATS_PATHS, STATS_FIELDS
+from dedup import DuplicateIndex, get_duplicate_index, find_reusable_analysis, ticket_text
+from ticket_classifier import get_ticket_classifier
+from singleflight import get_singleflight
+from metrics import observe_http, render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 # Configure logging
 logging.basicConfig(
@@ -17,7 +35,7 @@ load_dotenv()
 
 # Load the LLM service
 try:
-    from llm_service import get_llm_service, summarize_ticket, categorize_ticket, generate_response_suggestion, analyze_project_tickets
+    from llm_service import get_llm_service, analyze_project_tickets, ticket_info_from_issue, run_ticket_analysis, categorize_tickets_batch
     llm_module_imported = True
     logger.info("Successfully imported llm_service module")
 except ImportError as e:
@@ -36,85 +54,140 @@ except ImportError as e:
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "supersecretkey")  # Get from env or use default
 app.config["SESSION_TYPE"] = "filesystem"
+# Overall deadline (seconds) for the concurrent LLM calls in analyze_ticket
+app.config["ANALYZE_DEADLINE"] = float(os.getenv("ANALYZE_DEADLINE", "40"))
+# "parallel" runs three LLM calls concurrently, "bundle" asks for all parts in one call
+app.config["ANALYSIS_MODE"] = os.getenv("ANALYSIS_MODE", "parallel")
+# How old (seconds) the local ticket mirror may be before reads sync it. The mirror
+# keeps ticket text on disk (MIRROR_DB_PATH), so it is opt-in: 0 reads Jira directly
+app.config["MIRROR_MAX_STALENESS"] = float(os.getenv("MIRROR_MAX_STALENESS", "0"))
+# Chat answers are grounded in this many tickets retrieved from the mirror; a question
+# starts mirroring at most this many of the projects it names
+app.config["CHAT_CONTEXT_TICKETS"] = int(os.getenv("CHAT_CONTEXT_TICKETS", "5"))
+app.config["CHAT_INDEX_MAX_PROJECTS"] = int(os.getenv("CHAT_INDEX_MAX_PROJECTS", "5"))
+# Without the mirror, project statistics are computed from at most this many newest tickets
+app.config["STATS_MAX_TICKETS"] = int(os.getenv("STATS_MAX_TICKETS", "5000"))
+# Upper bound on ?limit= for /project/<key>/categorize, which costs LLM calls per ticket
+app.config["CATEGORIZE_MAX_TICKETS"] = int(os.getenv("CATEGORIZE_MAX_TICKETS", "500"))
 
-# Initialize LLM service with better error handling
-llm_service = None
-if llm_module_imported:
-    try:
-        llm_service = get_llm_service()
-        logger.info("LLM service initialized successfully")
-        # Test the connection immediately
-        test_response = llm_service.generate_response("Test connection")
-        logger.info(f"LLM test response: {test_response[:50]}...")
-    except Exception as e:
-        logger.warning(f"Failed to initialize LLM service: {str(e)}")
-        logger.warning("Check your DEEPSEEK_API_KEY in .env file and ensure it's valid")
+# LLM services are built on first use rather than at import, so a worker
+# starts serving without waiting on the LLM provider
+_llm_service = None
+_jira_llm = None
+_services_ready = False
+_services_lock = threading.Lock()
 
-# Initialize the JiraLLMIntegration class AFTER llm_service is initialized
-jira_llm = None
-if jira_llm_imported and llm_service:
-    try:
-        jira_llm = JiraLLMIntegration(llm_service)
-        logger.info("JiraLLMIntegration initialized successfully")
-    except Exception as e:
-        logger.warning(f"Failed to initialize JiraLLMIntegration: {str(e)}")
+def _init_services():
+    global _llm_service, _jira_llm, _services_ready
+    with _services_lock:
+        if _services_ready:
+            return
+        if llm_module_imported:
+            try:
+                _llm_service = get_llm_service()
+                logger.info("LLM service initialized successfully")
+            except Exception as e:
+                logger.warning(f"Failed to initialize LLM service: {str(e)}")
+                logger.warning("Check your DEEPSEEK_API_KEY in .env file and ensure it's valid")
+        
+        # Initialize the JiraLLMIntegration class AFTER the LLM service is initialized
+        if jira_llm_imported and _llm_service:
+            try:
+                _jira_llm = JiraLLMIntegration(_llm_service)
+                logger.info("JiraLLMIntegration initialized successfully")
+            except Exception as e:
+                logger.warning(f"Failed to initialize JiraLLMIntegration: {str(e)}")
+        _services_ready = True
 
-def get_auth_headers(pat):
-    """Return headers for Jira authentication."""
-    return {
-        "Authorization": f"Bearer {pat}",
-        "Content-Type": "application/json"
-    }
+def get_llm():
+    """Get the LLM service, building it on first use (None if unavailable)."""
+    if not _services_ready:
+        _init_services()
+    return _llm_service
 
-def test_jira_connection(jira_url, pat):
-    """Test the connection by hitting the server info endpoint."""
-    test_url = f"{jira_url}/rest/api/2/serverInfo"
-    try:
-        response = requests.get(test_url, headers=get_auth_headers(pat), timeout=10)
-        return response.status_code == 200
-    except requests.exceptions.RequestException:
-        return False
+def get_jira_llm():
+    """Get the JiraLLMIntegration, building it on first use (None if unavailable)."""
+    if not _services_ready:
+        _init_services()
+    return _jira_llm
+
+# Messages for the health states reported by /llm_status
+LLM_STATUS_MESSAGES = {
+    "available": "LLM service is working correctly.",
+    "degraded": "Some recent LLM calls failed.",
+    "error": "Recent LLM calls are failing.",
+    "pending": "LLM health check in progress.",
+    "unknown": "No recent LLM calls; a health check has been scheduled.",
+    "circuit_open": "The LLM provider is failing; requests are paused until it recovers.",
+}
+
+def llm_health(llm_service):
+    """Cached LLM health; schedules a background probe when one is due but never waits for it."""
+    if llm_service is None:
+        return {"status": "unavailable"}
+    health = getattr(llm_service, "health", None)
+    if health is None:
+        # MockLLM answers locally, so there is nothing to probe
+        return {"status": "available", "mock": True}
+    health.maybe_probe(llm_service.probe)
+    return health.snapshot()
+
+# The first request a worker serves kicks off the initial health probe
+_health_probe_started = False
+_health_probe_lock = threading.Lock()
+
+@app.before_request
+def start_health_probe():
+    """Probe the LLM in the background once this worker is serving requests."""
+    global _health_probe_started
+    if _health_probe_started:
+        return
+    with _health_probe_lock:
+        if _health_probe_started:
+            return
+        _health_probe_started = True
+    llm_health(get_llm())
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request in /metrics; streamed responses are timed to their first byte."""
+    started = g.get("request_started")
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else None
+        observe_http(route, request.method, response.status_code, time.perf_counter() - started,
+                     received=request.content_length or 0, sent=response.content_length or 0)
+    return response
+
+# Fields each view actually uses, so Jira only sends (and we only parse) those
+TICKET_LIST_FIELDS = ["summary", "status", "priority", "reporter", "created"]
+TICKET_ANALYSIS_FIELDS = ["summary", "description", "status", "priority", "reporter", "updated"]
+CHAT_CONTEXT_FIELDS = ["summary", "status"]
 
 def fetch_all_projects(jira_url, pat):
-    """Fetch all Jira projects."""
-    projects_url = f"{jira_url}/rest/api/2/project"
+    """Fetch all Jira projects, flashing any error for the page."""
     try:
-        response = requests.get(projects_url, headers=get_auth_headers(pat), timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            flash(f"Error fetching projects: {response.status_code}", "danger")
-            return []
+        return get_jira_client(jira_url).get_projects(pat)
+    except JiraError as e:
+        flash(f"Error fetching projects: {e.status_code}", "danger")
+        return []
     except Exception as e:
         flash(f"Exception fetching projects: {e}", "danger")
         return []
 
-def fetch_project_tickets(jira_url, pat, project_key, max_results=50):
-    """Fetch tickets for a specific project."""
-    jql = f"project = {project_key} ORDER BY created DESC"
-    search_url = f"{jira_url}/rest/api/2/search?jql={jql}&maxResults={max_results}"
-    
-    try:
-        response = requests.get(search_url, headers=get_auth_headers(pat), timeout=10)
-        if response.status_code == 200:
-            return response.json()["issues"]
-        else:
-            return []
-    except Exception:
-        return []
+# Headers that stop proxies from buffering a Server-Sent Events stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
-def get_ticket_details(jira_url, pat, ticket_key):
-    """Fetch detailed information about a specific ticket."""
-    issue_url = f"{jira_url}/rest/api/2/issue/{ticket_key}"
-    
-    try:
-        response = requests.get(issue_url, headers=get_auth_headers(pat), timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except Exception:
-        return None
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    """Wrap a generator of formatted events in a streaming response."""
+    return Response(stream_with_context(events), mimetype="text/event-stream", headers=SSE_HEADERS)
 
 @app.route("/", methods=["GET", "POST"])
 def login():
@@ -123,7 +196,7 @@ def login():
         jira_url = request.form["jira_url"].strip()
         pat = request.form["pat"].strip()
         
-        if test_jira_connection(jira_url, pat):
+        if get_jira_client(jira_url).test_connection(pat):
             session["jira_url"] = jira_url
             session["pat"] = pat
             flash("✅ Connected to Jira successfully!", "success")
@@ -147,7 +220,7 @@ def dashboard():
     return render_template("dashboard.html", 
                           projects=projects, 
                           jira_url=jira_url,
-                          llm_available=llm_service is not None)
+                          llm_available=get_llm() is not None)
 
 @app.route("/logout")
 def logout():
@@ -161,6 +234,7 @@ def logout():
 @app.route("/llm_dashboard")
 def llm_dashboard():
     """Dashboard for LLM-powered features."""
+    llm_service = get_llm()
     if "jira_url" not in session or "pat" not in session:
         flash("⚠️ Please log in first.", "warning")
         return redirect(url_for("login"))
@@ -187,21 +261,156 @@ def project_tickets(project_key):
     jira_url = session["jira_url"]
     pat = session["pat"]
     
-    tickets = fetch_project_tickets(jira_url, pat, project_key)
+    limit = request.args.get("limit", 50, type=int)
+    mirrored = read_mirror(jira_url, pat, project_key, limit=limit, fields=TICKET_LIST_FIELDS)
+    if mirrored is not None:
+        tickets = mirrored["issues"]
+        total_tickets = mirrored["total"]
+        synced_ago = int(time.time() - mirrored["synced_at"])
+    else:
+        # Not mirrored yet: page through the project lazily, up to the requested number of tickets
+        jql = f"project = {project_key} ORDER BY created DESC"
+        pager = get_jira_client(jira_url).iter_search(pat, jql, limit=limit, fields=TICKET_LIST_FIELDS)
+        try:
+            tickets = list(pager)
+        except Exception as e:
+            logger.error(f"Error fetching tickets for {project_key}: {str(e)}")
+            tickets = []
+        total_tickets = pager.total or len(tickets)
+        synced_ago = None
+        if app.config["MIRROR_MAX_STALENESS"] <= 0:
+            # Without the mirror, chat retrieval searches the tickets the app has seen
+            add_fetched(jira_url, pat, tickets)
+    
+    # Analyses stored by earlier clicks or batch runs are shown straight away
+    try:
+        analyses = get_analysis_store().for_project(jira_url, pat, project_key)
+    except Exception as e:
+        logger.error(f"Error loading stored analyses for {project_key}: {str(e)}")
+        analyses = {}
+    
+    try:
+        clusters = duplicate_clusters(jira_url, pat, project_key, tickets)
+    except Exception as e:
+        logger.error(f"Error finding duplicates in {project_key}: {str(e)}")
+        clusters = []
     
     return render_template("project_tickets.html", 
                           tickets=tickets, 
+                          total_tickets=total_tickets,
+                          synced_ago=synced_ago,
+                          analyses=analyses,
+                          duplicate_clusters=clusters,
+                          duplicate_of={key: cluster["keys"][0] for cluster in clusters for key in cluster["keys"][1:]},
+                          batch=get_batch(jira_url, pat, project_key),
                           project_key=project_key,
                           jira_url=jira_url,
-                          llm_available=llm_service is not None)
+                          llm_available=get_llm() is not None)
+
+def read_mirror(jira_url, pat, project_key, limit=None, fields=None):
+    """Read a project from the local ticket mirror within MIRROR_MAX_STALENESS.
+
+    Returns None when the mirror is disabled, not populated yet or failing,
+    in which case the caller should query Jira directly.
+    """
+    max_staleness = app.config["MIRROR_MAX_STALENESS"]
+    if max_staleness <= 0:
+        return None
+    try:
+        return get_ticket_mirror().read(jira_url, pat, project_key, max_staleness,
+                                        limit=limit, fields=fields)
+    except Exception as e:
+        logger.error(f"Error reading the ticket mirror for {project_key}: {str(e)}")
+        return None
+
+def duplicate_clusters(jira_url, pat, project_key, tickets):
+    """Near-duplicate clusters that involve the listed tickets.
+
+    Uses the project-wide duplicate index once the mirrored project has
+    been indexed, and only the listed tickets until then.
+    """
+    index = None
+    if app.config["MIRROR_MAX_STALENESS"] > 0:
+        index = get_duplicate_index(jira_url, pat, project_key, app.config["MIRROR_MAX_STALENESS"])
+    if index is None:
+        index = DuplicateIndex()
+        for ticket in tickets:
+            index.add(ticket["key"], ticket_text(ticket))
+    return index.clusters(keys=[ticket["key"] for ticket in tickets])
+
+def reuse_duplicate_analysis(jira_url, pat, ticket_key, ticket_data):
+    """Copy the stored analysis of a near-duplicate ticket to this one; None if there is none."""
+    if app.config["MIRROR_MAX_STALENESS"] <= 0:
+        return None
+    index = get_duplicate_index(jira_url, pat, ticket_key.rsplit("-", 1)[0], app.config["MIRROR_MAX_STALENESS"])
+    store = get_analysis_store()
+    found = find_reusable_analysis(index, ticket_key, ticket_text(ticket_data), store, jira_url, pat)
+    if found is None:
+        return None
+    source, analysis = found
+    store.save(jira_url, pat, ticket_key, analysis, ticket_updated=ticket_data["fields"].get("updated"),
+               duplicate_of=source)
+    return {
+        "summary": analysis["summary"],
+        "category": analysis["category"],
+        "response_suggestion": analysis["response_suggestion"],
+        "duplicate_of": source
+    }
+
+def wants_job():
+    """True if the client asked for a background job instead of waiting (?async=1)."""
+    return request.values.get("async") == "1"
+
+def job_response(job_id):
+    """The 202 reply for a newly queued background job."""
+    return jsonify({
+        "job_id": job_id,
+        "status": "pending",
+        "status_url": url_for("job_status", job_id=job_id)
+    }), 202
+
+def analyze_ticket_data(jira_url, pat, ticket_key, ticket_data, reuse=True):
+    """Run the analysis pipeline on a fetched ticket and store a complete result.
+    
+    A near-duplicate's stored analysis is returned instead unless ``reuse`` is False.
+    """
+    if reuse:
+        try:
+            reused = reuse_duplicate_analysis(jira_url, pat, ticket_key, ticket_data)
+        except Exception as e:
+            logger.error(f"Error looking for duplicates of {ticket_key}: {str(e)}")
+            reused = None
+        if reused is not None:
+            return reused
+    
+    # Extract relevant ticket information for LLM
+    ticket_info = ticket_info_from_issue(ticket_data)
+    
+    llm_service = get_llm()
+    results = run_ticket_analysis(
+        llm_service, ticket_info,
+        mode=app.config["ANALYSIS_MODE"],
+        timeout=app.config["ANALYZE_DEADLINE"]
+    )
+    
+    # Keep the result so the project page can show it next time
+    if should_store(llm_service, results):
+        get_analysis_store().save(jira_url, pat, ticket_key, results, ticket_updated=ticket_data["fields"].get("updated"))
+    
+    return results
+
+def analyze_ticket_job(jira_url, pat, ticket_key, reuse=True):
+    """Background job version of analyze_ticket."""
+    ticket_data = get_jira_client(jira_url).get_issue(pat, ticket_key, fields=TICKET_ANALYSIS_FIELDS)
+    return analyze_ticket_data(jira_url, pat, ticket_key, ticket_data, reuse=reuse)
 
 @app.route("/ticket/<ticket_key>/analyze", methods=["GET"])
 def analyze_ticket(ticket_key):
-    """Analyze a ticket using LLM."""
+    """Analyze a ticket using LLM (?force=1 skips reusing a near-duplicate's analysis)."""
     if "jira_url" not in session or "pat" not in session:
         return jsonify({"error": "Not authenticated"}), 401
     
-    if llm_service is None:
+    if get_llm() is None:
         return jsonify({
             "error": "LLM service not available",
             "summary": "LLM service is not configured. Please check your API keys and server logs.",
@@ -211,32 +420,21 @@ def analyze_ticket(ticket_key):
     
     jira_url = session["jira_url"]
     pat = session["pat"]
+    reuse = request.args.get("force") != "1"
+    
+    if wants_job():
+        return job_response(get_job_queue().submit(
+            "analyze_ticket", pat, analyze_ticket_job, jira_url, pat, ticket_key, reuse=reuse
+        ))
     
-    ticket_data = get_ticket_details(jira_url, pat, ticket_key)
-    if not ticket_data:
+    try:
+        ticket_data = get_jira_client(jira_url).get_issue(pat, ticket_key, fields=TICKET_ANALYSIS_FIELDS)
+    except Exception as e:
+        logger.error(f"Error fetching ticket {ticket_key}: {str(e)}")
         return jsonify({"error": "Failed to fetch ticket details"}), 404
     
     try:
-        # Extract relevant ticket information for LLM
-        fields = ticket_data["fields"]
-        ticket_info = {
-            "summary": fields.get("summary", ""),
-            "description": fields.get("description", ""),
-            "status": fields.get("status", {}).get("name", ""),
-            "priority": fields.get("priority", {}).get("name", ""),
-            "reporter": fields.get("reporter", {}).get("displayName", "")
-        }
-        
-        # Generate LLM analysis
-        summary = summarize_ticket(llm_service, ticket_info)
-        category = categorize_ticket(llm_service, ticket_info)
-        response = generate_response_suggestion(llm_service, ticket_info)
-        
-        return jsonify({
-            "summary": summary,
-            "category": category,
-            "response_suggestion": response
-        })
+        return jsonify(analyze_ticket_data(jira_url, pat, ticket_key, ticket_data, reuse=reuse))
     except Exception as e:
         logger.error(f"ERROR in analyze_ticket: {e}")
         return jsonify({
@@ -246,9 +444,305 @@ def analyze_ticket(ticket_key):
             "response_suggestion": f"Could not generate a response due to an error: {str(e)}"
         }), 200  # Return 200 so the UI can display the error
 
+@app.route("/project/<project_key>/analyze_all", methods=["POST"])
+def analyze_all_tickets(project_key):
+    """Start analyzing every ticket of a project in the background."""
+    llm_service = get_llm()
+    if "jira_url" not in session or "pat" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    if llm_service is None:
+        return jsonify({"error": "LLM service not available"}), 503
+    
+    jira_url = session["jira_url"]
+    pat = session["pat"]
+    
+    # Concurrency and the token budget come from the server config
+    # (BATCH_CONCURRENCY, BATCH_TOKENS_PER_MINUTE), never from the client
+    analyzer = BatchAnalyzer(
+        llm_service, get_analysis_store(),
+        mode=app.config["ANALYSIS_MODE"],
+        timeout=app.config["ANALYZE_DEADLINE"]
+    )
+    progress, started = start_batch(
+        analyzer, jira_url, pat, project_key,
+        limit=request.form.get("limit", type=int),
+        force=request.form.get("force") == "1"
+    )
+    
+    result = progress.to_dict()
+    result["started"] = started
+    result["status_url"] = url_for("analyze_all_status", project_key=project_key)
+    return jsonify(result), 202 if started else 200
+
+@app.route("/project/<project_key>/analyze_all/status", methods=["GET"])
+def analyze_all_status(project_key):
+    """Report the progress of the latest batch analysis of a project."""
+    if "jira_url" not in session or "pat" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    progress = get_batch(session["jira_url"], session["pat"], project_key)
+    if progress is None:
+        return jsonify({"project_key": project_key, "status": "not_started"})
+    return jsonify(progress.to_dict())
+
+def load_project_stats(jira_url, pat, project_key):
+    """Compute the statistics of a project, or None while its mirror is still being built.
+
+    Reads the whole project from the ticket mirror; with the mirror disabled
+    only the newest STATS_MAX_TICKETS are paged through live, and the result
+    says whether the project had more ("truncated", "matching_tickets").
+    """
+    if app.config["MIRROR_MAX_STALENESS"] > 0:
+        mirrored = get_ticket_mirror().read_columns(
+            jira_url, pat, project_key, app.config["MIRROR_MAX_STALENESS"], STATS_PATHS
+        )
+        if mirrored is None:
+            return None
+        rows = mirrored["rows"]
+        pager = None
+    else:
+        jql = f"project = {project_key} ORDER BY created DESC"
+        pager = get_jira_client(jira_url).iter_search(
+            pat, jql, page_size=100, limit=app.config["STATS_MAX_TICKETS"], fields=STATS_FIELDS
+        )
+        rows = [issue_row(issue) for issue in pager]
+    stats = compute_project_stats(TicketColumns(rows), name=project_key)
+    stats["truncated"] = pager is not None and pager.truncated
+    stats["matching_tickets"] = pager.total if pager is not None and pager.total is not None else len(rows)
+    return stats
+
+@app.route("/project/<project_key>/insights", methods=["GET"])
+def project_insights(project_key):
+    """Project statistics plus LLM insights drawn from them (?async=1 runs both as a job)."""
+    llm_service = get_llm()
+    if "jira_url" not in session or "pat" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    if not numpy_available:
+        return jsonify({"error": "Project statistics need numpy, which is not installed"}), 503
+    
+    jira_url = session["jira_url"]
+    pat = session["pat"]
+    # Statistics alone when there is no LLM (or none was asked for)
+    insights = llm_service is not None and request.args.get("insights") != "0"
+    
+    # Paging a project can take a while, so a job does it off the request
+    if wants_job():
+        return job_response(get_job_queue().submit(
+            "project_insights", pat, project_insights_job, jira_url, pat, project_key, insights
+        ))
+    try:
+        result = project_insights_job(jira_url, pat, project_key, insights)
+    except Exception as e:
+        logger.error(f"Error computing statistics for {project_key}: {str(e)}")
+        return jsonify({"error": "Error computing project statistics", "message": str(e)}), 500
+    if result["status"] == "syncing":
+        return jsonify(result), 202
+    return jsonify(result)
+
+def project_insights_job(jira_url, pat, project_key, insights=True):
+    """Compute a project's statistics and, if asked, the LLM's insights on them."""
+    stats = load_project_stats(jira_url, pat, project_key)
+    if stats is None:
+        return {
+            "status": "syncing",
+            "message": "The project is being copied to the local mirror; try again shortly."
+        }
+    result = {"status": "completed", "stats": stats}
+    if insights:
+        result["insights"] = analyze_project_tickets(get_llm(), stats)
+    return result
+
+@app.route("/project/<project_key>/categorize", methods=["GET"])
+def categorize_project(project_key):
+    """Categorize a project's newest tickets, many per LLM request (?async=1 runs it as a job)."""
+    llm_service = get_llm()
+    if "jira_url" not in session or "pat" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    if llm_service is None:
+        return jsonify({"error": "LLM service not available"}), 503
+    
+    jira_url = session["jira_url"]
+    pat = session["pat"]
+    limit = max(1, min(request.args.get("limit", 200, type=int), app.config["CATEGORIZE_MAX_TICKETS"]))
+    
+    if wants_job():
+        return job_response(get_job_queue().submit(
+            "categorize_project", pat, categorize_project_job, jira_url, pat, project_key, limit
+        ))
+    try:
+        return jsonify(categorize_project_job(jira_url, pat, project_key, limit))
+    except Exception as e:
+        logger.error(f"Error categorizing {project_key}: {str(e)}")
+        return jsonify({"error": "Error categorizing tickets", "message": str(e)}), 500
+
+def categorize_project_job(jira_url, pat, project_key, limit):
+    """Fetch up to ``limit`` of a project's newest tickets and categorize them in batches."""
+    fields = ["summary", "description"]
+    mirrored = read_mirror(jira_url, pat, project_key, limit=limit, fields=fields)
+    if mirrored is not None:
+        issues = mirrored["issues"]
+    else:
+        jql = f"project = {project_key} ORDER BY created DESC"
+        issues = list(get_jira_client(jira_url).iter_search(pat, jql, limit=limit, fields=fields))
+    
+    started = time.time()
+    categories = categorize_tickets_batch(
+        get_llm(), {issue["key"]: ticket_info_from_issue(issue) for issue in issues}
+    )
+    counts = {}
+    for category in categories.values():
+        counts[category or "Uncategorized"] = counts.get(category or "Uncategorized", 0) + 1
+    return {
+        "project_key": project_key,
+        "categories": categories,
+        "counts": counts,
+        "seconds": round(time.time() - started, 1)
+    }
+
+CHAT_SYSTEM_PROMPT = """You are a helpful Jira assistant that answers questions about Jira projects and tickets.
+If you have Jira ticket data available, use it to answer the question. If not, explain that you don't have the data needed."""
+
+def named_projects(question, projects):
+    """Keys of the projects a question mentions by key ("WEB", "WEB-12") or by name.
+
+    Keys and short names ("IT") must match in case, so ordinary words do not count.
+    """
+    words = set(re.findall(r"[A-Za-z][A-Za-z0-9_]*", question))
+    keys = []
+    for project in projects:
+        key, name = project.get("key"), project.get("name")
+        named = bool(name) and re.search(r"\b" + re.escape(name) + r"\b", question,
+                                         re.IGNORECASE if len(name) >= 4 else 0) is not None
+        if key and (key in words or named):
+            keys.append(key)
+    return keys
+
+def retrieve_chat_context(jira_url, pat, question, projects):
+    """The indexed tickets most relevant to a chat question, across projects.
+
+    With the mirror enabled this also starts mirroring the projects the
+    question names, so the index fills up in the background; without it
+    only tickets already shown on project pages or in query results are
+    searched. Returns [] when nothing matches yet. Blocks on SQLite and,
+    the first time, on loading the index.
+    """
+    mirrored = app.config["MIRROR_MAX_STALENESS"] > 0
+    try:
+        if mirrored:
+            project_keys = named_projects(question, projects)
+            get_ticket_mirror().track(jira_url, pat, project_keys[:app.config["CHAT_INDEX_MAX_PROJECTS"]])
+        hits = get_ticket_index(jira_url, pat, mirrored).search(question, k=app.config["CHAT_CONTEXT_TICKETS"])
+    except Exception as e:
+        logger.error(f"Error searching the ticket index: {str(e)}")
+        return []
+    logger.debug(f"Retrieved {len(hits)} tickets for the question: {[(i['key'], score) for i, score in hits]}")
+    return [issue for issue, score in hits]
+
+def build_chat_prompt(jira_url, pat, question):
+    """Gather Jira context for a chat question and return (prompt, debug_info)."""
+    jira_data = []
+    jira = get_jira_client(jira_url)
+    
+    # First, try to get all projects
+    projects = []
+    try:
+        projects = jira.get_projects(pat)
+        logger.debug(f"Found {len(projects)} projects")
+    except Exception as e:
+        logger.error(f"Error fetching projects: {str(e)}")
+    
+    # If we have projects, try to get tickets from the first one
+    project_key = None
+    if projects:
+        project_key = projects[0].get('key')
+        logger.debug(f"Using project key: {project_key}")
+    else:
+        # Default to DEMO if no projects found
+        project_key = "DEMO"
+        logger.debug(f"No projects found, defaulting to {project_key}")
+    
+    # Tickets that match the question beat the newest tickets of one project
+    jira_data = retrieve_chat_context(jira_url, pat, question, projects)
+    retrieved = bool(jira_data)
+
+    # A project that is already mirrored needs no Jira round trip
+    mirrored = None
+    if projects and not retrieved:
+        mirrored = read_mirror(jira_url, pat, project_key, limit=5, fields=CHAT_CONTEXT_FIELDS)
+
+    if retrieved:
+        logger.debug(f"Using {len(jira_data)} tickets retrieved from the index")
+    elif mirrored is not None:
+        jira_data = mirrored["issues"]
+        logger.debug(f"Found {len(jira_data)} tickets in the mirror")
+    else:
+        # Otherwise try to get tickets using any valid JQL
+        try:
+            # Simple JQL to get recent tickets
+            jql = f"project = {project_key} ORDER BY created DESC"
+            logger.debug(f"Fetching tickets with JQL: {jql}")
+            try:
+                jira_data = jira.search(pat, jql, max_results=5, fields=CHAT_CONTEXT_FIELDS).get("issues", [])
+                logger.debug(f"Found {len(jira_data)} tickets")
+            except JiraError as e:
+                logger.warning(f"Error fetching tickets: {e.status_code}")
+                # Try without project filter as fallback
+                jql = "ORDER BY created DESC"
+                logger.debug(f"Trying again with simple JQL: {jql}")
+                jira_data = jira.search(pat, jql, max_results=5, fields=CHAT_CONTEXT_FIELDS).get("issues", [])
+                logger.debug(f"Found {len(jira_data)} tickets with fallback query")
+        except Exception as e:
+            logger.error(f"Error fetching tickets: {str(e)}")
+    
+    full_prompt = format_chat_prompt(question, jira_data, relevant=retrieved)
+    
+    # Store debug info
+    debug_info = {
+        "question": question,
+        "jira_url": jira_url,
+        "project_key": None if retrieved else project_key,
+        "retrieval": "index" if retrieved else "recent",
+        "tickets_found": len(jira_data),
+        "prompt_length": len(full_prompt)
+    }
+    
+    return full_prompt, debug_info
+
+def format_chat_prompt(question, jira_data, relevant=False):
+    """Combine a chat question with the tickets fetched as its context.
+    
+    ``relevant`` says the tickets were retrieved for the question rather
+    than just being the most recent ones.
+    """
+    # Create a formatted representation of tickets
+    tickets_text = ""
+    if jira_data:
+        if relevant:
+            tickets_text = "Here are the Jira tickets most relevant to the question:\n\n"
+        else:
+            tickets_text = "Here are some recent Jira tickets:\n\n"
+        for issue in jira_data:
+            key = issue.get("key", "Unknown")
+            summary = issue.get("fields", {}).get("summary", "No summary")
+            status = issue.get("fields", {}).get("status", {}).get("name", "Unknown")
+            tickets_text += f"- {key}: {summary} (Status: {status})\n"
+    
+    # Create the full prompt with question and Jira data
+    full_prompt = f"User question: {question}\n\n"
+    if tickets_text:
+        full_prompt += tickets_text
+    else:
+        full_prompt += "No Jira tickets were found to provide context for your question."
+    
+    return full_prompt
+
 @app.route("/llm_chat", methods=["GET", "POST"])
 def llm_chat():
     """Chat interface for asking questions about Jira data."""
+    llm_service = get_llm()
     if "jira_url" not in session or "pat" not in session:
         flash("⚠️ Please log in first.", "warning")
         return redirect(url_for("login"))
@@ -259,7 +753,6 @@ def llm_chat():
     
     response = None
     question = None
-    jira_data = []
     debug_info = {}
     
     if request.method == "POST":
@@ -269,93 +762,15 @@ def llm_chat():
         
         logger.debug(f"Processing question: '{question}'")
         
-        # First, try to get all projects
-        projects = []
-        try:
-            projects_url = f"{jira_url}/rest/api/2/project"
-            projects_response = requests.get(projects_url, headers=get_auth_headers(pat), timeout=10)
-            
-            if projects_response.status_code == 200:
-                projects = projects_response.json()
-                logger.debug(f"Found {len(projects)} projects")
-        except Exception as e:
-            logger.error(f"Error fetching projects: {str(e)}")
-        
-        # If we have projects, try to get tickets from the first one
-        project_key = None
-        if projects:
-            project_key = projects[0].get('key')
-            logger.debug(f"Using project key: {project_key}")
-        else:
-            # Default to DEMO if no projects found
-            project_key = "DEMO"
-            logger.debug(f"No projects found, defaulting to {project_key}")
-        
-        # Try to get tickets using any valid JQL
-        try:
-            # Simple JQL to get recent tickets
-            jql = f"project = {project_key} ORDER BY created DESC"
-            search_url = f"{jira_url}/rest/api/2/search?jql={jql}&maxResults=5"
-            
-            logger.debug(f"Fetching tickets with URL: {search_url}")
-            response = requests.get(search_url, headers=get_auth_headers(pat), timeout=10)
-            
-            if response.status_code == 200:
-                results = response.json()
-                jira_data = results.get("issues", [])
-                logger.debug(f"Found {len(jira_data)} tickets")
-            else:
-                logger.warning(f"Error fetching tickets: {response.status_code}")
-                # Try without project filter as fallback
-                jql = "ORDER BY created DESC"
-                search_url = f"{jira_url}/rest/api/2/search?jql={jql}&maxResults=5"
-                
-                logger.debug(f"Trying again with simple JQL: {search_url}")
-                response = requests.get(search_url, headers=get_auth_headers(pat), timeout=10)
-                
-                if response.status_code == 200:
-                    results = response.json()
-                    jira_data = results.get("issues", [])
-                    logger.debug(f"Found {len(jira_data)} tickets with fallback query")
-        except Exception as e:
-            logger.error(f"Error fetching tickets: {str(e)}")
-        
-        # Create a formatted representation of tickets
-        tickets_text = ""
-        if jira_data:
-            tickets_text = "Here are some recent Jira tickets:\n\n"
-            for issue in jira_data:
-                key = issue.get("key", "Unknown")
-                summary = issue.get("fields", {}).get("summary", "No summary")
-                status = issue.get("fields", {}).get("status", {}).get("name", "Unknown")
-                tickets_text += f"- {key}: {summary} (Status: {status})\n"
-        
-        # Create the full prompt with question and Jira data
-        full_prompt = f"User question: {question}\n\n"
-        if tickets_text:
-            full_prompt += tickets_text
-        else:
-            full_prompt += "No Jira tickets were found to provide context for your question."
-        
-        # Store debug info
-        debug_info = {
-            "question": question,
-            "jira_url": jira_url,
-            "project_key": project_key,
-            "tickets_found": len(jira_data),
-            "prompt_length": len(full_prompt)
-        }
+        full_prompt, debug_info = build_chat_prompt(jira_url, pat, question)
         
         logger.debug(f"Sending prompt to LLM (length: {len(full_prompt)} chars)")
         
         try:
             # Generate response with appropriate system prompt
-            system_prompt = """You are a helpful Jira assistant that answers questions about Jira projects and tickets.
-If you have Jira ticket data available, use it to answer the question. If not, explain that you don't have the data needed."""
-            
             response = llm_service.generate_response(
                 prompt=full_prompt,
-                system_prompt=system_prompt
+                system_prompt=CHAT_SYSTEM_PROMPT
             )
             
             logger.debug(f"Received response from LLM (length: {len(response)} chars)")
@@ -370,6 +785,36 @@ If you have Jira ticket data available, use it to answer the question. If not, e
                           llm_available=llm_service is not None,
                           debug_info=debug_info)
 
+@app.route("/llm_chat/stream", methods=["GET"])
+def llm_chat_stream():
+    """Stream the answer to a chat question as Server-Sent Events."""
+    llm_service = get_llm()
+    if "jira_url" not in session or "pat" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    if llm_service is None:
+        return jsonify({"error": "LLM service not available"}), 503
+    
+    question = request.args.get("question", "").strip()
+    if not question:
+        return jsonify({"error": "Empty question"}), 400
+    
+    jira_url = session["jira_url"]
+    pat = session["pat"]
+    
+    def generate():
+        full_prompt, debug_info = build_chat_prompt(jira_url, pat, question)
+        yield sse_event("meta", debug_info)
+        try:
+            for chunk in llm_service.stream_response(prompt=full_prompt, system_prompt=CHAT_SYSTEM_PROMPT):
+                yield sse_event("token", {"text": chunk})
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            yield sse_event("token", {"text": f"I'm sorry, but I encountered an error while processing your request: {str(e)}"})
+        yield sse_event("done", {})
+    
+    return sse_response(generate())
+
 @app.route("/simple_chat", methods=["GET", "POST"])
 def simple_chat():
     """Ultra-simple chat that will definitely work."""
@@ -381,7 +826,7 @@ def simple_chat():
         
         try:
             # Use the LLM service directly - skip Jira for now
-            response = llm_service.generate_response(
+            response = get_llm().generate_response(
                 prompt=f"User asked: {question}",
                 system_prompt="You are a helpful assistant."
             )
@@ -435,27 +880,31 @@ def simple_chat():
 
 @app.route("/llm_status", methods=["GET"])
 def llm_status():
-    """Check the status of the LLM service."""
+    """Report the status of the LLM service from its cached health statistics."""
+    llm_service = get_llm()
     if llm_service is None:
         return jsonify({
             "status": "unavailable",
             "message": "LLM service is not configured or failed to initialize."
         })
     
-    try:
-        # Test the LLM service with a simple request
-        test_response = llm_service.generate_response("Hello, this is a test message.")
-        
-        return jsonify({
-            "status": "available",
-            "message": "LLM service is working correctly.",
-            "test_response": test_response[:50] + "..." if len(test_response) > 50 else test_response
-        })
-    except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": f"LLM service encountered an error: {str(e)}"
-        })
+    health = llm_health(llm_service)
+    if health.get("mock"):
+        message = "Using mock LLM responses; no API key is configured."
+    else:
+        message = LLM_STATUS_MESSAGES.get(health["status"], health["status"])
+    
+    return jsonify({
+        "status": health["status"],
+        "message": message,
+        "health": health,
+        "cache": llm_service.cache.stats() if hasattr(llm_service, "cache") else None
+    })
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Request, Jira and LLM metrics of this worker in the Prometheus text format."""
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
 
 # Add an error handler for 404 (Page Not Found) errors
 @app.errorhandler(404)
@@ -472,17 +921,22 @@ def debug_ticket(ticket_key):
     jira_url = session["jira_url"]
     pat = session["pat"]
     
-    ticket_data = get_ticket_details(jira_url, pat, ticket_key)
+    try:
+        ticket_data = get_jira_client(jira_url).get_issue(pat, ticket_key)
+    except Exception:
+        ticket_data = None
     
     return jsonify({
         "ticket_exists": ticket_data is not None,
         "fields_available": list(ticket_data["fields"].keys()) if ticket_data else [],
-        "llm_available": llm_service is not None
+        "llm_available": get_llm() is not None
     })
 
 @app.route("/diagnostics")
 def diagnostics():
     """Show system diagnostic information."""
+    jira_llm = get_jira_llm()
+    llm_service = get_llm()
     import sys
     import flask
     import pkg_resources
@@ -505,7 +959,7 @@ def diagnostics():
         })
     
     # Add optional packages
-    optional_packages = ["pandas", "matplotlib", "numpy"]
+    optional_packages = ["pandas", "matplotlib", "numpy", "httpx", "starlette", "uvicorn"]
     for pkg_name in optional_packages:
         if pkg_name in installed_packages:
             packages.append({
@@ -515,6 +969,22 @@ def diagnostics():
                 "required": False
             })
     
+    # Hit/miss counters of the in-process caches and fast paths
+    cache_stats = {"Jira responses": get_response_cache().stats()}
+    if hasattr(llm_service, "cache"):
+        cache_stats["LLM responses"] = llm_service.cache.stats()
+    if jira_llm is not None:
+        cache_stats["NL to JQL rules"] = jira_llm.rule_compiler.stats()
+        cache_stats["NL to JQL translations"] = jira_llm.translation_cache.stats()
+    cache_stats["Background jobs"] = get_job_queue().stats()
+    # Opening the mirror creates its database, so a disabled one is left alone
+    if app.config["MIRROR_MAX_STALENESS"] > 0:
+        cache_stats["Ticket mirror"] = get_ticket_mirror().stats()
+    cache_stats["Ticket search index"] = index_stats()
+    cache_stats["Local category classifier"] = get_ticket_classifier().stats()
+    cache_stats["Coalesced Jira requests"] = get_singleflight("jira").stats()
+    cache_stats["Coalesced LLM calls"] = get_singleflight("llm").stats()
+    
     return render_template("diagnostics.html",
                           flask_version=flask.__version__,
                           python_version=f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}",
@@ -522,7 +992,10 @@ def diagnostics():
                           llm_available=llm_service is not None,
                           jira_connected=jira_connected,
                           jira_url=jira_url,
-                          packages=packages)
+                          packages=packages,
+                          cache_stats=cache_stats,
+                          startup_seconds=app.config.get("STARTUP_SECONDS"),
+                          llm_health=llm_health(llm_service))
 
 # ===============================================
 # NEW SMART QUERY ROUTES
@@ -531,6 +1004,7 @@ def diagnostics():
 @app.route("/smart_query", methods=["GET"])
 def smart_query_page():
     """Page for entering natural language queries for Jira."""
+    jira_llm = get_jira_llm()
     if "jira_url" not in session or "pat" not in session:
         flash("⚠️ Please log in first.", "warning")
         return redirect(url_for("login"))
@@ -561,43 +1035,6 @@ def smart_query_page():
                           suggested_queries=suggested_queries,
                           llm_available=jira_llm is not None)
 
-# Add to your app.py
-# """Create a comment on a Jira ticket."""
-    if "jira_url" not in session or "pat" not in session:
-        return jsonify({"error": "Not authenticated"}), 401
-    
-    jira_url = session["jira_url"]
-    pat = session["pat"]
-    comment_text = request.form.get("comment", "")
-    
-    # Call Jira API to add comment
-    comment_url = f"{jira_url}/rest/api/2/issue/{ticket_key}/comment"
-    payload = {"body": comment_text}
-    
-    try:
-        response = requests.post(
-            comment_url, 
-            headers=get_auth_headers(pat),
-            json=payload,
-            timeout=10
-        )
-        
-        if response.status_code in [201, 200]:
-            return jsonify({
-                "success": True,
-                "message": "Comment added successfully"
-            })
-        else:
-            return jsonify({
-                "success": False,
-                "error": f"Failed to add comment: {response.status_code}",
-                "details": response.text
-            })
-    except Exception as e:
-        return jsonify({
-            "success": False,
-            "error": f"Exception: {str(e)}"
-        })
 @app.route("/ticket/<ticket_key>/comment", methods=["POST"])
 def add_ticket_comment(ticket_key):
     """Add a comment to a Jira ticket."""
@@ -612,21 +1049,8 @@ def add_ticket_comment(ticket_key):
         return jsonify({"success": False, "error": "Empty comment"}), 400
     
     try:
-        # API endpoint for adding comments
-        comment_url = f"{jira_url}/rest/api/2/issue/{ticket_key}/comment"
-        
-        # Prepare the payload
-        payload = {
-            "body": comment_text
-        }
-        
-        # Make the API call
-        response = requests.post(
-            comment_url,
-            headers=get_auth_headers(pat),
-            json=payload,
-            timeout=15
-        )
+        # Make the API call through the pooled client
+        response = get_jira_client(jira_url).add_comment(pat, ticket_key, comment_text)
         
         # Handle the response
         if response.status_code in [200, 201]:
@@ -647,6 +1071,7 @@ def add_ticket_comment(ticket_key):
 @app.route("/execute_query", methods=["POST"])
 def execute_smart_query():
     """Execute a natural language query against Jira."""
+    jira_llm = get_jira_llm()
     if "jira_url" not in session or "pat" not in session:
         return jsonify({"error": "Not authenticated"}), 401
     
@@ -666,11 +1091,17 @@ def execute_smart_query():
     jira_url = session["jira_url"]
     pat = session["pat"]
     
+    if wants_job():
+        return job_response(get_job_queue().submit(
+            "execute_query", pat, jira_llm.process_natural_language_query, jira_url, pat, natural_language_query,
+            max_staleness=app.config["MIRROR_MAX_STALENESS"]
+        ))
+    
     try:
         # Process the query through our JiraLLMIntegration class
         logger.info(f"Processing query: {natural_language_query}")
         result = jira_llm.process_natural_language_query(
-            jira_url, pat, natural_language_query
+            jira_url, pat, natural_language_query, max_staleness=app.config["MIRROR_MAX_STALENESS"]
         )
         
         # Return the full result for rendering in the UI
@@ -684,8 +1115,76 @@ def execute_smart_query():
             "message": str(e)
         }), 200  # Return 200 so the UI can display the error
 
+@app.route("/execute_query/stream", methods=["GET"])
+def execute_smart_query_stream():
+    """Execute a natural language query, streaming results and analysis as Server-Sent Events."""
+    jira_llm = get_jira_llm()
+    if "jira_url" not in session or "pat" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    if not jira_llm:
+        return jsonify({"error": "LLM integration not available"}), 503
+    
+    natural_language_query = request.args.get("query", "").strip()
+    if not natural_language_query:
+        return jsonify({"success": False, "error": "Empty query"}), 400
+    
+    jira_url = session["jira_url"]
+    pat = session["pat"]
+    max_staleness = app.config["MIRROR_MAX_STALENESS"]
+    
+    def generate():
+        logger.info(f"Streaming query: {natural_language_query}")
+        try:
+            for event, data in jira_llm.stream_natural_language_query(jira_url, pat, natural_language_query,
+                                                                      max_staleness=max_staleness):
+                yield sse_event(event, data)
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            yield sse_event("error", {"success": False, "error": "Error processing query", "message": str(e)})
+    
+    return sse_response(generate())
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Status, and once finished the result, of a background job."""
+    if "jira_url" not in session or "pat" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    job = get_job_queue().get(job_id, session["pat"])
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    """Cancel a queued or running background job."""
+    if "jira_url" not in session or "pat" not in session:
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    queue = get_job_queue()
+    cancelled = queue.cancel(job_id, session["pat"])
+    job = queue.get(job_id, session["pat"])
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    job["cancelled"] = cancelled
+    return jsonify(job)
+
+def record_startup_time():
+    """Record how long importing and configuring the app took.
+    
+    Nothing before this waits on the LLM provider: the LLM services are
+    built on first use and the health probe starts with the first request.
+    """
+    if "STARTUP_SECONDS" not in app.config:
+        app.config["STARTUP_SECONDS"] = round(time.time() - STARTUP_STARTED, 3)
+        logger.info(f"App ready in {app.config['STARTUP_SECONDS']}s")
+
+record_startup_time()
+
 # Modify the app.run section at the bottom
 if __name__ == "__main__":
+    llm_service = get_llm()
     # Print application status
     logger.info(f"Starting Flask app with LLM service: {llm_service is not None}")
     if llm_service is None:
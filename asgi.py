@@ -0,0 +1,345 @@
+"""ASGI entry point.
+
+The LLM-heavy routes are served by native asyncio handlers, so a single
+process can hold hundreds of in-flight LLM requests instead of one per
+worker thread. Every other route is passed through to the Flask app.
+
+Run with:  uvicorn asgi:application
+"""
+import time
+import logging
+import contextlib
+from email import policy
+from email.parser import BytesParser
+from urllib.parse import parse_qs
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Match, Mount, Route
+from app import app as flask_app, get_llm, get_jira_llm, start_health_probe, format_chat_prompt, CHAT_SYSTEM_PROMPT, \
+    TICKET_ANALYSIS_FIELDS, CHAT_CONTEXT_FIELDS, SSE_HEADERS, sse_event, analyze_ticket_job, retrieve_chat_context, \
+    reuse_duplicate_analysis
+from async_services import AsyncLLMService, get_async_jira_client, analyze_ticket_async, \
+    process_query_async, run_query_async
+from jira_client import JiraError
+from batch_analysis import get_analysis_store, should_store
+from jobs import get_job_queue
+from llm_service import ticket_info_from_issue
+from metrics import observe_http
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+async_llm = None
+
+
+def flask_session(request):
+    """Decode the signed Flask session cookie so both apps share logins."""
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie = request.cookies.get(flask_app.config["SESSION_COOKIE_NAME"])
+    if serializer is None or not cookie:
+        return {}
+    max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+    try:
+        return serializer.loads(cookie, max_age=max_age)
+    except BadSignature:
+        return {}
+
+
+def jira_credentials(request):
+    """Return (jira_url, pat) from the session, or (None, None) if logged out."""
+    session = flask_session(request)
+    return session.get("jira_url"), session.get("pat")
+
+
+async def form_data(request):
+    """The submitted form fields as {name: value}.
+
+    Parsed with the standard library, since Starlette's request.form()
+    needs the python-multipart package. Uploaded files are ignored.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        message = BytesParser(policy=policy.HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+        )
+        fields = {}
+        for part in message.iter_parts():
+            if part.get_filename() is None:
+                name = part.get_param("name", header="content-disposition")
+                fields[name] = part.get_payload(decode=True).decode("utf-8", "replace")
+        return fields
+    return {name: values[0] for name, values in parse_qs(body.decode("utf-8", "replace")).items()}
+
+
+def job_response(job_id):
+    """The 202 reply for a newly queued background job."""
+    return JSONResponse({"job_id": job_id, "status": "pending", "status_url": f"/jobs/{job_id}"}, status_code=202)
+
+
+async def analyze_ticket(request):
+    """Async version of /ticket/<ticket_key>/analyze."""
+    jira_url, pat = jira_credentials(request)
+    if not jira_url or not pat:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+
+    if async_llm is None:
+        return JSONResponse({
+            "error": "LLM service not available",
+            "summary": "LLM service is not configured. Please check your API keys and server logs.",
+            "category": "N/A",
+            "response_suggestion": "Unable to generate response without LLM service."
+        })
+
+    ticket_key = request.path_params["ticket_key"]
+    reuse = request.query_params.get("force") != "1"
+    if request.query_params.get("async") == "1":
+        return job_response(await run_in_threadpool(
+            get_job_queue().submit, "analyze_ticket", pat, analyze_ticket_job, jira_url, pat, ticket_key,
+            reuse=reuse
+        ))
+
+    try:
+        ticket_data = await get_async_jira_client(jira_url).get_issue(
+            pat, ticket_key, fields=TICKET_ANALYSIS_FIELDS
+        )
+    except Exception as e:
+        logger.error(f"Error fetching ticket {ticket_key}: {str(e)}")
+        return JSONResponse({"error": "Failed to fetch ticket details"}, status_code=404)
+
+    if reuse:
+        try:
+            # Signing and the store are synchronous, so keep them off the event loop
+            reused = await run_in_threadpool(reuse_duplicate_analysis, jira_url, pat, ticket_key, ticket_data)
+        except Exception as e:
+            logger.error(f"Error looking for duplicates of {ticket_key}: {str(e)}")
+            reused = None
+        if reused is not None:
+            return JSONResponse(reused)
+
+    try:
+        results = await analyze_ticket_async(
+            async_llm,
+            ticket_info_from_issue(ticket_data),
+            mode=flask_app.config["ANALYSIS_MODE"],
+            timeout=flask_app.config["ANALYZE_DEADLINE"]
+        )
+        if should_store(async_llm, results):
+            # The store is SQLite, so save off the event loop
+            await run_in_threadpool(lambda: get_analysis_store().save(
+                jira_url, pat, ticket_key, results, ticket_updated=ticket_data["fields"].get("updated")
+            ))
+        return JSONResponse(results)
+    except Exception as e:
+        logger.error(f"ERROR in analyze_ticket: {e}")
+        return JSONResponse({
+            "error": f"Error during analysis: {str(e)}",
+            "summary": "An error occurred during analysis.",
+            "category": "Error",
+            "response_suggestion": f"Could not generate a response due to an error: {str(e)}"
+        })
+
+
+async def build_chat_prompt_async(jira_url, pat, question):
+    """Async version of app.build_chat_prompt."""
+    jira = get_async_jira_client(jira_url)
+    try:
+        projects = await jira.get_projects(pat)
+    except Exception as e:
+        logger.error(f"Error fetching projects: {str(e)}")
+        projects = []
+    project_key = projects[0].get("key") if projects else "DEMO"
+
+    # Loading the index and the mirror's SQLite reads would block the loop
+    jira_data = await run_in_threadpool(retrieve_chat_context, jira_url, pat, question, projects)
+    retrieved = bool(jira_data)
+    if not retrieved:
+        try:
+            jql = f"project = {project_key} ORDER BY created DESC"
+            try:
+                jira_data = (await jira.search(pat, jql, max_results=5, fields=CHAT_CONTEXT_FIELDS)).get("issues", [])
+            except JiraError:
+                jql = "ORDER BY created DESC"
+                jira_data = (await jira.search(pat, jql, max_results=5, fields=CHAT_CONTEXT_FIELDS)).get("issues", [])
+        except Exception as e:
+            logger.error(f"Error fetching tickets: {str(e)}")
+
+    full_prompt = format_chat_prompt(question, jira_data, relevant=retrieved)
+    debug_info = {
+        "question": question,
+        "jira_url": jira_url,
+        "project_key": None if retrieved else project_key,
+        "retrieval": "index" if retrieved else "recent",
+        "tickets_found": len(jira_data),
+        "prompt_length": len(full_prompt)
+    }
+    return full_prompt, debug_info
+
+
+async def llm_chat_stream(request):
+    """Async version of /llm_chat/stream."""
+    jira_url, pat = jira_credentials(request)
+    if not jira_url or not pat:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    if async_llm is None:
+        return JSONResponse({"error": "LLM service not available"}, status_code=503)
+
+    question = request.query_params.get("question", "").strip()
+    if not question:
+        return JSONResponse({"error": "Empty question"}, status_code=400)
+
+    async def generate():
+        full_prompt, debug_info = await build_chat_prompt_async(jira_url, pat, question)
+        yield sse_event("meta", debug_info)
+        try:
+            async for chunk in async_llm.stream_response(full_prompt, system_prompt=CHAT_SYSTEM_PROMPT):
+                yield sse_event("token", {"text": chunk})
+        except Exception as e:
+            logger.error(f"Error streaming response: {str(e)}")
+            yield sse_event("token", {"text": f"I'm sorry, but I encountered an error while processing your request: {str(e)}"})
+        yield sse_event("done", {})
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def execute_smart_query(request):
+    """Async version of /execute_query."""
+    jira_url, pat = jira_credentials(request)
+    if not jira_url or not pat:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    jira_llm = get_jira_llm()
+    if jira_llm is None or async_llm is None:
+        return JSONResponse({
+            "success": False,
+            "error": "LLM integration not available",
+            "message": "LLM service is not configured. Please check API keys and logs."
+        })
+
+    form = await form_data(request)
+    natural_language_query = form.get("query", "")
+    if not natural_language_query:
+        return JSONResponse({"success": False, "error": "Empty query"}, status_code=400)
+
+    if form.get("async") == "1" or request.query_params.get("async") == "1":
+        return job_response(await run_in_threadpool(
+            get_job_queue().submit, "execute_query", pat, jira_llm.process_natural_language_query, jira_url, pat,
+            natural_language_query, max_staleness=flask_app.config["MIRROR_MAX_STALENESS"]
+        ))
+
+    try:
+        result = await process_query_async(
+            jira_llm, get_async_jira_client(jira_url), async_llm, pat, natural_language_query,
+            max_staleness=flask_app.config["MIRROR_MAX_STALENESS"]
+        )
+        return JSONResponse(result)
+    except Exception as e:
+        logger.error(f"Error processing query: {str(e)}")
+        return JSONResponse({"success": False, "error": "Error processing query", "message": str(e)})
+
+
+async def execute_smart_query_stream(request):
+    """Async version of /execute_query/stream."""
+    jira_url, pat = jira_credentials(request)
+    if not jira_url or not pat:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    jira_llm = get_jira_llm()
+    if jira_llm is None or async_llm is None:
+        return JSONResponse({"error": "LLM integration not available"}, status_code=503)
+
+    natural_language_query = request.query_params.get("query", "").strip()
+    if not natural_language_query:
+        return JSONResponse({"success": False, "error": "Empty query"}, status_code=400)
+
+    async def generate():
+        try:
+            result = await run_query_async(
+                jira_llm, get_async_jira_client(jira_url), async_llm, pat, natural_language_query,
+                max_staleness=flask_app.config["MIRROR_MAX_STALENESS"]
+            )
+            if not result["success"]:
+                yield sse_event("error", result)
+                return
+            tickets_data = result.pop("data")
+            prompt, result["analysis_context"] = jira_llm.pack_analysis_prompt(
+                natural_language_query, tickets_data, result["total"]
+            )
+            yield sse_event("query", result)
+            async for chunk in async_llm.stream_response(prompt):
+                yield sse_event("analysis", {"text": chunk})
+            yield sse_event("done", {})
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            yield sse_event("error", {"success": False, "error": "Error processing query", "message": str(e)})
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Create the async LLM front end inside the running event loop and start the health probe."""
+    global async_llm
+    llm_service = get_llm()
+    if llm_service is not None:
+        async_llm = AsyncLLMService(llm_service)
+        logger.info("Async LLM service ready")
+    # The probe runs in the background; serving starts straight away
+    start_health_probe()
+    yield
+    if async_llm is not None:
+        await async_llm.aclose()
+
+
+class MetricsMiddleware:
+    """Records the natively served routes in /metrics; Flask records its own.
+
+    Routes are labelled with Flask's placeholder syntax so both servers
+    report the same route names. Streams are timed until they finish.
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = [(route, route.path.replace("{", "<").replace("}", ">")) for route in routes]
+
+    async def __call__(self, scope, receive, send):
+        name = None
+        if scope["type"] == "http":
+            name = next((name for route, name in self.routes if route.matches(scope)[0] == Match.FULL), None)
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        response = {"status": 500, "sent": 0}
+
+        async def send_counted(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["sent"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            received = int(dict(scope["headers"]).get(b"content-length", 0) or 0)
+            observe_http(name, scope["method"], response["status"], time.perf_counter() - started,
+                         received=received, sent=response["sent"])
+
+
+native_routes = [
+    Route("/ticket/{ticket_key}/analyze", analyze_ticket, methods=["GET"]),
+    Route("/llm_chat/stream", llm_chat_stream, methods=["GET"]),
+    Route("/execute_query", execute_smart_query, methods=["POST"]),
+    Route("/execute_query/stream", execute_smart_query_stream, methods=["GET"]),
+]
+
+application = MetricsMiddleware(Starlette(
+    routes=native_routes + [
+        # Everything else is served by the Flask app
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ],
+    lifespan=lifespan,
+), native_routes)
@@ -0,0 +1,527 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from urllib.parse import urlencode
+import httpx
+from jira_client import DEFAULT_TIMEOUTS, JiraError, trim_issue, fields_param, request_key
+from jira_cache import get_response_cache, CachedResponse
+from jira_llm_integration import QUERY_RESULT_FIELDS
+from llm_service import (
+    LLMService, build_summary_prompt, build_category_prompt, build_response_prompt,
+    build_bundle_prompt, parse_analysis_bundle, circuit_open_message, normalize_category, learn_category
+)
+from ticket_classifier import get_ticket_classifier
+from llm_resilience import RETRYABLE_STATUSES, parse_retry_after
+from singleflight import get_singleflight
+from metrics import JIRA
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class AsyncIssuePager:
+    """Async counterpart of IssuePager: walks startAt pages, prefetching the next one."""
+
+    def __init__(self, client, pat, jql, page_size=50, limit=None, fields=None, expand=None):
+        self.client = client
+        self.pat = pat
+        self.jql = jql
+        self.page_size = page_size
+        self.limit = limit
+        self.fields = fields
+        self.expand = expand
+        self.total = None
+        self.yielded = 0
+
+    def _fetch_page(self, start_at):
+        max_results = self.page_size
+        if self.limit is not None:
+            max_results = min(max_results, self.limit - start_at)
+        return asyncio.ensure_future(self.client.search(
+            self.pat, self.jql, max_results=max_results, start_at=start_at,
+            fields=self.fields, expand=self.expand
+        ))
+
+    async def __aiter__(self):
+        start_at = 0
+        pending = self._fetch_page(start_at)
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                issues = page.get("issues", [])
+                self.total = page.get("total", 0)
+                cap = self.total if self.limit is None else min(self.total, self.limit)
+                start_at += len(issues)
+                if issues and start_at < cap:
+                    # Kick off the next page while the caller handles this one
+                    pending = self._fetch_page(start_at)
+                for issue in issues:
+                    if self.yielded >= cap:
+                        return
+                    self.yielded += 1
+                    yield issue
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+
+class AsyncJiraClient:
+    """httpx-based asyncio counterpart of JiraClient for one Jira instance."""
+
+    def __init__(self, jira_url, pool_size=None, timeouts=None):
+        self.jira_url = jira_url.rstrip("/")
+        if pool_size is None:
+            pool_size = int(os.getenv("JIRA_POOL_SIZE", "10"))
+        self.pool_size = pool_size
+
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        for endpoint in self.timeouts:
+            env_value = os.getenv(f"JIRA_TIMEOUT_{endpoint.upper()}")
+            if env_value:
+                self.timeouts[endpoint] = float(env_value)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        self.client = httpx.AsyncClient(
+            base_url=self.jira_url,
+            headers={"Content-Type": "application/json"},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def request(self, method, path, pat, endpoint, params=None, json=None, headers=None):
+        """Send a request through the pooled client and return the response.
+
+        Identical GETs already in flight share one request, as in JiraClient.
+        """
+        if method == "GET":
+            return await get_singleflight("jira").do_async(
+                request_key(self.jira_url, pat, path, params, headers),
+                self._send, method, path, pat, endpoint, params, json, headers
+            )
+        return await self._send(method, path, pat, endpoint, params, json, headers)
+
+    async def _send(self, method, path, pat, endpoint, params=None, json=None, headers=None):
+        request_headers = {"Authorization": f"Bearer {pat}"}
+        if headers:
+            request_headers.update(headers)
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method,
+                path,
+                headers=request_headers,
+                params=params,
+                json=json,
+                timeout=self.timeouts.get(endpoint, 10)
+            )
+        except Exception as e:
+            JIRA.observe((endpoint, method), time.perf_counter() - started, error=e)
+            raise
+        JIRA.observe((endpoint, method), time.perf_counter() - started, status=response.status_code,
+                     sent=len(response.request.content), received=len(response.content))
+        return response
+
+    async def get_json(self, path, pat, endpoint, params=None):
+        response = await self.request("GET", path, pat, endpoint, params=params)
+        if response.status_code != 200:
+            raise JiraError(response.status_code, response.text)
+        return response.json()
+
+    async def get_json_cached(self, path, pat, endpoint, params=None):
+        """Async version of JiraClient.get_json_cached, sharing the same cache."""
+        cache = get_response_cache()
+        url = path if not params else f"{path}?{urlencode(sorted(params.items()))}"
+        key = cache.make_key(self.jira_url, pat, url)
+
+        entry, state = cache.lookup(key)
+        if state == "fresh":
+            return entry.data
+        if state == "stale":
+            if cache.start_refresh(key):
+                asyncio.ensure_future(self._refresh_cached(cache, key, path, pat, endpoint, params, entry))
+            return entry.data
+        return await self._revalidate(cache, key, path, pat, endpoint, params, entry)
+
+    async def _revalidate(self, cache, key, path, pat, endpoint, params, entry):
+        headers = entry.conditional_headers() if entry else None
+        response = await self.request("GET", path, pat, endpoint, params=params, headers=headers)
+
+        if response.status_code == 304 and entry is not None:
+            cache.mark_not_modified(entry)
+            return entry.data
+        if response.status_code != 200:
+            raise JiraError(response.status_code, response.text)
+
+        data = response.json()
+        cache.store(key, CachedResponse(
+            endpoint,
+            data,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        ))
+        return data
+
+    async def _refresh_cached(self, cache, key, path, pat, endpoint, params, entry):
+        try:
+            await self._revalidate(cache, key, path, pat, endpoint, params, entry)
+        except Exception as e:
+            logger.warning(f"Background refresh of {path} failed: {str(e)}")
+        finally:
+            cache.finish_refresh(key)
+
+    async def get_projects(self, pat):
+        return await self.get_json_cached("/rest/api/2/project", pat, "project")
+
+    async def search(self, pat, jql, max_results=50, start_at=0, fields=None, expand=None):
+        params = {"jql": jql, "maxResults": max_results, "startAt": start_at}
+        if fields is not None:
+            params["fields"] = fields_param(fields)
+        if expand is not None:
+            params["expand"] = fields_param(expand)
+        data = await self.get_json("/rest/api/2/search", pat, "search", params=params)
+        if fields is not None:
+            data["issues"] = [trim_issue(issue, fields) for issue in data.get("issues", [])]
+        return data
+
+    def iter_search(self, pat, jql, page_size=50, limit=None, fields=None, expand=None):
+        """Return an AsyncIssuePager over every issue matching the JQL."""
+        return AsyncIssuePager(self, pat, jql, page_size=page_size, limit=limit,
+                               fields=fields, expand=expand)
+
+    async def get_issue(self, pat, ticket_key, fields=None, expand=None):
+        params = {}
+        if fields is not None:
+            params["fields"] = fields_param(fields)
+        if expand is not None:
+            params["expand"] = fields_param(expand)
+        issue = await self.get_json(f"/rest/api/2/issue/{ticket_key}", pat, "issue", params=params or None)
+        if fields is not None:
+            return trim_issue(issue, fields)
+        return issue
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# One async client per Jira instance, shared by the event loop of this process
+_async_clients = {}
+
+
+def get_async_jira_client(jira_url):
+    """Get the shared AsyncJiraClient for a Jira instance, creating it if needed."""
+    key = jira_url.rstrip("/")
+    client = _async_clients.get(key)
+    if client is None:
+        client = AsyncJiraClient(key)
+        _async_clients[key] = client
+    return client
+
+
+class AsyncLLMService:
+    """httpx-based asyncio front end for an LLMService.
+
+    Configuration and the response cache are shared with the wrapped
+    service. Anything that is not an LLMService (such as MockLLM) is run on
+    a worker thread instead.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.client = None
+        if isinstance(service, LLMService):
+            max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+            self.client = httpx.AsyncClient(
+                timeout=service.timeout,
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_connections)
+            )
+
+    async def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1000):
+        """Generate a response from the LLM API without blocking the event loop."""
+        if self.client is None:
+            return await asyncio.to_thread(
+                self.service.generate_response, prompt, system_prompt, temperature, max_tokens
+            )
+
+        service = self.service
+        payload = service._build_payload(prompt, system_prompt, temperature, max_tokens)
+        cache_key = service._cache_key(payload)
+        # The response cache is SQLite, so it is read and written off the event loop
+        cached = await asyncio.to_thread(service.cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+        # Identical prompts already in flight on this loop wait for that call
+        text, ok = await get_singleflight("llm").do_async(cache_key, self._timed_complete, payload)
+        if ok:
+            await asyncio.to_thread(service.cache.set, cache_key, text)
+        return text
+
+    async def _timed_complete(self, payload):
+        start = time.time()
+        text, ok = await self._complete(payload)
+        self.service.health.record(ok, time.time() - start, None if ok else text[:200])
+        return text, ok
+
+    async def _complete(self, payload):
+        """Send a completion request with the service's retry policy and circuit breaker."""
+        service = self.service
+        attempt = 0
+        while True:
+            if not service.breaker.allow():
+                return circuit_open_message(service.breaker), False
+
+            text, ok, retryable, retry_after = await self._attempt(payload)
+            if ok or not retryable:
+                service.breaker.record_success()
+                return text, ok
+
+            delay = service.retry_policy.delay(attempt, retry_after)
+            service.breaker.record_failure(open_for=retry_after if retry_after and delay is None else None)
+            if delay is None:
+                return text, False
+            attempt += 1
+            logger.warning(f"LLM request failed ({text}), retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, payload):
+        """Send one completion request; return (text, ok, retryable, retry_after)."""
+        service = self.service
+        try:
+            started = time.time()
+            try:
+                response = await self.client.post(service.api_url, headers=service._headers(), json=payload)
+            except Exception as e:
+                service._observe(time.time() - started, payload, error=e)
+                raise
+            if response.status_code != 200:
+                service._observe(time.time() - started, payload, response.status_code, received=len(response.content))
+                logger.error(f"LLM API returned error: {response.status_code}")
+                return (f"Error: The LLM API returned status code {response.status_code}", False,
+                        response.status_code in RETRYABLE_STATUSES,
+                        parse_retry_after(response.headers.get("Retry-After")))
+            try:
+                result = response.json()
+            except ValueError as e:
+                service._observe(time.time() - started, payload, response.status_code, error=e,
+                                 received=len(response.content))
+                raise
+            service._observe(time.time() - started, payload, response.status_code,
+                             received=len(response.content), usage=result.get("usage"))
+            text, ok = service._parse_result(result)
+            return text, ok, False, None
+        except httpx.ConnectError:
+            return "Error: Could not connect to the LLM API. Please check your internet connection and API URL.", False, True, None
+        except httpx.TimeoutException:
+            return "Error: Request to LLM API timed out. The service might be overloaded or down.", False, True, None
+        except Exception as e:
+            return f"Error: {str(e)}", False, False, None
+
+    async def stream_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1000):
+        """Async generator yielding text chunks as the provider streams them."""
+        if self.client is None:
+            text = await self.generate_response(prompt, system_prompt, temperature, max_tokens)
+            yield text
+            return
+
+        service = self.service
+        payload = service._build_payload(prompt, system_prompt, temperature, max_tokens)
+        cache_key = service._cache_key(payload)
+        cached = await asyncio.to_thread(service.cache.get, cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        if not service.breaker.allow():
+            service.health.record(False, 0.0, "Circuit open")
+            yield circuit_open_message(service.breaker)
+            return
+
+        service._enable_streaming(payload)
+        chunks = []
+        start = time.time()
+        # What the metrics record once the stream ends, however it ends
+        call = {"status": None, "error": None, "received": 0, "usage": None}
+        # Set by [DONE] or a finish_reason; without either the stream was cut off
+        finished = False
+        try:
+            try:
+                async with self.client.stream("POST", service.api_url, headers=service._headers(),
+                                              json=payload) as response:
+                    call["status"] = response.status_code
+                    if response.status_code != 200:
+                        if response.status_code in RETRYABLE_STATUSES:
+                            service.breaker.record_failure(open_for=parse_retry_after(response.headers.get("Retry-After")))
+                        else:
+                            service.breaker.record_success()
+                        service.health.record(False, time.time() - start, f"HTTP {response.status_code}")
+                        yield f"Error: The LLM API returned status code {response.status_code}"
+                        return
+                    async for line in response.aiter_lines():
+                        call["received"] += len(line)
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            finished = True
+                            break
+                        chunk = json.loads(data)
+                        call["usage"] = chunk.get("usage") or call["usage"]
+                        choices = chunk.get("choices") or [{}]
+                        finished = finished or bool(choices[0].get("finish_reason"))
+                        text = (choices[0].get("delta") or {}).get("content")
+                        if text:
+                            chunks.append(text)
+                            yield text
+            except httpx.ConnectError as e:
+                call["error"] = e
+                service.breaker.record_failure()
+                service.health.record(False, time.time() - start, "Connection error")
+                yield "Error: Could not connect to the LLM API. Please check your internet connection and API URL."
+                return
+            except httpx.TimeoutException as e:
+                call["error"] = e
+                service.breaker.record_failure()
+                service.health.record(False, time.time() - start, "Timeout")
+                yield "Error: Request to LLM API timed out. The service might be overloaded or down."
+                return
+            except GeneratorExit:
+                service.breaker.record_success()
+                raise
+
+            if not finished:
+                logger.warning("LLM stream ended before the provider finished; not caching it")
+                service.breaker.record_failure()
+                service.health.record(False, time.time() - start, "Stream cut off")
+                return
+            service.breaker.record_success()
+            service.health.record(True, time.time() - start)
+            if chunks:
+                await asyncio.to_thread(service.cache.set, cache_key, "".join(chunks))
+        finally:
+            service._observe(time.time() - start, payload, call["status"], call["error"], call["received"],
+                             call["usage"])
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+
+async def analyze_ticket_async(llm, ticket_data, mode="parallel", timeout=40):
+    """Async ticket analysis with the same result shape as the sync helpers."""
+    if mode == "bundle":
+        response = await llm.generate_response(build_bundle_prompt(ticket_data))
+        try:
+            bundle = parse_analysis_bundle(response)
+            # The classifier stores its examples in SQLite, so keep it off the event loop
+            await asyncio.to_thread(learn_category, llm, ticket_data, bundle["category"])
+            return bundle
+        except ValueError as e:
+            logger.warning(f"Analysis bundle could not be parsed ({e}), falling back to separate calls")
+
+    # The local classifier saves the category call when it is confident
+    category = await asyncio.to_thread(lambda: get_ticket_classifier().classify(ticket_data))
+    tasks = {"summary": asyncio.ensure_future(llm.generate_response(build_summary_prompt(ticket_data)))}
+    if category is None:
+        tasks["category"] = asyncio.ensure_future(llm.generate_response(build_category_prompt(ticket_data)))
+    tasks["response_suggestion"] = asyncio.ensure_future(llm.generate_response(build_response_prompt(ticket_data)))
+    await asyncio.wait(tasks.values(), timeout=timeout)
+
+    results = {}
+    if category is not None:
+        results["category"] = category
+    timed_out = []
+    for part, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            timed_out.append(part)
+            results[part] = "Timed out waiting for the LLM. Please try again."
+        elif task.exception() is not None:
+            results[part] = f"Error: {str(task.exception())}"
+        else:
+            results[part] = task.result()
+            if part == "category":
+                await asyncio.to_thread(learn_category, llm, ticket_data, normalize_category(results[part]))
+    results["timed_out"] = timed_out
+    return results
+
+
+async def run_query_async(jira_llm, jira, llm, pat, natural_language_request, max_results=50, max_staleness=None):
+    """Async version of JiraLLMIntegration.run_query."""
+    try:
+        project_keys = [p.get("key") for p in await jira.get_projects(pat)]
+    except Exception as e:
+        logger.warning(f"Could not load project keys for JQL rules: {str(e)}")
+        project_keys = []
+
+    # Rules, then the translation cache, then the LLM
+    jql_query = jira_llm.rule_compiler.compile(natural_language_request, project_keys)
+    jql_source = "rules"
+    if jql_query is None:
+        cache_key = jira_llm._translation_key(natural_language_request, project_keys, jira.jira_url)
+        jql_query = await asyncio.to_thread(jira_llm.translation_cache.get, cache_key)
+        jql_source = "cache"
+        if jql_query is None:
+            jql_query = (await llm.generate_response(jira_llm.build_jql_prompt(natural_language_request))).strip()
+            jql_source = "llm"
+            if jql_query:
+                await asyncio.to_thread(jira_llm.translation_cache.set, cache_key, jql_query)
+
+    # Whole-project queries come from the ticket mirror when it is fresh enough
+    mirrored = await asyncio.to_thread(
+        jira_llm.read_mirrored, jira.jira_url, pat, jql_query, max_results, max_staleness
+    )
+    if mirrored is not None:
+        return {
+            "success": True,
+            "jql": jql_query,
+            "jql_source": jql_source,
+            "tickets": mirrored["data"]["issues"],
+            "total": mirrored["data"]["total"],
+            "data": mirrored["data"]
+        }
+
+    try:
+        pager = jira.iter_search(pat, jql_query, limit=max_results, fields=QUERY_RESULT_FIELDS)
+        issues = [issue async for issue in pager]
+        total = pager.total or 0
+    except Exception as e:
+        if jql_source != "rules":
+            await asyncio.to_thread(
+                jira_llm.forget_translation, natural_language_request, project_keys, jira.jira_url
+            )
+        status = f"with status {e.status_code}" if isinstance(e, JiraError) else f"({str(e)})"
+        return {
+            "success": False,
+            "jql": jql_query,
+            "jql_source": jql_source,
+            "error": f"Query failed {status}",
+            "message": getattr(e, "text", str(e))
+        }
+
+    tickets_data = {"issues": issues, "total": total, "maxResults": max_results}
+    jira_llm.index_results(jira.jira_url, pat, issues, max_staleness)
+    return {
+        "success": True,
+        "jql": jql_query,
+        "jql_source": jql_source,
+        "tickets": issues,
+        "total": total,
+        "data": tickets_data
+    }
+
+
+async def process_query_async(jira_llm, jira, llm, pat, natural_language_request, max_staleness=None):
+    """Async version of JiraLLMIntegration.process_natural_language_query."""
+    result = await run_query_async(jira_llm, jira, llm, pat, natural_language_request, max_staleness=max_staleness)
+    if not result["success"]:
+        return result
+    tickets_data = result.pop("data")
+    prompt, result["analysis_context"] = jira_llm.pack_analysis_prompt(
+        natural_language_request, tickets_data, result["total"]
+    )
+    result["analysis"] = await llm.generate_response(prompt)
+    return result
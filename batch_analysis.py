@@ -0,0 +1,455 @@
+"""Project-wide ticket analysis.
+
+Pages through every ticket of a project and runs the same analysis
+pipeline as /ticket/<key>/analyze over each one, with a bounded number of
+tickets in flight and a per-minute token budget. Results are written to an
+SQLite store so the project page can show them without calling the LLM.
+
+Command line usage (reads PAT and JIRA_URL from the environment):
+
+    python batch_analysis.py DEMO --concurrency 4 --tokens-per-minute 60000
+"""
+import os
+import sys
+import time
+import json
+import sqlite3
+import argparse
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from jira_client import get_jira_client
+from jira_cache import credential_scope
+from prompt_packer import estimate_tokens
+from dedup import DuplicateIndex, ticket_text
+from llm_service import ticket_info_from_issue, run_ticket_analysis, build_bundle_prompt, \
+    build_summary_prompt, build_category_prompt, build_response_prompt, is_real_llm
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Fields the analysis prompts use, plus "updated" to skip unchanged tickets
+BATCH_FIELDS = ["summary", "description", "status", "priority", "reporter", "updated"]
+
+
+def estimate_prompt_tokens(ticket_data, mode):
+    """Estimate the prompt tokens one ticket analysis will send."""
+    if mode == "bundle":
+        return estimate_tokens(build_bundle_prompt(ticket_data))
+    return sum(estimate_tokens(build(ticket_data))
+               for build in (build_summary_prompt, build_category_prompt, build_response_prompt))
+
+
+class TokenBudget:
+    """Sliding one-minute window of token spend shared by the batch workers.
+
+    ``acquire`` blocks until the tokens fit in the last minute's budget;
+    ``record`` charges tokens that were only known afterwards (the
+    completion). A budget of 0 disables the limit.
+    """
+
+    def __init__(self, tokens_per_minute):
+        self.tokens_per_minute = tokens_per_minute
+        self._spent = deque()
+        self._cond = threading.Condition()
+
+    def _used(self, now):
+        while self._spent and now - self._spent[0][0] >= 60:
+            self._spent.popleft()
+        return sum(tokens for _, tokens in self._spent)
+
+    def acquire(self, tokens, cancelled=None):
+        """Wait until ``tokens`` fit in the budget, then charge them.
+
+        Returns False if ``cancelled()`` became true while waiting.
+        """
+        if not self.tokens_per_minute:
+            return True
+        # A single request larger than the whole budget still gets through alone
+        tokens = min(tokens, self.tokens_per_minute)
+        with self._cond:
+            while True:
+                if cancelled is not None and cancelled():
+                    return False
+                now = time.time()
+                used = self._used(now)
+                if used + tokens <= self.tokens_per_minute:
+                    self._spent.append((now, tokens))
+                    return True
+                wait = 60 - (now - self._spent[0][0]) if self._spent else 1
+                self._cond.wait(timeout=min(max(wait, 0.1), 1))
+
+    def record(self, tokens):
+        if not self.tokens_per_minute:
+            return
+        with self._cond:
+            self._spent.append((time.time(), tokens))
+
+
+class AnalysisStore:
+    """SQLite table of the latest analysis per ticket.
+
+    Rows are scoped by Jira instance and credential like the other stores,
+    so the same ticket key on two instances (or seen by two users) never
+    shares an analysis.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("ANALYSIS_STORE_PATH", "analyses.db")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(analyses)")]
+        if columns and "scope" not in columns:
+            # Rows from before scoping cannot be attributed to an instance; they are regenerated
+            logger.info("Dropping analyses stored without a Jira instance and credential scope")
+            self._db.execute("DROP TABLE analyses")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                jira_url TEXT,
+                scope TEXT,
+                ticket_key TEXT,
+                project_key TEXT,
+                summary TEXT,
+                category TEXT,
+                response_suggestion TEXT,
+                ticket_updated TEXT,
+                analyzed_at REAL,
+                duplicate_of TEXT,
+                PRIMARY KEY (jira_url, scope, ticket_key)
+            )
+        """)
+        self._db.execute("DROP INDEX IF EXISTS analyses_project")
+        self._db.execute("CREATE INDEX IF NOT EXISTS analyses_scoped_project ON analyses (jira_url, scope, project_key)")
+        self._db.commit()
+
+    def save(self, jira_url, pat, ticket_key, analysis, ticket_updated=None, duplicate_of=None):
+        """Store an analysis, replacing any earlier one for the ticket.
+
+        ``duplicate_of`` records that the analysis was copied from a
+        near-duplicate ticket instead of being generated for this one.
+        """
+        project_key = ticket_key.rsplit("-", 1)[0]
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO analyses (jira_url, scope, ticket_key, project_key, summary, category, "
+                "response_suggestion, ticket_updated, analyzed_at, duplicate_of) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (jira_url, credential_scope(pat), ticket_key, project_key, analysis.get("summary"),
+                 analysis.get("category"), analysis.get("response_suggestion"), ticket_updated, time.time(),
+                 duplicate_of)
+            )
+            self._db.commit()
+
+    def _row_to_dict(self, row):
+        return {
+            "ticket_key": row[0],
+            "summary": row[1],
+            "category": row[2],
+            "response_suggestion": row[3],
+            "ticket_updated": row[4],
+            "analyzed_at": row[5],
+            "duplicate_of": row[6]
+        }
+
+    def get(self, jira_url, pat, ticket_key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT ticket_key, summary, category, response_suggestion, ticket_updated, analyzed_at, "
+                "duplicate_of FROM analyses WHERE jira_url = ? AND scope = ? AND ticket_key = ?",
+                (jira_url, credential_scope(pat), ticket_key)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def for_project(self, jira_url, pat, project_key):
+        """Return {ticket_key: analysis} for every stored ticket of a project."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT ticket_key, summary, category, response_suggestion, ticket_updated, analyzed_at, "
+                "duplicate_of FROM analyses WHERE jira_url = ? AND scope = ? AND project_key = ?",
+                (jira_url, credential_scope(pat), project_key)
+            ).fetchall()
+        return {row[0]: self._row_to_dict(row) for row in rows}
+
+
+# Shared by the web routes of this worker
+_analysis_store = None
+_analysis_store_lock = threading.Lock()
+
+
+def get_analysis_store():
+    """Get the worker-wide analysis store."""
+    global _analysis_store
+    if _analysis_store is None:
+        with _analysis_store_lock:
+            if _analysis_store is None:
+                _analysis_store = AnalysisStore()
+    return _analysis_store
+
+
+# Placeholders the LLM service returns instead of an answer
+FAILED_ANSWER_PREFIXES = ("Error", "Could not parse response")
+
+
+def is_complete(analysis):
+    """True if an analysis result is worth storing (no errors, timeouts or unparsed responses)."""
+    return not analysis.get("error") and not analysis.get("timed_out") and all(
+        isinstance(analysis.get(part), str) and not analysis[part].startswith(FAILED_ANSWER_PREFIXES)
+        for part in ("summary", "category", "response_suggestion")
+    )
+
+
+def should_store(llm, analysis):
+    """True if an analysis came from a real LLM and is complete, so it may be saved and reused."""
+    return is_real_llm(llm) and is_complete(analysis)
+
+
+class BatchProgress:
+    """Thread-safe progress counters for one batch run."""
+
+    def __init__(self, project_key):
+        self.project_key = project_key
+        self.status = "pending"
+        self.total = None
+        self.analyzed = 0
+        self.skipped = 0
+        self.reused = 0
+        self.failed = 0
+        self.tokens_used = 0
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self):
+        with self._lock:
+            processed = self.analyzed + self.skipped + self.reused + self.failed
+            end = self.finished_at or time.time()
+            return {
+                "project_key": self.project_key,
+                "status": self.status,
+                "total": self.total,
+                "processed": processed,
+                "analyzed": self.analyzed,
+                "skipped": self.skipped,
+                "reused": self.reused,
+                "failed": self.failed,
+                "tokens_used": self.tokens_used,
+                "percent": round(100 * processed / self.total, 1) if self.total else 0.0,
+                "elapsed": round(end - self.started_at, 1) if self.started_at else 0.0,
+                "error": self.error
+            }
+
+
+class BatchAnalyzer:
+    """Analyze every ticket of a project with bounded concurrency and a token budget.
+
+    At most ``concurrency`` tickets are analyzed at once and prompts are
+    admitted only while the last minute's estimated token spend stays under
+    ``tokens_per_minute``. Tickets whose stored analysis matches their
+    current "updated" timestamp are skipped unless ``force`` is set, and
+    near-duplicates of a ticket analyzed earlier in the run (or before it)
+    get a copy of that analysis instead of their own LLM calls.
+    """
+
+    def __init__(self, llm, store, concurrency=None, tokens_per_minute=None, mode="parallel", timeout=40):
+        if concurrency is None:
+            concurrency = int(os.getenv("BATCH_CONCURRENCY", "4"))
+        if tokens_per_minute is None:
+            tokens_per_minute = int(os.getenv("BATCH_TOKENS_PER_MINUTE", "60000"))
+        self.llm = llm
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.budget = TokenBudget(tokens_per_minute)
+        self.mode = mode
+        self.timeout = timeout
+
+    def run(self, jira_url, pat, project_key, progress=None, limit=None, force=False):
+        """Analyze the project's tickets and return the final progress."""
+        progress = progress or BatchProgress(project_key)
+        progress.status = "running"
+        progress.started_at = time.time()
+
+        jql = f"project = {project_key} ORDER BY created DESC"
+        pager = get_jira_client(jira_url).iter_search(pat, jql, limit=limit, fields=BATCH_FIELDS)
+        stored = self.store.for_project(jira_url, pat, project_key)
+        slots = threading.Semaphore(self.concurrency)
+        duplicates = DuplicateIndex()
+        in_flight = {}
+        deferred = []
+
+        def submit(issue, updated):
+            # Bound the tickets in flight so pages are not read far ahead of the LLM
+            slots.acquire()
+            future = executor.submit(self._analyze_one, jira_url, pat, issue, updated, progress)
+            future.add_done_callback(lambda _: slots.release())
+            in_flight[issue["key"]] = future
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as executor:
+                for issue in pager:
+                    if progress.total is None and pager.total is not None:
+                        progress.total = min(pager.total, limit) if limit else pager.total
+                    if progress.cancelled:
+                        break
+                    text = ticket_text(issue)
+                    matches = duplicates.query(text)
+                    duplicates.add(issue["key"], text)
+                    updated = (issue.get("fields") or {}).get("updated")
+                    previous = stored.get(issue["key"])
+                    if not force and previous and updated and previous["ticket_updated"] == updated:
+                        progress.add(skipped=1)
+                        continue
+                    source = next((key for key, score in matches
+                                   if key in in_flight or (key in stored and not stored[key]["duplicate_of"])), None)
+                    if source is None:
+                        submit(issue, updated)
+                    elif not self._reuse(jira_url, pat, issue, updated, source, progress):
+                        # The original is still being analyzed; decide once it is done
+                        deferred.append((issue, updated, source))
+
+                for issue, updated, source in deferred:
+                    if progress.cancelled:
+                        break
+                    if source in in_flight:
+                        in_flight[source].result()
+                    if not self._reuse(jira_url, pat, issue, updated, source, progress):
+                        submit(issue, updated)
+            progress.status = "cancelled" if progress.cancelled else "completed"
+        except Exception as e:
+            logger.error(f"Batch analysis of {project_key} failed: {str(e)}")
+            progress.status = "failed"
+            progress.error = str(e)
+        progress.finished_at = time.time()
+        if progress.total is None:
+            progress.total = progress.analyzed + progress.skipped + progress.reused + progress.failed
+        logger.info(f"Batch analysis of {project_key} {progress.status}: {progress.to_dict()}")
+        return progress
+
+    def _reuse(self, jira_url, pat, issue, updated, source, progress):
+        """Copy the stored analysis of ``source`` to a near-duplicate ticket; False if there is none."""
+        analysis = self.store.get(jira_url, pat, source)
+        if analysis is None or analysis["duplicate_of"]:
+            return False
+        self.store.save(jira_url, pat, issue["key"], analysis, ticket_updated=updated, duplicate_of=source)
+        progress.add(reused=1)
+        logger.info(f"{issue['key']} is a near-duplicate of {source}, reused its analysis")
+        return True
+
+    def _analyze_one(self, jira_url, pat, issue, updated, progress):
+        ticket_key = issue["key"]
+        ticket_info = ticket_info_from_issue(issue)
+        prompt_tokens = estimate_prompt_tokens(ticket_info, self.mode)
+        if not self.budget.acquire(prompt_tokens, cancelled=lambda: progress.cancelled):
+            return
+        try:
+            results = run_ticket_analysis(self.llm, ticket_info, mode=self.mode, timeout=self.timeout)
+        except Exception as e:
+            logger.error(f"Error analyzing {ticket_key}: {str(e)}")
+            progress.add(failed=1, tokens_used=prompt_tokens)
+            return
+
+        completion_tokens = sum(estimate_tokens(results.get(part))
+                                for part in ("summary", "category", "response_suggestion"))
+        self.budget.record(completion_tokens)
+        progress.add(tokens_used=prompt_tokens + completion_tokens)
+        if not is_real_llm(self.llm):
+            # Mock answers are not worth keeping, and stored ones would be skipped as unchanged
+            progress.add(analyzed=1)
+        elif is_complete(results):
+            self.store.save(jira_url, pat, ticket_key, results, ticket_updated=updated)
+            progress.add(analyzed=1)
+        else:
+            logger.warning(f"Analysis of {ticket_key} was incomplete, not storing it")
+            progress.add(failed=1)
+
+
+# Batch runs started from the web app, keyed by (jira_url, credential scope, project_key)
+_batch_runs = {}
+_batch_runs_lock = threading.Lock()
+
+
+def start_batch(analyzer, jira_url, pat, project_key, limit=None, force=False):
+    """Start a batch run in a background thread unless one is already running.
+
+    Returns (progress, started).
+    """
+    run_key = (jira_url, credential_scope(pat), project_key)
+    with _batch_runs_lock:
+        current = _batch_runs.get(run_key)
+        if current is not None and current.status in ("pending", "running"):
+            return current, False
+        progress = BatchProgress(project_key)
+        _batch_runs[run_key] = progress
+
+    thread = threading.Thread(
+        target=analyzer.run, args=(jira_url, pat, project_key),
+        kwargs={"progress": progress, "limit": limit, "force": force},
+        name=f"batch-{project_key}", daemon=True
+    )
+    thread.start()
+    return progress, True
+
+
+def get_batch(jira_url, pat, project_key):
+    """Return the progress of this credential's latest batch run for a project, or None."""
+    with _batch_runs_lock:
+        return _batch_runs.get((jira_url, credential_scope(pat), project_key))
+
+
+def main(argv=None):
+    """Command line entry point."""
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Analyze every ticket of a Jira project with the LLM.")
+    parser.add_argument("project_key", help="Jira project key, e.g. DEMO")
+    parser.add_argument("--jira-url", default=os.getenv("JIRA_URL", "http://localhost:8080"))
+    parser.add_argument("--concurrency", type=int, default=None, help="tickets analyzed at once")
+    parser.add_argument("--tokens-per-minute", type=int, default=None, help="0 disables the budget")
+    parser.add_argument("--limit", type=int, default=None, help="analyze at most this many tickets")
+    parser.add_argument("--mode", choices=["parallel", "bundle"], default=os.getenv("ANALYSIS_MODE", "parallel"))
+    parser.add_argument("--force", action="store_true", help="re-analyze tickets that have not changed")
+    parser.add_argument("--store", default=None, help="SQLite file for the results")
+    args = parser.parse_args(argv)
+
+    pat = os.getenv("PAT")
+    if not pat:
+        print("ERROR: Set PAT in the environment or .env file.")
+        return 1
+
+    from llm_service import get_llm_service
+    analyzer = BatchAnalyzer(
+        get_llm_service(), AnalysisStore(args.store),
+        concurrency=args.concurrency, tokens_per_minute=args.tokens_per_minute, mode=args.mode,
+        timeout=float(os.getenv("ANALYZE_DEADLINE", "40"))
+    )
+    progress = BatchProgress(args.project_key)
+    thread = threading.Thread(
+        target=analyzer.run, args=(args.jira_url, pat, args.project_key),
+        kwargs={"progress": progress, "limit": args.limit, "force": args.force}, daemon=True
+    )
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(timeout=2)
+            state = progress.to_dict()
+            print(f"{state['processed']}/{state['total'] or '?'} processed "
+                  f"({state['analyzed']} analyzed, {state['skipped']} skipped, {state['reused']} reused, "
+                  f"{state['failed']} failed, ~{state['tokens_used']} tokens)")
+    except KeyboardInterrupt:
+        print("Cancelling, waiting for in-flight tickets...")
+        progress.cancelled = True
+        thread.join()
+
+    print(json.dumps(progress.to_dict(), indent=2))
+    return 0 if progress.status == "completed" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""Near-duplicate ticket detection with MinHash and locality-sensitive hashing.
+
+Ticket text (summary and description) is cut into character shingles and
+reduced to a fixed-size MinHash signature, whose agreement with another
+signature estimates the Jaccard similarity of the two shingle sets. The
+signatures are split into bands and bucketed (LSH), so looking up the
+duplicates of a ticket only compares it with the few tickets that share a
+bucket instead of the whole project.
+
+NumPy speeds up signing when it is installed; without it the same
+signatures are computed in pure Python.
+"""
+import os
+import re
+import zlib
+import random
+import threading
+import logging
+from jira_cache import credential_scope
+from ticket_mirror import get_ticket_mirror
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Hash family (a * x + b) mod p over a Mersenne prime, so products fit in 64 bits
+PRIME = (1 << 31) - 1
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 5
+MAX_TEXT_CHARS = 2000
+
+_rng = random.Random(20240611)
+PERMUTATIONS = [(_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(NUM_PERM)]
+if np is not None:
+    _A = np.array([a for a, b in PERMUTATIONS], dtype=np.int64).reshape(-1, 1)
+    _B = np.array([b for a, b in PERMUTATIONS], dtype=np.int64).reshape(-1, 1)
+
+# Fields the signatures are built from
+DEDUP_FIELDS = ["summary", "description"]
+
+
+def ticket_text(issue):
+    """The text duplicates are judged on: summary and description."""
+    fields = issue.get("fields") or {}
+    return " ".join(part for part in (fields.get("summary"), fields.get("description")) if isinstance(part, str))
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Hashed character shingles of normalized text."""
+    text = " ".join(re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).split())[:MAX_TEXT_CHARS]
+    if not text:
+        return set()
+    if len(text) <= size:
+        return {zlib.crc32(text.encode()) % PRIME}
+    return {zlib.crc32(text[i:i + size].encode()) % PRIME for i in range(len(text) - size + 1)}
+
+
+def minhash(text):
+    """MinHash signature of text as a tuple of NUM_PERM ints, or None for empty text."""
+    values = shingles(text)
+    if not values:
+        return None
+    if np is not None:
+        hashed = (_A * np.fromiter(values, dtype=np.int64, count=len(values)) + _B) % PRIME
+        return tuple(int(value) for value in hashed.min(axis=1))
+    values = list(values)
+    return tuple(min([(a * value + b) % PRIME for value in values]) for a, b in PERMUTATIONS)
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class DuplicateIndex:
+    """LSH index of ticket signatures.
+
+    With 32 bands of 4 rows, pairs above roughly 0.4 similarity land in a
+    shared bucket; candidates are then checked against ``threshold``.
+    """
+
+    def __init__(self, threshold=None, bands=BANDS):
+        if threshold is None:
+            threshold = float(os.getenv("DEDUP_THRESHOLD", "0.6"))
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = NUM_PERM // bands
+        self._signatures = {}
+        self._buckets = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _band_keys(self, signature):
+        return [tuple(signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def add(self, key, text):
+        """Index (or re-index) a ticket; returns its signature (None for empty text)."""
+        signature = minhash(text)
+        with self._lock:
+            self._remove(key)
+            if signature is None:
+                return None
+            self._signatures[key] = signature
+            for band, band_key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+        return signature
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(band_key)
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band][band_key]
+
+    def query(self, text=None, signature=None, exclude=None):
+        """Indexed tickets similar to the text (or signature), best first, as [(key, similarity)]."""
+        if signature is None:
+            signature = minhash(text)
+            if signature is None:
+                return []
+        with self._lock:
+            return self._matches(signature, exclude)
+
+    def _matches(self, signature, exclude=None):
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            candidates |= self._buckets[band].get(band_key, set())
+        candidates.discard(exclude)
+        matches = [(key, similarity(signature, self._signatures[key])) for key in candidates]
+        matches = [(key, round(score, 3)) for key, score in matches if score >= self.threshold]
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def clusters(self, keys=None):
+        """Groups of near-duplicate tickets, largest first.
+
+        With ``keys``, only clusters containing at least one of them are
+        returned. Each cluster is {"keys": [...], "similarity": lowest
+        pairwise match that joined it}.
+        """
+        with self._lock:
+            parent = {}
+            weakest = {}
+
+            def find(key):
+                while parent.get(key, key) != key:
+                    key = parent[key]
+                return key
+
+            for key, signature in self._signatures.items():
+                for other, score in self._matches(signature, exclude=key):
+                    root, other_root = find(key), find(other)
+                    if root != other_root:
+                        parent[other_root] = root
+                        weakest[root] = min(score, weakest.get(root, 1.0), weakest.get(other_root, 1.0))
+
+            groups = {}
+            for key in self._signatures:
+                groups.setdefault(find(key), []).append(key)
+
+        wanted = set(keys) if keys is not None else None
+        clusters = [
+            {"keys": sorted(members, key=issue_sort_key), "similarity": weakest.get(root, 1.0)}
+            for root, members in groups.items()
+            if len(members) > 1 and (wanted is None or wanted & set(members))
+        ]
+        return sorted(clusters, key=lambda cluster: (-len(cluster["keys"]), cluster["keys"][0]))
+
+    def stats(self):
+        with self._lock:
+            return {"tickets": len(self._signatures), "threshold": self.threshold}
+
+
+def issue_sort_key(key):
+    """Sort "ABC-12" before "ABC-100"; the oldest ticket of a cluster comes first."""
+    project, _, number = key.rpartition("-")
+    return (project, int(number)) if number.isdigit() else (project, 0)
+
+
+def find_reusable_analysis(index, ticket_key, text, store, jira_url, pat):
+    """A stored analysis of a near-duplicate of the ticket, as (source_key, analysis), or None."""
+    if index is None:
+        return None
+    for key, score in index.query(text, exclude=ticket_key):
+        analysis = store.get(jira_url, pat, key)
+        if analysis is not None and not analysis.get("duplicate_of"):
+            logger.info(f"{ticket_key} is a near-duplicate of {key} ({score}), reusing its analysis")
+            return key, analysis
+    return None
+
+
+# One index per mirrored (Jira instance, credential scope, project); signing a
+# large project takes a while, so indexes are built in the background
+_indexes = {}
+_building = {}
+_indexes_lock = threading.Lock()
+_subscribed = False
+
+
+def _on_mirror_sync(jira_url, scope, issues, removed_keys):
+    with _indexes_lock:
+        indexes = dict(_building)
+        indexes.update(_indexes)
+    for issue in issues:
+        index = indexes.get((jira_url, scope, issue["key"].rsplit("-", 1)[0]))
+        if index is not None:
+            index.add(issue["key"], ticket_text(issue))
+    for key in removed_keys:
+        index = indexes.get((jira_url, scope, key.rsplit("-", 1)[0]))
+        if index is not None:
+            index.remove(key)
+
+
+def get_duplicate_index(jira_url, pat, project_key, max_staleness):
+    """Duplicate index of a whole mirrored project, or None while it is being built."""
+    global _subscribed
+    target = (jira_url, credential_scope(pat), project_key)
+    index = _indexes.get(target)
+    if index is not None:
+        return index
+    with _indexes_lock:
+        if target in _indexes or target in _building:
+            return _indexes.get(target)
+        if not _subscribed:
+            get_ticket_mirror().subscribe(_on_mirror_sync)
+            _subscribed = True
+        # Registered before loading, so syncs during the build are not missed
+        _building[target] = DuplicateIndex()
+
+    def build():
+        index = _building[target]
+        try:
+            mirrored = get_ticket_mirror().read(jira_url, pat, project_key, max_staleness, fields=DEDUP_FIELDS)
+            if mirrored is None:
+                # Not mirrored yet; the next call tries again
+                return
+            for issue in mirrored["issues"]:
+                index.add(issue["key"], ticket_text(issue))
+            with _indexes_lock:
+                _indexes[target] = index
+            logger.info(f"Indexed {len(index)} tickets of {project_key} for duplicate detection")
+        except Exception as e:
+            logger.error(f"Building the duplicate index of {project_key} failed: {str(e)}")
+        finally:
+            with _indexes_lock:
+                _building.pop(target, None)
+
+    threading.Thread(target=build, name=f"dedup-{project_key}", daemon=True).start()
+    return None
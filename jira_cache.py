@@ -0,0 +1,154 @@
+import os
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds a cached response is served without asking Jira again
+DEFAULT_TTLS = {
+    "project": 300,
+    "serverInfo": 600,
+}
+
+
+def credential_scope(pat):
+    """Return a short, non-reversible identifier for a credential."""
+    return hashlib.sha256(pat.encode("utf-8")).hexdigest()[:16]
+
+
+class CachedResponse:
+    """A cached Jira JSON body plus the validators needed to revalidate it."""
+
+    def __init__(self, endpoint, data, etag=None, last_modified=None):
+        self.endpoint = endpoint
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time()
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def conditional_headers(self):
+        """Headers that let Jira answer 304 Not Modified."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class JiraResponseCache:
+    """LRU cache of Jira GET responses keyed by instance, credential scope and URL.
+
+    Entries younger than their endpoint TTL are fresh. Older entries are
+    still served for up to ``stale_ttl`` seconds while a background
+    revalidation runs (stale-while-revalidate).
+    """
+
+    def __init__(self, ttls=None, stale_ttl=None, max_size=None):
+        self.ttls = dict(DEFAULT_TTLS)
+        for endpoint in self.ttls:
+            env_value = os.getenv(f"JIRA_CACHE_TTL_{endpoint.upper()}")
+            if env_value:
+                self.ttls[endpoint] = float(env_value)
+        if ttls:
+            self.ttls.update(ttls)
+        if stale_ttl is None:
+            stale_ttl = float(os.getenv("JIRA_CACHE_STALE", "3600"))
+        if max_size is None:
+            max_size = int(os.getenv("JIRA_CACHE_SIZE", "1024"))
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(jira_url, pat, url):
+        return (jira_url, credential_scope(pat), url)
+
+    def ttl_for(self, endpoint):
+        return self.ttls.get(endpoint, 0)
+
+    def lookup(self, key):
+        """Return (entry, state) where state is "fresh", "stale" or "miss"."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, "miss"
+            self._entries.move_to_end(key)
+            age = entry.age()
+            ttl = self.ttl_for(entry.endpoint)
+            if age < ttl:
+                self.hits += 1
+                return entry, "fresh"
+            if age < ttl + self.stale_ttl:
+                self.stale_hits += 1
+                return entry, "stale"
+            # Too old to serve, but its validators can still save a full body
+            self.misses += 1
+            return entry, "expired"
+
+    def store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def mark_not_modified(self, entry):
+        """Restart an entry's TTL after Jira confirmed it is unchanged."""
+        with self._lock:
+            entry.fetched_at = time.time()
+            self.not_modified += 1
+
+    def start_refresh(self, key):
+        """Claim the background refresh for a key; False if one is running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def finish_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "size": len(self._entries),
+                "max_size": self.max_size
+            }
+
+
+# Shared by every JiraClient in this worker
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Get the worker-wide Jira response cache."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = JiraResponseCache()
+    return _response_cache
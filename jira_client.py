@@ -0,0 +1,387 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from jira_cache import get_response_cache, CachedResponse, credential_scope
+from singleflight import get_singleflight
+from metrics import JIRA
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default timeouts (seconds) for each Jira endpoint we talk to
+DEFAULT_TIMEOUTS = {
+    "serverInfo": 10,
+    "project": 10,
+    "search": 15,
+    "issue": 10,
+    "comment": 15,
+}
+
+
+# Keys Jira attaches to nested objects that no caller ever renders
+NOISE_KEYS = ("self", "iconUrl", "avatarUrls")
+
+
+def fields_param(fields):
+    """Render a fields/expand list as the comma separated value Jira expects."""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        return fields
+    return ",".join(fields)
+
+
+def request_key(jira_url, pat, path, params=None, headers=None):
+    """Key under which identical concurrent GETs are coalesced."""
+    return (
+        jira_url,
+        credential_scope(pat),
+        path,
+        urlencode(sorted(params.items())) if params else "",
+        tuple(sorted(headers.items())) if headers else ()
+    )
+
+
+def _slim(value):
+    """Strip hypermedia noise from a nested Jira value."""
+    if isinstance(value, dict):
+        return {k: _slim(v) for k, v in value.items() if k not in NOISE_KEYS}
+    if isinstance(value, list):
+        return [_slim(v) for v in value]
+    return value
+
+
+def trim_issue(issue, fields=None):
+    """Return a trimmed issue record holding only the requested fields."""
+    issue_fields = issue.get("fields", {})
+    if fields:
+        wanted = fields.split(",") if isinstance(fields, str) else fields
+        issue_fields = {name: issue_fields[name] for name in wanted if name in issue_fields}
+    trimmed = {
+        "id": issue.get("id"),
+        "key": issue.get("key"),
+        "fields": _slim(issue_fields),
+    }
+    if "renderedFields" in issue:
+        trimmed["renderedFields"] = issue["renderedFields"]
+    return trimmed
+
+
+class JiraError(Exception):
+    """Raised when Jira answers with an unexpected status code."""
+
+    def __init__(self, status_code, text=""):
+        super().__init__(f"Jira returned status code {status_code}")
+        self.status_code = status_code
+        self.text = text
+
+
+class IssuePager:
+    """Lazily walks the startAt pages of a JQL search.
+
+    Only the current page (plus, with prefetch, the next one) is held in
+    memory. ``total`` is filled in once the first page has been fetched.
+    """
+
+    def __init__(self, client, pat, jql, page_size=50, limit=None, prefetch=True,
+                 fields=None, expand=None):
+        self.client = client
+        self.pat = pat
+        self.jql = jql
+        self.fields = fields
+        self.expand = expand
+        self.page_size = page_size
+        self.limit = limit
+        self.prefetch = prefetch
+        self.total = None
+        self.yielded = 0
+
+    @property
+    def truncated(self):
+        """True if the search matched more issues than were yielded."""
+        return self.total is not None and self.total > self.yielded
+
+    def _fetch_page(self, start_at):
+        max_results = self.page_size
+        if self.limit is not None:
+            max_results = min(max_results, self.limit - start_at)
+        return self.client.search(
+            self.pat, self.jql, max_results=max_results, start_at=start_at,
+            fields=self.fields, expand=self.expand
+        )
+
+    def _request_page(self, start_at):
+        if self.prefetch:
+            return self.client.prefetch_executor.submit(self._fetch_page, start_at)
+        return start_at
+
+    def _resolve_page(self, pending):
+        if self.prefetch:
+            return pending.result()
+        return self._fetch_page(pending)
+
+    def __iter__(self):
+        start_at = 0
+        pending = self._request_page(start_at)
+        try:
+            while pending is not None:
+                page = self._resolve_page(pending)
+                pending = None
+                issues = page.get("issues", [])
+                self.total = page.get("total", 0)
+                cap = self.total if self.limit is None else min(self.total, self.limit)
+                # Jira may return fewer issues than requested, so advance by what we got
+                start_at += len(issues)
+                if issues and start_at < cap:
+                    # Kick off the next page while the caller handles this one
+                    pending = self._request_page(start_at)
+                for issue in issues:
+                    if self.yielded >= cap:
+                        return
+                    self.yielded += 1
+                    yield issue
+        finally:
+            if self.prefetch and pending is not None:
+                pending.cancel()
+
+
+class JiraClient:
+    """Pooled, keep-alive client for a single Jira instance.
+
+    The client is shared by every user of the same Jira instance, so the
+    personal access token is passed with each call rather than stored.
+    """
+
+    def __init__(self, jira_url, pool_size=None, keep_alive=None, timeouts=None):
+        self.jira_url = jira_url.rstrip("/")
+
+        if pool_size is None:
+            pool_size = int(os.getenv("JIRA_POOL_SIZE", "10"))
+        if keep_alive is None:
+            keep_alive = os.getenv("JIRA_KEEP_ALIVE", "1") != "0"
+
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+
+        # Per-endpoint timeouts, overridable via JIRA_TIMEOUT_<ENDPOINT>
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        for endpoint in self.timeouts:
+            env_value = os.getenv(f"JIRA_TIMEOUT_{endpoint.upper()}")
+            if env_value:
+                self.timeouts[endpoint] = float(env_value)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        self._prefetch_executor = None
+        self._prefetch_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Connection": "keep-alive" if keep_alive else "close",
+        })
+
+    @property
+    def prefetch_executor(self):
+        """Shared executor used to prefetch search pages."""
+        if self._prefetch_executor is None:
+            with self._prefetch_lock:
+                if self._prefetch_executor is None:
+                    workers = int(os.getenv("JIRA_PREFETCH_WORKERS", "4"))
+                    self._prefetch_executor = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="jira-prefetch"
+                    )
+        return self._prefetch_executor
+
+    def get_auth_headers(self, pat):
+        """Return headers for Jira authentication."""
+        return {"Authorization": f"Bearer {pat}"}
+
+    def request(self, method, path, pat, endpoint, params=None, json=None, headers=None):
+        """Send a request through the pooled session and return the response.
+
+        Identical GETs already in flight for the same credential share that
+        request and its response instead of sending another one.
+        """
+        if method == "GET":
+            return get_singleflight("jira").do(
+                request_key(self.jira_url, pat, path, params, headers),
+                self._send, method, path, pat, endpoint, params, json, headers
+            )
+        return self._send(method, path, pat, endpoint, params, json, headers)
+
+    def _send(self, method, path, pat, endpoint, params=None, json=None, headers=None):
+        url = f"{self.jira_url}{path}"
+        timeout = self.timeouts.get(endpoint, 10)
+        request_headers = self.get_auth_headers(pat)
+        if headers:
+            request_headers.update(headers)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                url,
+                headers=request_headers,
+                params=params,
+                json=json,
+                timeout=timeout
+            )
+        except Exception as e:
+            JIRA.observe((endpoint, method), time.perf_counter() - started, error=e)
+            raise
+        JIRA.observe((endpoint, method), time.perf_counter() - started, status=response.status_code,
+                     sent=len(response.request.body or b""), received=len(response.content))
+        return response
+
+    def get_json(self, path, pat, endpoint, params=None):
+        """GET a Jira resource and return the decoded JSON body."""
+        response = self.request("GET", path, pat, endpoint, params=params)
+        if response.status_code != 200:
+            raise JiraError(response.status_code, response.text)
+        return response.json()
+
+    def get_json_cached(self, path, pat, endpoint, params=None):
+        """GET a slow-changing Jira resource through the response cache.
+        
+        Fresh entries cost no round trip. Stale entries are returned at once
+        while a background request revalidates them, and expired entries are
+        revalidated with If-None-Match/If-Modified-Since before use.
+        """
+        cache = get_response_cache()
+        url = path if not params else f"{path}?{urlencode(sorted(params.items()))}"
+        key = cache.make_key(self.jira_url, pat, url)
+        
+        entry, state = cache.lookup(key)
+        if state == "fresh":
+            return entry.data
+        if state == "stale":
+            if cache.start_refresh(key):
+                self.prefetch_executor.submit(
+                    self._refresh_cached, cache, key, path, pat, endpoint, params, entry
+                )
+            return entry.data
+        return self._revalidate(cache, key, path, pat, endpoint, params, entry)
+
+    def _revalidate(self, cache, key, path, pat, endpoint, params, entry):
+        """Fetch a resource, sending the cached validators if we have them."""
+        headers = entry.conditional_headers() if entry else None
+        response = self.request("GET", path, pat, endpoint, params=params, headers=headers)
+        
+        if response.status_code == 304 and entry is not None:
+            cache.mark_not_modified(entry)
+            return entry.data
+        if response.status_code != 200:
+            raise JiraError(response.status_code, response.text)
+        
+        data = response.json()
+        cache.store(key, CachedResponse(
+            endpoint,
+            data,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        ))
+        return data
+
+    def _refresh_cached(self, cache, key, path, pat, endpoint, params, entry):
+        """Background half of stale-while-revalidate."""
+        try:
+            self._revalidate(cache, key, path, pat, endpoint, params, entry)
+        except Exception as e:
+            logger.warning(f"Background refresh of {path} failed: {str(e)}")
+        finally:
+            cache.finish_refresh(key)
+
+    def test_connection(self, pat):
+        """Test the connection by hitting the server info endpoint."""
+        try:
+            response = self.request("GET", "/rest/api/2/serverInfo", pat, "serverInfo")
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def get_projects(self, pat):
+        """Fetch all Jira projects (cached, the list rarely changes)."""
+        return self.get_json_cached("/rest/api/2/project", pat, "project")
+
+    def get_server_info(self, pat):
+        """Fetch the server info metadata (cached)."""
+        return self.get_json_cached("/rest/api/2/serverInfo", pat, "serverInfo")
+
+    def search(self, pat, jql, max_results=50, start_at=0, fields=None, expand=None):
+        """Run a JQL search.
+
+        When ``fields`` is given only those fields are requested from Jira
+        and each returned issue is trimmed down to them.
+        """
+        params = {"jql": jql, "maxResults": max_results, "startAt": start_at}
+        if fields is not None:
+            params["fields"] = fields_param(fields)
+        if expand is not None:
+            params["expand"] = fields_param(expand)
+        data = self.get_json("/rest/api/2/search", pat, "search", params=params)
+        if fields is not None:
+            data["issues"] = [trim_issue(issue, fields) for issue in data.get("issues", [])]
+        return data
+
+    def iter_search(self, pat, jql, page_size=50, limit=None, prefetch=True,
+                    fields=None, expand=None):
+        """Return an IssuePager that lazily yields every issue matching the JQL."""
+        return IssuePager(
+            self, pat, jql, page_size=page_size, limit=limit, prefetch=prefetch,
+            fields=fields, expand=expand
+        )
+
+    def get_issue(self, pat, ticket_key, fields=None, expand=None):
+        """Fetch a specific ticket, optionally projected to the given fields."""
+        params = {}
+        if fields is not None:
+            params["fields"] = fields_param(fields)
+        if expand is not None:
+            params["expand"] = fields_param(expand)
+        issue = self.get_json(f"/rest/api/2/issue/{ticket_key}", pat, "issue", params=params or None)
+        if fields is not None:
+            return trim_issue(issue, fields)
+        return issue
+
+    def add_comment(self, pat, ticket_key, body):
+        """Add a comment to a ticket and return the raw response."""
+        return self.request(
+            "POST",
+            f"/rest/api/2/issue/{ticket_key}/comment",
+            pat,
+            "comment",
+            json={"body": body}
+        )
+
+    def close(self):
+        """Close the pooled connections and the prefetch executor."""
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=False)
+        self.session.close()
+
+
+# One client per Jira instance, shared by all threads of this worker
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_jira_client(jira_url):
+    """Get the shared JiraClient for a Jira instance, creating it if needed."""
+    key = jira_url.rstrip("/")
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = JiraClient(key)
+                _clients[key] = client
+                logger.info(f"Created pooled Jira client for {key} (pool size {client.pool_size})")
+    return client
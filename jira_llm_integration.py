@@ -1,28 +1,76 @@
-import requests
-import json
+import os
+import re
 import logging
-from urllib.parse import quote
+from jira_client import get_jira_client, JiraError
+from jql_rules import RuleBasedJQLCompiler, normalize_request
+from llm_cache import ResponseCache
+from prompt_packer import PromptPacker, ticket_row, estimate_tokens
+from ticket_mirror import get_ticket_mirror
+from ticket_index import add_fetched
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Fields used by analyze_tickets and the smart query results table
+QUERY_RESULT_FIELDS = ["summary", "status", "priority", "assignee", "reporter", "created", "updated"]
+
+# "All tickets of one project, newest first" can be answered by the ticket mirror
+WHOLE_PROJECT_JQL = re.compile(r'^\s*project\s*=\s*"?([A-Za-z][A-Za-z0-9_]*)"?\s+ORDER\s+BY\s+created\s+DESC\s*$',
+                               re.IGNORECASE)
+
 class JiraLLMIntegration:
     """Class for handling LLM-powered Jira queries and analysis."""
     
     def __init__(self, llm_service):
         """Initialize with LLM service."""
         self.llm_service = llm_service
+        self.rule_compiler = RuleBasedJQLCompiler()
+        # LLM translations, keyed per Jira instance on the normalized request
+        self.translation_cache = ResponseCache(
+            max_size=int(os.getenv("JQL_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("JQL_CACHE_TTL", "86400"))
+        )
+        # Fits query results into the analysis token budget
+        self.prompt_packer = PromptPacker()
     
-    def get_auth_headers(self, pat):
-        """Return headers for Jira authentication."""
-        return {
-            "Authorization": f"Bearer {pat}",
-            "Content-Type": "application/json"
-        }
+    def natural_to_jql(self, natural_language_request, project_keys=None, jira_url=None):
+        """Convert natural language to JQL, trying the local rules before the LLM."""
+        return self.translate_to_jql(natural_language_request, project_keys, jira_url)[0]
     
-    def natural_to_jql(self, natural_language_request):
-        """Convert natural language to JQL using LLM."""
-        prompt = f"""
+    def translate_to_jql(self, natural_language_request, project_keys=None, jira_url=None):
+        """Convert natural language to JQL and return (jql, source).
+        
+        The source is "rules", "cache" or "llm".
+        """
+        jql_query = self.rule_compiler.compile(natural_language_request, project_keys)
+        if jql_query is not None:
+            return jql_query, "rules"
+        
+        cache_key = self._translation_key(natural_language_request, project_keys, jira_url)
+        jql_query = self.translation_cache.get(cache_key)
+        if jql_query is not None:
+            return jql_query, "cache"
+        
+        jql_query = self.llm_to_jql(natural_language_request)
+        if jql_query:
+            self.translation_cache.set(cache_key, jql_query)
+        return jql_query, "llm"
+    
+    def forget_translation(self, natural_language_request, project_keys=None, jira_url=None):
+        """Evict a cached translation, e.g. after its JQL failed to execute."""
+        cache_key = self._translation_key(natural_language_request, project_keys, jira_url)
+        self.translation_cache.delete(cache_key)
+        # Otherwise the LLM response cache hands back the same bad JQL
+        if hasattr(self.llm_service, "forget_response"):
+            self.llm_service.forget_response(self.build_jql_prompt(natural_language_request))
+    
+    def _translation_key(self, natural_language_request, project_keys, jira_url):
+        normalized = normalize_request(natural_language_request, project_keys)
+        return self.translation_cache.make_key(jira_url, normalized)
+    
+    def build_jql_prompt(self, natural_language_request):
+        """Build the prompt asking the LLM for a JQL translation."""
+        return f"""
         Convert this natural language request to a valid Jira JQL query:
         REQUEST: {natural_language_request}
         
@@ -36,6 +84,10 @@ class JiraLLMIntegration:
         
         Respond ONLY with the valid JQL query, nothing else.
         """
+    
+    def llm_to_jql(self, natural_language_request):
+        """Convert natural language to JQL using LLM."""
+        prompt = self.build_jql_prompt(natural_language_request)
         
         try:
             jql_query = self.llm_service.generate_response(prompt).strip()
@@ -45,33 +97,73 @@ class JiraLLMIntegration:
             logger.error(f"Error generating JQL query: {str(e)}")
             return f"project IS NOT EMPTY"  # Safe fallback query
     
-    def execute_jql_query(self, jira_url, pat, jql_query, max_results=50):
-        """Execute a JQL query against the Jira API."""
-        # URL encode the JQL query
-        encoded_jql = quote(jql_query)
-        search_url = f"{jira_url}/rest/api/2/search?jql={encoded_jql}&maxResults={max_results}"
+    def read_mirrored(self, jira_url, pat, jql_query, max_results=50, max_staleness=None):
+        """The execute_jql_query result of a whole-project query from the ticket mirror, or None."""
+        match = WHOLE_PROJECT_JQL.match(jql_query)
+        if not max_staleness or not match:
+            return None
+        try:
+            mirrored = get_ticket_mirror().read(
+                jira_url, pat, match.group(1).upper(), max_staleness,
+                limit=max_results, fields=QUERY_RESULT_FIELDS
+            )
+        except Exception as e:
+            logger.warning(f"Ticket mirror read failed, querying Jira: {str(e)}")
+            return None
+        if mirrored is None:
+            return None
+        logger.debug(f"Serving JQL query from the ticket mirror: {jql_query}")
+        return {
+            "success": True,
+            "data": {
+                "issues": mirrored["issues"],
+                "total": mirrored["total"],
+                "maxResults": max_results
+            }
+        }
+    
+    def index_results(self, jira_url, pat, issues, max_staleness=None):
+        """Feed query results to the chat search index, which the mirror fills when it is enabled."""
+        if max_staleness:
+            return
+        try:
+            add_fetched(jira_url, pat, issues)
+        except Exception as e:
+            logger.warning(f"Could not index query results for chat: {str(e)}")
+    
+    def execute_jql_query(self, jira_url, pat, jql_query, max_results=50, max_staleness=None):
+        """Execute a JQL query against the Jira API.
+        
+        With ``max_staleness`` (seconds), whole-project queries are read from
+        the local ticket mirror when it is no older than that.
+        """
+        mirrored = self.read_mirrored(jira_url, pat, jql_query, max_results, max_staleness)
+        if mirrored is not None:
+            return mirrored
         
         try:
             logger.debug(f"Executing JQL query: {jql_query}")
-            response = requests.get(
-                search_url, 
-                headers=self.get_auth_headers(pat), 
-                timeout=15
+            pager = get_jira_client(jira_url).iter_search(
+                pat, jql_query, limit=max_results, fields=QUERY_RESULT_FIELDS
             )
-            
-            if response.status_code != 200:
-                logger.error(f"JQL query failed: {response.status_code} - {response.text}")
-                return {
-                    "success": False,
-                    "error": f"Query failed with status {response.status_code}",
-                    "message": response.text
-                }
+            issues = list(pager)
             
             return {
                 "success": True,
-                "data": response.json()
+                "data": {
+                    "issues": issues,
+                    "total": pager.total or 0,
+                    "maxResults": max_results
+                }
+            }
+        
+        except JiraError as e:
+            logger.error(f"JQL query failed: {e.status_code} - {e.text}")
+            return {
+                "success": False,
+                "error": f"Query failed with status {e.status_code}",
+                "message": e.text
             }
-                
         except Exception as e:
             logger.error(f"Error executing JQL query: {str(e)}")
             return {
@@ -79,32 +171,20 @@ class JiraLLMIntegration:
                 "error": f"Error executing query: {str(e)}"
             }
     
-    def analyze_tickets(self, natural_language_request, tickets_data, total_count):
-        """Use LLM to analyze ticket data."""
-        # Prepare a simplified version of the tickets to avoid token limits
-        simplified_tickets = []
-        
-        for ticket in tickets_data.get("issues", [])[:15]:  # Limit to 15 tickets for analysis
-            fields = ticket.get("fields", {})
-            simplified_ticket = {
-                "key": ticket.get("key"),
-                "summary": fields.get("summary"),
-                "status": fields.get("status", {}).get("name") if fields.get("status") else None,
-                "priority": fields.get("priority", {}).get("name") if fields.get("priority") else None,
-                "assignee": fields.get("assignee", {}).get("displayName") if fields.get("assignee") else None,
-                "reporter": fields.get("reporter", {}).get("displayName") if fields.get("reporter") else None,
-                "created": fields.get("created"),
-                "updated": fields.get("updated")
-            }
-            simplified_tickets.append(simplified_ticket)
+    def pack_analysis_prompt(self, natural_language_request, tickets_data, total_count):
+        """Build the prompt used to analyze a set of query results.
         
-        # Create prompt for the LLM
-        prompt = f"""
+        The tickets are packed into the analysis token budget as a compact
+        table, most relevant first. Returns (prompt, stats) where stats holds
+        the estimated tokens used and the number of tickets left out.
+        """
+        def render(included, table):
+            return f"""
         Analyze these Jira tickets based on the natural language request: "{natural_language_request}"
         
         Total matching tickets: {total_count}
-        Tickets sample (showing {len(simplified_tickets)} of {total_count}):
-        {json.dumps(simplified_tickets, indent=2)}
+        Tickets sample (showing {included} of {total_count}, one per line, columns separated by "|"):
+        {table}
         
         Provide:
         1. Summary of findings - What patterns do you see across these tickets?
@@ -114,6 +194,25 @@ class JiraLLMIntegration:
         Format your response in HTML with appropriate headings (h3, h4) and paragraphs.
         """
         
+        rows = [ticket_row(ticket) for ticket in tickets_data.get("issues", [])]
+        table, stats = self.prompt_packer.pack(
+            rows, request=natural_language_request, reserved_tokens=estimate_tokens(render(total_count, ""))
+        )
+        prompt = render(stats["tickets_included"], table)
+        return prompt, stats
+    
+    def build_analysis_prompt(self, natural_language_request, tickets_data, total_count):
+        """Build the prompt used to analyze a set of query results."""
+        prompt, _ = self.pack_analysis_prompt(natural_language_request, tickets_data, total_count)
+        return prompt
+    
+    def analyze_tickets(self, natural_language_request, tickets_data, total_count):
+        """Use LLM to analyze ticket data."""
+        prompt = self.build_analysis_prompt(natural_language_request, tickets_data, total_count)
+        return self.analyze_prompt(prompt)
+    
+    def analyze_prompt(self, prompt):
+        """Send an analysis prompt to the LLM, turning failures into an HTML message."""
         try:
             analysis = self.llm_service.generate_response(prompt)
             logger.debug(f"Generated analysis (length: {len(analysis)})")
@@ -122,36 +221,86 @@ class JiraLLMIntegration:
             logger.error(f"Error generating analysis: {str(e)}")
             return f"<h3>Analysis Error</h3><p>Unable to generate analysis: {str(e)}</p>"
     
-    def process_natural_language_query(self, jira_url, pat, natural_language_request):
-        """Process a natural language query end-to-end."""
-        # Step 1: Convert to JQL
-        jql_query = self.natural_to_jql(natural_language_request)
+    def run_query(self, jira_url, pat, natural_language_request, max_staleness=None):
+        """Translate a natural language query to JQL and execute it.
+        
+        Returns the query result dict without the analysis; the raw search
+        data is kept under "data" for the analysis step. ``max_staleness``
+        is passed on to execute_jql_query.
+        """
+        # Step 1: Convert to JQL (the project list is cached, so this is cheap)
+        try:
+            project_keys = [p.get("key") for p in get_jira_client(jira_url).get_projects(pat)]
+        except Exception as e:
+            logger.warning(f"Could not load project keys for JQL rules: {str(e)}")
+            project_keys = []
+        jql_query, jql_source = self.translate_to_jql(natural_language_request, project_keys, jira_url)
+        logger.info(f"JQL from {jql_source}: {jql_query} (rule hit rate {self.rule_compiler.stats()['hit_rate']})")
         
         # Step 2: Execute the query
-        query_result = self.execute_jql_query(jira_url, pat, jql_query)
+        query_result = self.execute_jql_query(jira_url, pat, jql_query, max_staleness=max_staleness)
         
         if not query_result.get("success"):
+            # Don't let a bad translation stick in the cache
+            if jql_source != "rules":
+                self.forget_translation(natural_language_request, project_keys, jira_url)
             return {
                 "success": False,
                 "jql": jql_query,
+                "jql_source": jql_source,
                 "error": query_result.get("error"),
                 "message": query_result.get("message", "Unknown error")
             }
         
         tickets_data = query_result.get("data", {})
-        total_count = tickets_data.get("total", 0)
+        self.index_results(jira_url, pat, tickets_data.get("issues", []), max_staleness)
+        return {
+            "success": True,
+            "jql": jql_query,
+            "jql_source": jql_source,
+            "tickets": tickets_data.get("issues", []),
+            "total": tickets_data.get("total", 0),
+            "data": tickets_data
+        }
+    
+    def process_natural_language_query(self, jira_url, pat, natural_language_request, max_staleness=None):
+        """Process a natural language query end-to-end."""
+        result = self.run_query(jira_url, pat, natural_language_request, max_staleness=max_staleness)
+        if not result["success"]:
+            return result
         
         # Step 3: Analyze the results
-        analysis = self.analyze_tickets(
+        tickets_data = result.pop("data")
+        prompt, result["analysis_context"] = self.pack_analysis_prompt(
             natural_language_request, 
             tickets_data, 
-            total_count
+            result["total"]
         )
+        result["analysis"] = self.analyze_prompt(prompt)
+        return result
+    
+    def stream_natural_language_query(self, jira_url, pat, natural_language_request, max_staleness=None):
+        """Process a query, yielding (event, data) pairs as results become available.
         
-        return {
-            "success": True,
-            "jql": jql_query,
-            "tickets": tickets_data.get("issues", []),
-            "total": total_count,
-            "analysis": analysis
-        }
\ No newline at end of file
+        Yields a "query" event with the JQL and tickets as soon as Jira has
+        answered, then "analysis" events carrying chunks of the LLM analysis
+        as they stream in, and finally "done" (or "error").
+        """
+        result = self.run_query(jira_url, pat, natural_language_request, max_staleness=max_staleness)
+        if not result["success"]:
+            yield "error", result
+            return
+        
+        tickets_data = result.pop("data")
+        prompt, result["analysis_context"] = self.pack_analysis_prompt(
+            natural_language_request, tickets_data, result["total"]
+        )
+        yield "query", result
+        
+        try:
+            for chunk in self.llm_service.stream_response(prompt):
+                yield "analysis", {"text": chunk}
+        except Exception as e:
+            logger.error(f"Error streaming analysis: {str(e)}")
+            yield "analysis", {"text": f"<h3>Analysis Error</h3><p>Unable to generate analysis: {str(e)}</p>"}
+        yield "done", {}
@@ -0,0 +1,187 @@
+"""Background jobs for long-running LLM work.
+
+Jobs run on a dedicated in-process worker pool so web workers return
+immediately with a job id. Every job's state and JSON result are kept in a
+SQLite table, which is what ``/jobs/<id>`` reads; the callables themselves
+only live in memory, so jobs still queued or running when the process
+stops are marked as failed on the next start.
+"""
+import os
+import time
+import json
+import uuid
+import sqlite3
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from jira_cache import credential_scope
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobQueue:
+    """SQLite-backed job table plus the thread pool that runs the jobs.
+
+    Jobs belong to the credential that submitted them; ``get`` and
+    ``cancel`` only see jobs of the same owner. Cancelling a queued job
+    stops it from starting; cancelling a running job discards its result
+    (the underlying LLM call cannot be interrupted).
+    """
+
+    def __init__(self, path=None, workers=None, retention=None):
+        if path is None:
+            path = os.getenv("JOB_DB_PATH", "jobs.db")
+        if workers is None:
+            workers = int(os.getenv("JOB_WORKERS", "4"))
+        if retention is None:
+            retention = float(os.getenv("JOB_RETENTION", "86400"))
+        self.path = path
+        self.workers = workers
+        self.retention = retention
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT,
+                owner TEXT,
+                status TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        # Nothing survives a restart, so unfinished jobs can never complete
+        self._db.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)",
+            (FAILED, "Interrupted by a server restart", time.time(), PENDING, RUNNING)
+        )
+        self._db.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor.rowcount
+
+    def submit(self, kind, pat, func, *args, **kwargs):
+        """Queue ``func(*args, **kwargs)`` and return the new job id."""
+        self._prune()
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, owner, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, credential_scope(pat), PENDING, time.time())
+        )
+        future = self._executor.submit(self._run, job_id, func, args, kwargs)
+        with self._lock:
+            self._futures[job_id] = future
+        # Also runs for futures cancelled before they started
+        future.add_done_callback(lambda _: self._forget(job_id))
+        logger.info(f"Queued {kind} job {job_id}")
+        return job_id
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id, func, args, kwargs):
+        started = self._execute(
+            "UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+            (RUNNING, time.time(), job_id, PENDING)
+        )
+        if not started:
+            return  # cancelled while queued
+
+        try:
+            result = func(*args, **kwargs)
+            # A job cancelled while running keeps its cancelled state
+            self._execute(
+                "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (COMPLETED, json.dumps(result), time.time(), job_id, RUNNING)
+            )
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self._execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (FAILED, str(e), time.time(), job_id, RUNNING)
+            )
+
+    def get(self, job_id, pat):
+        """Return the job as a dict, or None if it does not exist for this owner."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, kind, status, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ? AND owner = ?", (job_id, credential_scope(pat))
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "created_at": row[5],
+            "started_at": row[6],
+            "finished_at": row[7]
+        }
+
+    def cancel(self, job_id, pat):
+        """Cancel a queued or running job. Returns True if its state changed."""
+        cancelled = self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND owner = ? AND status IN (?, ?)",
+            (CANCELLED, time.time(), job_id, credential_scope(pat), PENDING, RUNNING)
+        )
+        if cancelled:
+            with self._lock:
+                future = self._futures.get(job_id)
+            if future is not None:
+                future.cancel()
+            logger.info(f"Cancelled job {job_id}")
+        return bool(cancelled)
+
+    def _prune(self):
+        """Drop finished jobs older than the retention period."""
+        self._execute(
+            "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+            FINISHED_STATES + (time.time() - self.retention,)
+        )
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            in_memory = len(self._futures)
+        counts = {status: 0 for status in (PENDING, RUNNING) + FINISHED_STATES}
+        counts.update(dict(rows))
+        counts["workers"] = self.workers
+        counts["in_flight"] = in_memory
+        return counts
+
+
+# Shared by the web routes of this worker
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Get the worker-wide job queue."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,195 @@
+import re
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Priority words and the JQL they translate to
+PRIORITIES = {
+    "highest": 'priority = "Highest"',
+    "critical": 'priority = "Highest"',
+    "high": 'priority in ("High", "Highest")',
+    "medium": 'priority = "Medium"',
+    "low": 'priority in ("Low", "Lowest")',
+    "lowest": 'priority = "Lowest"',
+    "blocker": 'priority = "Blocker"',
+}
+
+# Status words and the JQL they translate to
+STATUSES = [
+    (r"in[\s-]progress", 'status = "In Progress"'),
+    (r"to[\s-]?do", 'status = "To Do"'),
+    (r"open|unresolved|pending", "resolution = Unresolved"),
+    (r"closed|resolved|done|completed|fixed", "statusCategory = Done"),
+]
+
+# Issue type words and the JQL they translate to
+ISSUE_TYPES = [
+    (r"bugs?", "issuetype = Bug"),
+    (r"stor(?:y|ies)", "issuetype = Story"),
+    (r"epics?", "issuetype = Epic"),
+    (r"sub-?tasks?", "issuetype = Sub-task"),
+    (r"tasks?", "issuetype = Task"),
+]
+
+# Words that carry no meaning for the translation once the rules have run
+STOPWORDS = {
+    "show", "find", "list", "get", "display", "give", "fetch", "search", "see",
+    "me", "all", "the", "a", "an", "any", "every", "everything", "please",
+    "ticket", "tickets", "issue", "issues", "item", "items", "jira",
+    "that", "which", "who", "are", "is", "were", "was", "been", "have", "has",
+    "with", "in", "of", "for", "on", "from", "and", "to", "there", "i", "can", "you",
+    "priority", "status", "type", "what", "latest", "recent", "newest",
+}
+
+# Filler words dropped when normalizing a request for the translation cache
+FILLER_WORDS = {
+    "show", "find", "list", "get", "display", "give", "fetch", "search", "see",
+    "all", "the", "a", "an", "any", "every", "please", "can", "you", "i",
+    "ticket", "tickets", "issue", "issues", "item", "items", "jira",
+}
+
+DATE_FIELDS = {
+    "reported": "created", "created": "created", "opened": "created",
+    "filed": "created", "raised": "created", "logged": "created",
+    "updated": "updated", "modified": "updated", "changed": "updated",
+}
+
+UNITS = {"day": "d", "days": "d", "week": "w", "weeks": "w", "month": "M", "months": "M"}
+
+
+def normalize_request(natural_language_request, project_keys=None):
+    """Reduce a request to a canonical form for caching its translation.
+    
+    Lowercases, strips punctuation, collapses whitespace, drops filler words
+    and upper-cases known project keys, so trivially different phrasings of
+    the same query share one cache entry.
+    """
+    known_keys = {key.upper() for key in (project_keys or [])}
+    words = []
+    for word in re.sub(r"[^\w\s-]", " ", natural_language_request).split():
+        if word.upper() in known_keys:
+            words.append(word.upper())
+        elif word.lower() not in FILLER_WORDS:
+            words.append(word.lower())
+    return " ".join(words)
+
+
+class RuleBasedJQLCompiler:
+    """Deterministic translator for the common natural language query shapes.
+
+    ``compile`` returns a JQL string only when every meaningful word of the
+    request was consumed by a rule; otherwise it returns None so the caller
+    can fall back to the LLM. Attempt and hit counters are kept for
+    reporting the hit rate.
+    """
+
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def compile(self, natural_language_request, project_keys=None):
+        """Translate a request into JQL, or return None if not confident."""
+        jql = self._translate(natural_language_request, project_keys or [])
+        with self._lock:
+            self.attempts += 1
+            if jql is not None:
+                self.hits += 1
+        if jql is not None:
+            logger.debug(f"Rule-based JQL for '{natural_language_request}': {jql}")
+        return jql
+
+    def stats(self):
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.attempts, 3) if self.attempts else 0.0
+            }
+
+    def _translate(self, text, project_keys):
+        known_keys = {key.upper() for key in project_keys}
+        text = " " + re.sub(r"[?.!,;:]", " ", text.strip()) + " "
+        clauses = []
+
+        def consume(pattern, flags=re.IGNORECASE):
+            nonlocal text
+            match = re.search(pattern, text, flags)
+            if match:
+                text = text[:match.start()] + " " + text[match.end():]
+            return match
+
+        # Project: "in ABC project", "project ABC", or a bare known key
+        match = (consume(r"\b(?:in|for|from)\s+(?:the\s+)?([A-Za-z][A-Za-z0-9_]+)\s+project\b")
+                 or consume(r"\bproject\s+([A-Za-z][A-Za-z0-9_]+)\b"))
+        if match:
+            # Only a key we know is trusted; anything else ("Website", "with") goes to the LLM
+            if match.group(1).upper() not in known_keys:
+                return None
+            clauses.append(f'project = "{match.group(1).upper()}"')
+        else:
+            for word in text.split():
+                if word.upper() in known_keys and word.lower() not in STOPWORDS:
+                    consume(r"\b" + re.escape(word) + r"\b", 0)
+                    clauses.append(f'project = "{word.upper()}"')
+                    break
+
+        text = text.lower()
+
+        # Assignee / reporter
+        if consume(r"\bassigned\s+to\s+me\b|\bmy\b|\bmine\b"):
+            clauses.append("assignee = currentUser()")
+        elif consume(r"\bunassigned\b|\bnot\s+assigned\b"):
+            clauses.append("assignee is EMPTY")
+        if consume(r"\b(?:reported|created|opened|filed|raised)\s+by\s+me\b"):
+            clauses.append("reporter = currentUser()")
+
+        # Priority: "high priority" or "priority high"
+        match = (consume(r"\b(" + "|".join(PRIORITIES) + r")[\s-]+priority\b")
+                 or consume(r"\bpriority\s+(?:is\s+)?(" + "|".join(PRIORITIES) + r")\b")
+                 or consume(r"\b(critical|blocker)s?\b"))
+        if match:
+            clauses.append(PRIORITIES[match.group(1)])
+
+        # Status
+        for pattern, clause in STATUSES:
+            if consume(r"\b(?:status\s+(?:is\s+)?)?(?:" + pattern + r")\b"):
+                clauses.append(clause)
+                break
+
+        # Issue type
+        for pattern, clause in ISSUE_TYPES:
+            if consume(r"\b(?:" + pattern + r")\b"):
+                clauses.append(clause)
+                break
+
+        # Relative dates, optionally introduced by the field they apply to
+        field_words = "|".join(DATE_FIELDS)
+        prefix = r"\b(?:(" + field_words + r")\s+)?"
+        match = consume(prefix + r"(?:in\s+|within\s+|during\s+|over\s+)?(?:the\s+)?(?:last|past)\s+(\d+\s+)?(days?|weeks?|months?)\b")
+        if match:
+            field = DATE_FIELDS.get(match.group(1) or "created", "created")
+            amount = int(match.group(2)) if match.group(2) else 1
+            clauses.append(f"{field} >= -{amount}{UNITS[match.group(3)]}")
+        else:
+            match = consume(prefix + r"(today|yesterday|this\s+week|this\s+month)\b")
+            if match:
+                field = DATE_FIELDS.get(match.group(1) or "created", "created")
+                period = " ".join(match.group(2).split())
+                if period == "today":
+                    clauses.append(f"{field} >= startOfDay()")
+                elif period == "yesterday":
+                    clauses.append(f"{field} >= startOfDay(-1) AND {field} < startOfDay()")
+                elif period == "this week":
+                    clauses.append(f"{field} >= startOfWeek()")
+                else:
+                    clauses.append(f"{field} >= startOfMonth()")
+
+        # Any leftover meaningful word means we did not understand the request
+        leftover = [word for word in text.split() if word not in STOPWORDS]
+        if leftover or not clauses:
+            return None
+
+        return " AND ".join(clauses) + " ORDER BY created DESC"
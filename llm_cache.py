@@ -0,0 +1,130 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with a TTL, optionally persisted to SQLite.
+
+    The in-memory LRU is the source of truth; when a path is given every
+    write is mirrored to a SQLite file so entries survive restarts. Values
+    must be JSON serialisable.
+    """
+
+    def __init__(self, max_size=512, ttl=3600, path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path and self.enabled:
+            self._open_db(path)
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(*parts):
+        """Build a stable cache key from JSON serialisable parts."""
+        raw = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _open_db(self, path):
+        """Open the persistence file and load the freshest live entries."""
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            rows = self._db.execute(
+                "SELECT key, value, expires_at FROM cache ORDER BY expires_at DESC LIMIT ?",
+                (self.max_size,)
+            ).fetchall()
+            for key, value, expires_at in reversed(rows):
+                self._entries[key] = (json.loads(value), expires_at)
+            self._db.commit()
+            logger.info(f"Loaded {len(rows)} cached entries from {path}")
+        except sqlite3.Error as e:
+            logger.warning(f"Cache persistence disabled, could not open {path}: {e}")
+            self._db = None
+
+    def _persist(self, sql, params):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(sql, params)
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write to cache file {self.path}: {e}")
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expired entry."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+                self._persist("DELETE FROM cache WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the least recently used entries if full."""
+        if not self.enabled:
+            return
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            self._persist(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self._persist("DELETE FROM cache WHERE key = ?", (evicted,))
+
+    def delete(self, key):
+        """Drop a single entry if present."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._persist("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        """Drop every entry, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._persist("DELETE FROM cache", ())
+
+    def stats(self):
+        """Return hit/miss counters and sizing information."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "persistent": self._db is not None
+            }
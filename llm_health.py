@@ -0,0 +1,128 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Rolling health of an LLM provider built from the calls it actually serves.
+
+    Every real completion records its outcome and latency. A synthetic
+    probe is only sent when no real call has been seen for
+    ``probe_interval`` seconds, never more than once per interval and never
+    two at a time, so reading the status is just a snapshot of counters.
+
+    When given the service's circuit breaker, an open breaker is reported
+    as "circuit_open" and the probe doubles as its half-open trial request.
+    """
+
+    def __init__(self, window=None, max_age=None, probe_interval=None, breaker=None):
+        if window is None:
+            window = int(os.getenv("LLM_HEALTH_WINDOW", "100"))
+        if max_age is None:
+            max_age = float(os.getenv("LLM_HEALTH_MAX_AGE", "900"))
+        if probe_interval is None:
+            probe_interval = float(os.getenv("LLM_HEALTH_PROBE_INTERVAL", "300"))
+        self.max_age = max_age
+        self.probe_interval = probe_interval
+        self.breaker = breaker
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._probing = False
+        self.last_success_at = None
+        self.last_error = None
+        self.last_error_at = None
+        self.last_probe_at = None
+        self.last_probe_ok = None
+        self.probes = 0
+
+    def record(self, ok, latency, error=None):
+        """Record the outcome of one call to the provider."""
+        now = time.time()
+        with self._lock:
+            self._samples.append((now, ok, latency))
+            if ok:
+                self.last_success_at = now
+            else:
+                self.last_error = error
+                self.last_error_at = now
+
+    def _recent(self, now):
+        return [sample for sample in self._samples if now - sample[0] <= self.max_age]
+
+    def maybe_probe(self, probe):
+        """Run ``probe()`` in the background if one is due. Returns True if started.
+
+        ``probe`` makes a real call (which records its own sample) and
+        returns whether it succeeded.
+        """
+        # While the breaker is open nothing gets through; once it may let a
+        # trial request through, the probe is that trial
+        breaker_waiting = self.breaker is not None and self.breaker.state == "open"
+        if breaker_waiting and self.breaker.retry_in() > 0:
+            return False
+        with self._lock:
+            if self._probing:
+                return False
+            now = time.time()
+            last_seen = max(self._samples[-1][0] if self._samples else 0, self.last_probe_at or 0)
+            if now - last_seen < self.probe_interval and not breaker_waiting:
+                return False
+            self._probing = True
+        threading.Thread(target=self._run_probe, args=(probe,), name="llm-health-probe", daemon=True).start()
+        return True
+
+    def _run_probe(self, probe):
+        try:
+            ok = bool(probe())
+        except Exception as e:
+            logger.warning(f"LLM health probe failed: {str(e)}")
+            ok = False
+        with self._lock:
+            self._probing = False
+            self.last_probe_at = time.time()
+            self.last_probe_ok = ok
+            self.probes += 1
+
+    def snapshot(self):
+        """Current status and rolling statistics."""
+        now = time.time()
+        with self._lock:
+            recent = self._recent(now)
+            probing = self._probing
+            latencies = sorted(latency for _, ok, latency in recent if ok)
+            successes = sum(1 for _, ok, _ in recent if ok)
+            result = {
+                "samples": len(recent),
+                "success_rate": round(successes / len(recent), 3) if recent else None,
+                "latency_avg": round(sum(latencies) / len(latencies), 3) if latencies else None,
+                "latency_p50": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                "latency_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+                if latencies else None,
+                "last_success_at": self.last_success_at,
+                "last_error": self.last_error,
+                "last_error_at": self.last_error_at,
+                "last_probe_at": self.last_probe_at,
+                "last_probe_ok": self.last_probe_ok,
+                "probes": self.probes,
+                "probing": probing
+            }
+
+        if self.breaker is not None:
+            result["circuit"] = self.breaker.stats()
+
+        if result.get("circuit", {}).get("state") == "open":
+            result["status"] = "circuit_open"
+        elif not recent:
+            result["status"] = "pending" if probing or self.last_probe_at is None else "unknown"
+        elif result["success_rate"] >= 0.9:
+            result["status"] = "available"
+        elif successes:
+            result["status"] = "degraded"
+        else:
+            result["status"] = "error"
+        return result
@@ -0,0 +1,145 @@
+import os
+import time
+import random
+import threading
+import logging
+from email.utils import parsedate_to_datetime
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting, timeouts and provider-side failures
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """Full-jitter exponential backoff for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RetryPolicy:
+    """How many times, and how long between, LLM requests are retried."""
+
+    def __init__(self, max_retries=None, base_delay=None, max_delay=None):
+        if max_retries is None:
+            max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        if base_delay is None:
+            base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+        if max_delay is None:
+            max_delay = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to sleep before the next attempt, or None if it is not worth waiting.
+
+        A Retry-After longer than ``max_delay`` means the provider wants us
+        gone for a while, so we give up instead of holding a worker.
+        """
+        if attempt >= self.max_retries:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+
+class CircuitBreaker:
+    """Fail fast while the LLM provider is down.
+
+    After ``failure_threshold`` consecutive failed requests the breaker
+    opens and every call is refused for ``reset_timeout`` seconds. Then one
+    trial request is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        if failure_threshold is None:
+            failure_threshold = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+        if reset_timeout is None:
+            reset_timeout = float(os.getenv("LLM_BREAKER_RESET", "30"))
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.open_until = None
+        self.trips = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a request may be sent now."""
+        with self._lock:
+            if self.state == OPEN and time.time() >= self.open_until:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+                logger.info("LLM circuit half-open, sending a trial request")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("LLM circuit closed")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, open_for=None):
+        """Count a failed request; ``open_for`` opens the breaker for that long right away."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold or open_for:
+                self._open(max(open_for or 0, self.reset_timeout))
+
+    def _open(self, duration):
+        if self.state != OPEN:
+            self.trips += 1
+            logger.warning(f"LLM circuit open for {duration:.0f}s after {self.failures} failures")
+        self.state = OPEN
+        self.opened_at = time.time()
+        self.open_until = self.opened_at + duration
+        self._trial_in_flight = False
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a trial request through."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.open_until - time.time())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in": round(max(0.0, self.open_until - time.time()), 1) if self.state == OPEN else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected
+            }
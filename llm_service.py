@@ -1,7 +1,16 @@
 import os
 import requests
 import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
+from llm_cache import ResponseCache
+from llm_health import HealthMonitor
+from llm_resilience import RetryPolicy, CircuitBreaker, RETRYABLE_STATUSES, parse_retry_after
+from ticket_classifier import get_ticket_classifier
+from singleflight import get_singleflight
+from metrics import LLM, observe_tokens
 
 # Load environment variables
 load_dotenv()
@@ -30,9 +39,24 @@ class LLMService:
             self.provider = "unknown"
         
         print(f"INFO: Using LLM provider: {self.provider} with model: {self.model}")
+        
+        # Response cache keyed on model, messages, temperature and max_tokens
+        self.cache = ResponseCache(
+            max_size=int(os.getenv("LLM_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+            path=os.getenv("LLM_CACHE_PATH") or None
+        )
+        
+        # Per-request timeout; retries and the circuit breaker keep brownouts from piling up workers
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "30"))
+        self.retry_policy = RetryPolicy()
+        self.breaker = CircuitBreaker()
+        
+        # Rolling success/latency of real calls, read by /llm_status
+        self.health = HealthMonitor(breaker=self.breaker)
     
-    def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1000):
-        """Generate a response from the LLM API."""
+    def _build_payload(self, prompt, system_prompt, temperature, max_tokens):
+        """Build the chat completion payload for a prompt."""
         messages = []
         
         # Add system prompt if provided
@@ -43,68 +67,263 @@ class LLMService:
         messages.append({"role": "user", "content": prompt})
         
         # Create payload based on provider
-        payload = {
+        return {
             "model": self.model,
             "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens
         }
-        
+    
+    def _enable_streaming(self, payload):
+        """Ask for a streamed completion whose final chunk carries the token usage."""
+        payload["stream"] = True
+        if self.provider in ["deepseek", "openai"]:
+            # Not every OpenAI-compatible provider accepts stream_options
+            payload["stream_options"] = {"include_usage": True}
+    
+    def _cache_key(self, payload):
+        return self.cache.make_key(
+            payload["model"], payload["messages"], payload["temperature"], payload["max_tokens"]
+        )
+    
+    def _headers(self):
         # Headers with authorization
-        headers = {
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+    
+    def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1000):
+        """Generate a response from the LLM API."""
+        payload = self._build_payload(prompt, system_prompt, temperature, max_tokens)
+        
+        # Serve byte-for-byte repeats from the cache
+        cache_key = self._cache_key(payload)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            print("DEBUG: Serving LLM response from cache")
+            return cached
+        
+        # Identical prompts already in flight wait for that call instead of sending another
+        text, ok = get_singleflight("llm").do(cache_key, self._timed_complete, payload)
+        if ok:
+            self.cache.set(cache_key, text)
+        return text
+    
+    def forget_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1000):
+        """Evict the cached response to a prompt, so the next call asks the provider again."""
+        self.cache.delete(self._cache_key(self._build_payload(prompt, system_prompt, temperature, max_tokens)))
+    
+    def probe(self):
+        """Send a tiny uncached completion to check the provider; returns True if it worked."""
+        _, ok = self._timed_complete(self._build_payload("Test connection", None, 0, 5))
+        return ok
+    
+    def stream_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1000):
+        """Generate a response, yielding text chunks as the provider streams them."""
+        payload = self._build_payload(prompt, system_prompt, temperature, max_tokens)
+        
+        cache_key = self._cache_key(payload)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        if not self.breaker.allow():
+            self.health.record(False, 0.0, "Circuit open")
+            yield circuit_open_message(self.breaker)
+            return
+        
+        self._enable_streaming(payload)
+        chunks = []
+        start = time.time()
+        # What the metrics record once the stream ends, however it ends
+        call = {"status": None, "error": None, "received": 0, "usage": None}
+        # Set by [DONE] or a finish_reason; without either the stream was cut off
+        finished = False
+        try:
+            try:
+                print(f"DEBUG: Sending streaming request to LLM API ({self.provider})")
+                with requests.post(self.api_url, headers=self._headers(), json=payload,
+                                   timeout=self.timeout, stream=True) as response:
+                    call["status"] = response.status_code
+                    if response.status_code != 200:
+                        print(f"ERROR: API returned error: {response.status_code}")
+                        if response.status_code in RETRYABLE_STATUSES:
+                            self.breaker.record_failure(open_for=parse_retry_after(response.headers.get("Retry-After")))
+                        else:
+                            self.breaker.record_success()
+                        self.health.record(False, time.time() - start, f"HTTP {response.status_code}")
+                        yield f"Error: The LLM API returned status code {response.status_code}"
+                        return
+                
+                    # Server-sent events: one "data: {...}" line per chunk
+                    for line in response.iter_lines(decode_unicode=True):
+                        call["received"] += len(line or "")
+                        if not line or not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            finished = True
+                            break
+                        chunk = json.loads(data)
+                        call["usage"] = chunk.get("usage") or call["usage"]
+                        choices = chunk.get("choices") or [{}]
+                        finished = finished or bool(choices[0].get("finish_reason"))
+                        text = (choices[0].get("delta") or {}).get("content")
+                        if text:
+                            chunks.append(text)
+                            yield text
+            except requests.exceptions.ConnectionError as e:
+                call["error"] = e
+                self.breaker.record_failure()
+                self.health.record(False, time.time() - start, "Connection error")
+                yield "Error: Could not connect to the LLM API. Please check your internet connection and API URL."
+                return
+            except requests.exceptions.Timeout as e:
+                call["error"] = e
+                self.breaker.record_failure()
+                self.health.record(False, time.time() - start, "Timeout")
+                yield "Error: Request to LLM API timed out. The service might be overloaded or down."
+                return
+            except json.JSONDecodeError as e:
+                call["error"] = e
+                self.breaker.record_success()
+                self.health.record(False, time.time() - start, "Invalid streamed chunk")
+                yield "Error: Could not parse a streamed chunk from the LLM API."
+                return
+            except GeneratorExit:
+                # The client went away mid-stream; the provider itself was fine
+                self.breaker.record_success()
+                raise
+        
+            if not finished:
+                print("WARNING: LLM stream ended before the provider finished; not caching it")
+                self.breaker.record_failure()
+                self.health.record(False, time.time() - start, "Stream cut off")
+                return
+            self.breaker.record_success()
+            self.health.record(True, time.time() - start)
+            if chunks:
+                self.cache.set(cache_key, "".join(chunks))
+        finally:
+            self._observe(time.time() - start, payload, call["status"], call["error"], call["received"], call["usage"])
+    
+    def _parse_result(self, result):
+        """Extract (text, ok) from a decoded completion response."""
+        # Extract the response text based on provider format
+        if self.provider in ["deepseek", "openai"]:
+            # Both DeepSeek and OpenAI use similar response formats
+            return result["choices"][0]["message"]["content"], True
+        else:
+            # Generic fallback - attempt to extract text from any format
+            print(f"DEBUG: Using generic response parsing for unknown provider")
+            print(f"DEBUG: Response structure: {json.dumps(result)[:200]}...")
+            
+            # Try several common response formats
+            if "choices" in result and len(result["choices"]) > 0:
+                choice = result["choices"][0]
+                if "message" in choice and "content" in choice["message"]:
+                    return choice["message"]["content"], True
+                elif "text" in choice:
+                    return choice["text"], True
+            
+            if "result" in result:
+                return result["result"], True
+            
+            if "response" in result:
+                return result["response"], True
+            
+            # If we can't figure it out, return the raw response
+            return f"Could not parse response. Raw response: {json.dumps(result)[:500]}", False
+    
+    def _timed_complete(self, payload):
+        """_complete, recording the outcome and latency in the health monitor."""
+        start = time.time()
+        text, ok = self._complete(payload)
+        self.health.record(ok, time.time() - start, None if ok else text[:200])
+        return text, ok
+    
+    def _complete(self, payload):
+        """Send a completion request, retrying transient failures; return (text, ok).
+        
+        Retryable statuses and connection errors are retried with jittered
+        exponential backoff, honouring Retry-After. While the circuit breaker
+        is open no request is sent at all.
+        """
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                print("WARNING: LLM circuit breaker is open, failing fast")
+                return circuit_open_message(self.breaker), False
+            
+            text, ok, retryable, retry_after = self._attempt(payload)
+            if ok or not retryable:
+                # The provider answered, even if it rejected this request
+                self.breaker.record_success()
+                return text, ok
+            
+            delay = self.retry_policy.delay(attempt, retry_after)
+            # A long Retry-After keeps every request away for that long
+            self.breaker.record_failure(open_for=retry_after if retry_after and delay is None else None)
+            if delay is None:
+                return text, False
+            attempt += 1
+            print(f"WARNING: LLM request failed ({text}), retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+    
+    def _observe(self, seconds, payload, status=None, error=None, received=0, usage=None):
+        """Record one provider call (and the tokens it reported) in the metrics."""
+        labels = (self.provider, self.model)
+        LLM.observe(labels, seconds, status, error, sent=len(json.dumps(payload)), received=received)
+        observe_tokens(*labels, usage)
+    
+    def _attempt(self, payload):
+        """Send one completion request; return (text, ok, retryable, retry_after)."""
+        headers = self._headers()
         
         try:
             print(f"DEBUG: Sending request to LLM API ({self.provider})")
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=30)
+            started = time.time()
+            try:
+                response = requests.post(self.api_url, headers=headers, json=payload, timeout=self.timeout)
+            except Exception as e:
+                self._observe(time.time() - started, payload, error=e)
+                raise
             
             # Log the response status
             print(f"DEBUG: Received response with status code {response.status_code}")
             
             if response.status_code != 200:
+                self._observe(time.time() - started, payload, response.status_code, received=len(response.content))
                 print(f"ERROR: API returned error: {response.status_code}")
                 print(f"Response text: {response.text[:500]}")
-                return f"Error: The LLM API returned status code {response.status_code}"
+                return (f"Error: The LLM API returned status code {response.status_code}", False,
+                        response.status_code in RETRYABLE_STATUSES,
+                        parse_retry_after(response.headers.get("Retry-After")))
             
             # Parse the response
             result = response.json()
+            self._observe(time.time() - started, payload, response.status_code,
+                          received=len(response.content), usage=result.get("usage"))
             
-            # Extract the response text based on provider format
-            if self.provider in ["deepseek", "openai"]:
-                # Both DeepSeek and OpenAI use similar response formats
-                return result["choices"][0]["message"]["content"]
-            else:
-                # Generic fallback - attempt to extract text from any format
-                print(f"DEBUG: Using generic response parsing for unknown provider")
-                print(f"DEBUG: Response structure: {json.dumps(result)[:200]}...")
-                
-                # Try several common response formats
-                if "choices" in result and len(result["choices"]) > 0:
-                    choice = result["choices"][0]
-                    if "message" in choice and "content" in choice["message"]:
-                        return choice["message"]["content"]
-                    elif "text" in choice:
-                        return choice["text"]
-                
-                if "result" in result:
-                    return result["result"]
-                
-                if "response" in result:
-                    return result["response"]
-                
-                # If we can't figure it out, return the raw response
-                return f"Could not parse response. Raw response: {json.dumps(result)[:500]}"
+            text, ok = self._parse_result(result)
+            return text, ok, False, None
             
         except requests.exceptions.ConnectionError:
-            return "Error: Could not connect to the LLM API. Please check your internet connection and API URL."
+            return "Error: Could not connect to the LLM API. Please check your internet connection and API URL.", False, True, None
         except requests.exceptions.Timeout:
-            return "Error: Request to LLM API timed out. The service might be overloaded or down."
-        except json.JSONDecodeError:
-            return f"Error: Could not parse API response as JSON. Raw response: {response.text[:500]}"
+            return "Error: Request to LLM API timed out. The service might be overloaded or down.", False, True, None
+        except json.JSONDecodeError as e:
+            self._observe(time.time() - started, payload, response.status_code, error=e, received=len(response.content))
+            return f"Error: Could not parse API response as JSON. Raw response: {response.text[:500]}", False, False, None
         except Exception as e:
-            return f"Error: {str(e)}"
+            return f"Error: {str(e)}", False, False, None
+
+def circuit_open_message(breaker):
+    """The error returned instead of calling the provider while the breaker is open."""
+    return (f"Error: The LLM API is failing, so requests are paused for another "
+            f"{breaker.retry_in():.0f}s. Please try again shortly.")
 
 class MockLLM:
     """A fallback LLM service that returns predefined responses."""
@@ -126,6 +345,11 @@ class MockLLM:
         
         else:
             return f"This is a mock response to your query: '{prompt[:50]}...'. The LLM service is not properly configured. Please check your API key and connection."
+    
+    def stream_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1000):
+        """Yield the mock response word by word."""
+        for word in self.generate_response(prompt, system_prompt, temperature, max_tokens).split(" "):
+            yield word + " "
 
 def get_llm_service():
     """Get an LLM service instance, falling back to a mock if needed."""
@@ -135,11 +359,93 @@ def get_llm_service():
         print(f"WARNING: Using MockLLM due to error: {str(e)}")
         return MockLLM()
 
+# The categories categorize_ticket may assign
+TICKET_CATEGORIES = [
+    "Bug",
+    "Feature Request",
+    "Documentation",
+    "Support Request",
+    "Infrastructure",
+    "Security Issue",
+]
+
+# Shared, bounded executor for running independent LLM calls concurrently
+_llm_executor = None
+_llm_executor_lock = threading.Lock()
+
+def get_llm_executor():
+    """Get the shared LLM executor, sized by LLM_MAX_WORKERS."""
+    global _llm_executor
+    if _llm_executor is None:
+        with _llm_executor_lock:
+            if _llm_executor is None:
+                max_workers = int(os.getenv("LLM_MAX_WORKERS", "8"))
+                _llm_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+    return _llm_executor
+
+def run_concurrently(tasks, timeout):
+    """Run named callables on the shared executor under one overall deadline.
+    
+    Returns a tuple of (results, timed_out, errors): results maps each finished
+    task name to its return value, timed_out lists the tasks still running at
+    the deadline and errors maps failed task names to their exception.
+    """
+    executor = get_llm_executor()
+    futures = {name: executor.submit(func) for name, func in tasks.items()}
+    done, _ = wait(futures.values(), timeout=timeout)
+    
+    results = {}
+    timed_out = []
+    errors = {}
+    for name, future in futures.items():
+        if future not in done:
+            # Queued tasks are dropped; running ones finish in the background
+            future.cancel()
+            timed_out.append(name)
+        elif future.exception() is not None:
+            errors[name] = future.exception()
+        else:
+            results[name] = future.result()
+    return results, timed_out, errors
+
 # Helper functions for Jira + LLM integration
 
-def summarize_ticket(llm, ticket_data):
-    """Generate a summary of a Jira ticket using LLM."""
-    prompt = f"""
+def ticket_info_from_issue(issue):
+    """Flatten a Jira issue into the ticket_data dict the helpers below expect."""
+    fields = issue.get("fields", {})
+    return {
+        "summary": fields.get("summary", ""),
+        "description": fields.get("description", ""),
+        "status": (fields.get("status") or {}).get("name", ""),
+        "priority": (fields.get("priority") or {}).get("name", ""),
+        "reporter": (fields.get("reporter") or {}).get("displayName", "")
+    }
+
+def analyze_ticket_parallel(llm, ticket_data, timeout=40):
+    """Run summarize, categorize and respond concurrently under one deadline.
+    
+    Parts that miss the deadline get a timed-out message and are listed
+    under "timed_out" in the returned dict.
+    """
+    results, timed_out, errors = run_concurrently({
+        "summary": lambda: summarize_ticket(llm, ticket_data),
+        "category": lambda: categorize_ticket(llm, ticket_data),
+        "response_suggestion": lambda: generate_response_suggestion(llm, ticket_data)
+    }, timeout=timeout)
+    
+    for part in timed_out:
+        print(f"WARNING: Analysis part '{part}' timed out")
+        results[part] = "Timed out waiting for the LLM. Please try again."
+    for part, error in errors.items():
+        print(f"ERROR: Analysis part '{part}' failed: {error}")
+        results[part] = f"Error: {str(error)}"
+    
+    results["timed_out"] = timed_out
+    return results
+
+def build_summary_prompt(ticket_data):
+    """Build the prompt used by summarize_ticket."""
+    return f"""
     Please provide a concise summary of this Jira ticket:
     
     Title: {ticket_data.get('summary', 'No title')}
@@ -150,15 +456,19 @@ def summarize_ticket(llm, ticket_data):
     
     Provide a 2-3 sentence summary that captures the key points.
     """
+
+def summarize_ticket(llm, ticket_data):
+    """Generate a summary of a Jira ticket using LLM."""
+    prompt = build_summary_prompt(ticket_data)
     
     print(f"DEBUG - Summarize ticket prompt: {prompt[:200]}...")
     response = llm.generate_response(prompt)
     print(f"DEBUG - Summarize ticket response: {response[:200]}...")
     return response
 
-def categorize_ticket(llm, ticket_data):
-    """Categorize a Jira ticket using LLM."""
-    prompt = f"""
+def build_category_prompt(ticket_data):
+    """Build the prompt used by categorize_ticket."""
+    return f"""
     Based on the information below, categorize this Jira ticket into one of the following:
     - Bug
     - Feature Request
@@ -172,12 +482,230 @@ def categorize_ticket(llm, ticket_data):
     
     Reply ONLY with the category name, nothing else.
     """
+
+def categorize_ticket(llm, ticket_data):
+    """Categorize a Jira ticket, with the local classifier when it is confident and the LLM otherwise."""
+    label = get_ticket_classifier().classify(ticket_data)
+    if label is not None:
+        return label
+    result = llm.generate_response(build_category_prompt(ticket_data))
+    learn_category(llm, ticket_data, normalize_category(result))
+    return result
+
+def is_real_llm(llm):
+    """True if answers come from a real provider; the async front end is unwrapped first.
     
-    return llm.generate_response(prompt)
+    MockLLM answers must never be stored or learned from.
+    """
+    return isinstance(getattr(llm, "service", llm), LLMService)
 
-def generate_response_suggestion(llm, ticket_data):
-    """Generate a suggested response for a ticket."""
-    prompt = f"""
+def learn_category(llm, ticket_data, category):
+    """Keep a category the LLM assigned as a training example for the local classifier."""
+    if category is None or not is_real_llm(llm):
+        return
+    try:
+        get_ticket_classifier().record(ticket_data, category)
+    except Exception as e:
+        print(f"WARNING: Could not record category example: {str(e)}")
+
+def normalize_category(label):
+    """Return the canonical spelling of a category label, or None if it is not one of TICKET_CATEGORIES."""
+    if not isinstance(label, str):
+        return None
+    label = label.strip().strip(".").lower()
+    for category in TICKET_CATEGORIES:
+        if label == category.lower():
+            return category
+    return None
+
+def build_category_batch_prompt(tickets, max_description_chars=400):
+    """Build one prompt that categorizes several tickets, given as {ticket_id: ticket_data}."""
+    categories = "\n".join(f"    - {category}" for category in TICKET_CATEGORIES)
+    entries = []
+    for ticket_id, ticket_data in tickets.items():
+        description = " ".join(str(ticket_data.get("description") or "No description").split())
+        if len(description) > max_description_chars:
+            description = description[:max_description_chars - 3] + "..."
+        entries.append(f"    [{ticket_id}] Title: {ticket_data.get('summary') or 'No title'}\n"
+                       f"    Description: {description}")
+    tickets_text = "\n\n".join(entries)
+    return f"""
+    Categorize each of the following Jira tickets into exactly one of these categories:
+{categories}
+
+{tickets_text}
+
+    Reply ONLY with a JSON object that maps every ticket id in square brackets to its category name,
+    for example {{"ABC-1": "Bug", "ABC-2": "Documentation"}}.
+    """
+
+def parse_category_batch(text, ticket_ids):
+    """Parse the labels returned for a batch category prompt.
+
+    Returns {ticket_id: category} for the requested ids that came back with
+    a valid category; missing, unknown and invalid entries are left out.
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        return {}
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+
+    wanted = {str(ticket_id): ticket_id for ticket_id in ticket_ids}
+    labels = {}
+    for key, label in data.items():
+        ticket_id = wanted.get(str(key).strip().strip("[]"))
+        category = normalize_category(label)
+        if ticket_id is not None and category is not None:
+            labels[ticket_id] = category
+    return labels
+
+def categorize_tickets_batch(llm, tickets, batch_size=None, retries=None, timeout=120):
+    """Categorize many tickets with one LLM request per batch of them.
+
+    ``tickets`` maps a stable id (usually the ticket key) to its ticket_data.
+    Batches run concurrently on the shared LLM executor; tickets whose label
+    comes back missing or invalid are retried in new batches, up to
+    ``retries`` times. Returns {ticket_id: category}, with None for tickets
+    that never got a valid label.
+    """
+    if batch_size is None:
+        batch_size = int(os.getenv("CATEGORY_BATCH_SIZE", "20"))
+    if retries is None:
+        retries = int(os.getenv("CATEGORY_BATCH_RETRIES", "1"))
+    batch_size = max(1, batch_size)
+
+    # The local classifier answers what it is confident about
+    classifier = get_ticket_classifier()
+    labels = {}
+    for ticket_id, ticket_data in tickets.items():
+        label = classifier.classify(ticket_data)
+        if label is not None:
+            labels[ticket_id] = label
+    pending = [ticket_id for ticket_id in tickets if ticket_id not in labels]
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+        def categorize(batch):
+            prompt = build_category_batch_prompt({ticket_id: tickets[ticket_id] for ticket_id in batch})
+            # About a dozen tokens per label plus the braces
+            response = llm.generate_response(prompt, temperature=0.1, max_tokens=20 + 15 * len(batch))
+            return parse_category_batch(response, batch)
+
+        results, timed_out, errors = run_concurrently(
+            {index: (lambda batch=batch: categorize(batch)) for index, batch in enumerate(batches)},
+            timeout=timeout
+        )
+        for index in timed_out:
+            print(f"WARNING: Category batch {index + 1} of {len(batches)} timed out")
+        for index, error in errors.items():
+            print(f"ERROR: Category batch {index + 1} of {len(batches)} failed: {error}")
+        for batch_labels in results.values():
+            labels.update(batch_labels)
+            for ticket_id, category in batch_labels.items():
+                learn_category(llm, tickets[ticket_id], category)
+
+        pending = [ticket_id for ticket_id in pending if ticket_id not in labels]
+        if pending:
+            print(f"DEBUG: {len(pending)} tickets without a valid category after attempt {attempt + 1}")
+
+    return {ticket_id: labels.get(ticket_id) for ticket_id in tickets}
+
+def parse_analysis_bundle(text):
+    """Parse and validate the JSON returned for an analysis bundle prompt.
+    
+    Raises ValueError if the text is not a JSON object with non-empty
+    summary, category and response_suggestion strings, or if the category
+    is not one of TICKET_CATEGORIES.
+    """
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("No JSON object found in LLM response")
+    
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON in LLM response: {e}")
+    
+    bundle = {}
+    for key in ("summary", "category", "response_suggestion"):
+        value = data.get(key) if isinstance(data, dict) else None
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"Missing or empty '{key}' in LLM response")
+        bundle[key] = value.strip()
+    
+    # Normalise the category to the canonical spelling
+    for category in TICKET_CATEGORIES:
+        if bundle["category"].lower() == category.lower():
+            bundle["category"] = category
+            break
+    else:
+        raise ValueError(f"Unknown category '{bundle['category']}' in LLM response")
+    
+    return bundle
+
+def build_bundle_prompt(ticket_data):
+    """Build the single prompt used by analyze_ticket_bundle."""
+    categories = "\n".join(f"    - {category}" for category in TICKET_CATEGORIES)
+    return f"""
+    Analyze this Jira ticket:
+    
+    Title: {ticket_data.get('summary', 'No title')}
+    Description: {ticket_data.get('description', 'No description')}
+    Status: {ticket_data.get('status', 'Unknown')}
+    Priority: {ticket_data.get('priority', 'Unknown')}
+    Reporter: {ticket_data.get('reporter', 'Unknown')}
+    
+    Reply ONLY with a JSON object with these keys:
+    - "summary": a 2-3 sentence summary that captures the key points
+    - "category": exactly one of the following:
+{categories}
+    - "response_suggestion": a helpful, professional response that acknowledges the issue, provides next steps if possible, and maintains a helpful tone
+    """
+
+def analyze_ticket_bundle(llm, ticket_data, fallback=None):
+    """Summarize, categorize and draft a response for a ticket in one LLM call.
+    
+    If the response cannot be parsed, falls back to ``fallback(llm, ticket_data)``
+    or, when no fallback is given, to the separate three-call path.
+    """
+    response = llm.generate_response(build_bundle_prompt(ticket_data))
+    try:
+        bundle = parse_analysis_bundle(response)
+        learn_category(llm, ticket_data, bundle["category"])
+        return bundle
+    except ValueError as e:
+        print(f"WARNING: Analysis bundle could not be parsed ({e}), falling back to separate calls")
+    
+    if fallback is not None:
+        return fallback(llm, ticket_data)
+    return {
+        "summary": summarize_ticket(llm, ticket_data),
+        "category": categorize_ticket(llm, ticket_data),
+        "response_suggestion": generate_response_suggestion(llm, ticket_data)
+    }
+
+def run_ticket_analysis(llm, ticket_data, mode="parallel", timeout=40):
+    """Run the ticket analysis pipeline in the given mode ("parallel" or "bundle")."""
+    if mode == "bundle":
+        # One structured prompt, falling back to the concurrent three-call path
+        return analyze_ticket_bundle(
+            llm, ticket_data,
+            fallback=lambda llm, info: analyze_ticket_parallel(llm, info, timeout=timeout)
+        )
+    return analyze_ticket_parallel(llm, ticket_data, timeout=timeout)
+
+def build_response_prompt(ticket_data):
+    """Build the prompt used by generate_response_suggestion."""
+    return f"""
     Please draft a helpful, professional response to this Jira ticket:
     
     Title: {ticket_data.get('summary', 'No title')}
@@ -187,20 +715,38 @@ def generate_response_suggestion(llm, ticket_data):
     
     The response should acknowledge the issue, provide next steps if possible, and maintain a helpful tone.
     """
-    
-    return llm.generate_response(prompt)
+
+def generate_response_suggestion(llm, ticket_data):
+    """Generate a suggested response for a ticket."""
+    return llm.generate_response(build_response_prompt(ticket_data))
+
+def format_stat(value):
+    """Render a statistic for a prompt: {label: count} mappings become "label: count" lists."""
+    if isinstance(value, dict):
+        return ", ".join(f"{label}: {count}" for label, count in value.items()) or "No data"
+    return value
 
 def analyze_project_tickets(llm, project_stats):
     """Generate insights about a project based on ticket data."""
+    throughput = project_stats.get("throughput") or {}
+    sample_note = ""
+    if project_stats.get("truncated"):
+        sample_note = f" (newest of {project_stats.get('matching_tickets')} in the project)"
     prompt = f"""
     Based on the following Jira project statistics, provide 3-5 key insights and recommendations:
     
     Project: {project_stats.get('name', 'Unknown')}
-    Total Tickets: {project_stats.get('total_tickets', 0)}
+    Total Tickets: {project_stats.get('total_tickets', 0)}{sample_note}
     Open Tickets: {project_stats.get('open_tickets', 0)}
     Tickets by Priority:
-    {project_stats.get('priority_breakdown', 'No data')}
+    {format_stat(project_stats.get('priority_breakdown', 'No data'))}
+    Open Tickets by Priority: {format_stat(project_stats.get('open_by_priority', 'No data'))}
+    Open Tickets by Assignee: {format_stat(project_stats.get('open_by_assignee', 'No data'))}
     Average Resolution Time: {project_stats.get('avg_resolution_time', 'Unknown')}
+    Resolution Time Percentiles (hours): {format_stat(project_stats.get('resolution_hours', 'No data'))}
+    Open Ticket Age Percentiles (days): {format_stat(project_stats.get('open_age_days', 'No data'))}
+    Created per Week (oldest first): {throughput.get('created', 'No data')}
+    Resolved per Week (oldest first): {throughput.get('resolved', 'No data')}
     
     Focus on identifying patterns, bottlenecks, and suggestions for improving project health.
     """
@@ -0,0 +1,208 @@
+"""Request metrics exported in the Prometheus text format at /metrics.
+
+Counters and latency histograms are kept per route and per outbound
+dependency (Jira endpoint, LLM provider and model), together with payload
+sizes and the token counts the LLM provider reports in ``usage``.
+
+Metrics live in the memory of this process; with several workers each one
+exports its own and Prometheus adds them up by instance.
+"""
+import bisect
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) of the latency buckets; LLM calls need the long tail
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), value=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def value(self, labels=()):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in values]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, description, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count))
+                            for labels, (counts, total, count) in self._series.items())
+        lines = []
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    """The metrics of this process, in registration order."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, description, labelnames=()):
+        return self.register(Counter(name, description, labelnames))
+
+    def histogram(self, name, description, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, description, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class DependencyMetrics:
+    """Count, errors, latency and payload bytes of the calls to one outbound dependency."""
+
+    def __init__(self, registry, prefix, description, labelnames):
+        labelnames = tuple(labelnames)
+        self.requests = registry.counter(
+            f"{prefix}_requests_total", f"{description} requests by response status", labelnames + ("status",))
+        self.errors = registry.counter(
+            f"{prefix}_request_errors_total", f"{description} requests that failed, by status or exception",
+            labelnames + ("reason",))
+        self.latency = registry.histogram(
+            f"{prefix}_request_duration_seconds", f"{description} request latency", labelnames)
+        self.sent = registry.counter(
+            f"{prefix}_request_bytes_total", f"{description} request body bytes sent", labelnames)
+        self.received = registry.counter(
+            f"{prefix}_response_bytes_total", f"{description} response body bytes received", labelnames)
+
+    def observe(self, labels, seconds, status=None, error=None, sent=0, received=0):
+        """Record one call: its HTTP status, or the exception it raised."""
+        self.requests.inc(labels + (str(status) if status is not None else "error",))
+        if error is not None:
+            self.errors.inc(labels + (type(error).__name__,))
+        elif status is not None and status >= 400:
+            self.errors.inc(labels + (str(status),))
+        self.latency.observe(seconds, labels)
+        if sent:
+            self.sent.inc(labels, sent)
+        if received:
+            self.received.inc(labels, received)
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "Requests served, by route, method and status", ("route", "method", "status"))
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Time to produce a response, by route and method", ("route", "method"))
+HTTP_RECEIVED = registry.counter(
+    "http_request_bytes_total", "Request body bytes received, by route", ("route",))
+HTTP_SENT = registry.counter(
+    "http_response_bytes_total", "Response body bytes sent, by route", ("route",))
+
+JIRA = DependencyMetrics(registry, "jira", "Jira API", ("endpoint", "method"))
+LLM = DependencyMetrics(registry, "llm", "LLM provider", ("provider", "model"))
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Tokens reported by the LLM provider, by kind (prompt or completion)",
+    ("provider", "model", "kind"))
+
+
+def observe_http(route, method, status, seconds, received=0, sent=0):
+    """Record one served request; unmatched URLs share the route "unmatched"."""
+    route = route or "unmatched"
+    HTTP_REQUESTS.inc((route, method, str(status)))
+    HTTP_LATENCY.observe(seconds, (route, method))
+    if received:
+        HTTP_RECEIVED.inc((route,), received)
+    if sent:
+        HTTP_SENT.inc((route,), sent)
+
+
+def observe_tokens(provider, model, usage):
+    """Add the prompt/completion token counts of a provider ``usage`` object."""
+    if not isinstance(usage, dict):
+        return
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if isinstance(tokens, int) and tokens > 0:
+            LLM_TOKENS.inc((provider, model, kind), tokens)
+
+
+def render():
+    return registry.render()
@@ -0,0 +1,154 @@
+"""Project statistics computed over NumPy columns.
+
+Tickets are loaded once into column arrays (created/resolved epoch seconds
+and category codes for status, priority and assignee) and every statistic
+is a vectorized operation over those columns, so a 100k-ticket project
+takes milliseconds rather than a Python loop per ticket.
+
+NumPy is optional; without it ``numpy_available`` is False and callers
+should report that statistics are unavailable.
+"""
+import time
+import logging
+
+try:
+    import numpy as np
+    numpy_available = True
+except ImportError:
+    np = None
+    numpy_available = False
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Column name -> JSON path of the value inside a mirrored issue
+STATS_COLUMNS = [
+    ("created", "$.fields.created"),
+    ("resolved", "$.fields.resolutiondate"),
+    ("status", "$.fields.status.name"),
+    ("priority", "$.fields.priority.name"),
+    ("assignee", "$.fields.assignee.displayName"),
+]
+STATS_PATHS = [path for name, path in STATS_COLUMNS]
+# Jira fields to request when the tickets come from a live search instead
+STATS_FIELDS = ["created", "resolutiondate", "status", "priority", "assignee"]
+
+WEEK = 7 * 86400
+
+
+def issue_row(issue):
+    """The STATS_COLUMNS values of a Jira issue, in order."""
+    fields = issue.get("fields") or {}
+    return (
+        fields.get("created"),
+        fields.get("resolutiondate"),
+        (fields.get("status") or {}).get("name"),
+        (fields.get("priority") or {}).get("name"),
+        (fields.get("assignee") or {}).get("displayName"),
+    )
+
+
+def parse_timestamps(values):
+    """Jira timestamps ("2024-01-31T09:15:00.000+0100") to UTC epoch seconds; NaN where missing."""
+    text = np.array([value if isinstance(value, str) else "" for value in values], dtype="U28")
+    result = np.full(len(text), np.nan)
+    present = np.char.str_len(text) >= 10
+    if not present.any():
+        return result
+    stamps = text[present]
+    local = stamps.astype("U19").astype("datetime64[s]").astype(np.int64)
+
+    # Read the "+hhmm" offset straight from the code points of each string
+    chars = stamps.view(np.uint32).reshape(len(stamps), 28)
+    digits = chars.astype(np.int64) - ord("0")
+    sign = np.where(chars[:, 23] == ord("-"), -1, np.where(chars[:, 23] == ord("+"), 1, 0))
+    offset = sign * ((digits[:, 24] * 10 + digits[:, 25]) * 3600 + (digits[:, 26] * 10 + digits[:, 27]) * 60)
+    result[present] = local - offset
+    return result
+
+
+def encode(values, missing):
+    """Category codes for values; returns (labels, codes) with missing values labelled ``missing``."""
+    labels, codes = np.unique(np.array([value or missing for value in values], dtype=str), return_inverse=True)
+    return labels, codes.reshape(-1)
+
+
+def breakdown(labels, codes, mask=None, top=None):
+    """{label: count} for the coded column, largest first, optionally only where mask is set."""
+    counts = np.bincount(codes if mask is None else codes[mask], minlength=len(labels))
+    order = np.argsort(-counts, kind="stable")[:top]
+    return {str(labels[i]): int(counts[i]) for i in order if counts[i]}
+
+
+class TicketColumns:
+    """A project's tickets as NumPy columns."""
+
+    def __init__(self, rows):
+        created, resolved, status, priority, assignee = zip(*rows) if rows else ((),) * 5
+        self.created = parse_timestamps(created)
+        self.resolved = parse_timestamps(resolved)
+        self.status_labels, self.status = encode(status, "No status")
+        self.priority_labels, self.priority = encode(priority, "No priority")
+        self.assignee_labels, self.assignee = encode(assignee, "Unassigned")
+
+    def __len__(self):
+        return len(self.created)
+
+
+def _percentiles(values, points=(50, 75, 90, 95)):
+    if not len(values):
+        return {}
+    result = {f"p{point}": round(float(value), 1) for point, value in zip(points, np.percentile(values, points))}
+    result["mean"] = round(float(values.mean()), 1)
+    return result
+
+
+def compute_project_stats(columns, name=None, now=None, weeks=12):
+    """Breakdowns, resolution-time percentiles and weekly throughput of a project.
+
+    A ticket counts as open until it has a resolution date. The result is
+    plain JSON-serializable data in the shape analyze_project_tickets expects.
+    """
+    started = time.perf_counter()
+    if now is None:
+        now = time.time()
+
+    has_created = ~np.isnan(columns.created)
+    resolved = ~np.isnan(columns.resolved)
+    open_ = ~resolved
+
+    hours = (columns.resolved - columns.created)[resolved & has_created] / 3600
+    hours = hours[hours >= 0]
+    open_age_days = (now - columns.created[open_ & has_created]) / 86400
+
+    edges = now - np.arange(weeks, -1, -1) * WEEK
+    created_per_week = np.histogram(columns.created[has_created], bins=edges)[0]
+    resolved_per_week = np.histogram(columns.resolved[resolved], bins=edges)[0]
+
+    resolution = _percentiles(hours)
+    if resolution:
+        avg_resolution_time = (f"{resolution['mean'] / 24:.1f} days "
+                               f"(median {resolution['p50'] / 24:.1f}, p90 {resolution['p90'] / 24:.1f})")
+    else:
+        avg_resolution_time = "Unknown"
+
+    stats = {
+        "name": name or "Unknown",
+        "total_tickets": len(columns),
+        "open_tickets": int(open_.sum()),
+        "resolved_tickets": int(resolved.sum()),
+        "status_breakdown": breakdown(columns.status_labels, columns.status),
+        "priority_breakdown": breakdown(columns.priority_labels, columns.priority),
+        "open_by_priority": breakdown(columns.priority_labels, columns.priority, open_),
+        "open_by_assignee": breakdown(columns.assignee_labels, columns.assignee, open_, top=10),
+        "resolution_hours": resolution,
+        "avg_resolution_time": avg_resolution_time,
+        "open_age_days": _percentiles(open_age_days),
+        "throughput": {
+            "weeks": [time.strftime("%Y-%m-%d", time.gmtime(edge)) for edge in edges[:-1]],
+            "created": [int(count) for count in created_per_week],
+            "resolved": [int(count) for count in resolved_per_week],
+        },
+    }
+    stats["compute_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return stats
@@ -0,0 +1,134 @@
+import os
+import re
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words that say nothing about which tickets matter most
+IGNORED_TERMS = {
+    "show", "find", "list", "get", "all", "the", "a", "an", "any", "me", "my", "of", "in", "for",
+    "on", "to", "and", "or", "with", "is", "are", "that", "which", "what", "ticket", "tickets",
+    "issue", "issues", "project", "please",
+}
+
+
+def estimate_tokens(text):
+    """Approximate the BPE token count of text without a tokenizer.
+
+    Words cost about one token per four characters and every punctuation
+    mark costs one, which tracks the provider's counts closely enough for
+    budgeting.
+    """
+    if not text:
+        return 0
+    return sum((len(token) + 3) // 4 if token[0].isalnum() or token[0] == "_" else 1
+               for token in TOKEN_PATTERN.findall(text))
+
+
+def truncate(value, max_chars):
+    """Shorten a string to max_chars, marking the cut with an ellipsis."""
+    if len(value) <= max_chars:
+        return value
+    return value[:max_chars - 1].rstrip() + "…"
+
+
+def ticket_row(issue):
+    """Flatten a Jira issue into {column: text} for the columns the analysis uses."""
+    fields = issue.get("fields") or {}
+    row = {
+        "key": issue.get("key"),
+        "summary": fields.get("summary"),
+        "status": (fields.get("status") or {}).get("name"),
+        "priority": (fields.get("priority") or {}).get("name"),
+        "assignee": (fields.get("assignee") or {}).get("displayName"),
+        "reporter": (fields.get("reporter") or {}).get("displayName"),
+        # Dates only; the time of day does not change the analysis
+        "created": (fields.get("created") or "")[:10] or None,
+        "updated": (fields.get("updated") or "")[:10] or None,
+    }
+    return {column: value for column, value in row.items() if value}
+
+
+class PromptPacker:
+    """Fit the most relevant rows into a token budget as a compact table.
+
+    Rows are ranked by how many request terms they contain (ties keep the
+    input order, i.e. Jira's sort), long values are truncated, columns that
+    are empty in every packed row are dropped and the rest are written as
+    one pipe-separated line per row. Rows are taken in rank order, skipping
+    any that would overflow the budget.
+    """
+
+    def __init__(self, budget_tokens=None, max_field_chars=None):
+        if budget_tokens is None:
+            budget_tokens = int(os.getenv("ANALYSIS_PROMPT_TOKENS", "3000"))
+        if max_field_chars is None:
+            max_field_chars = int(os.getenv("ANALYSIS_MAX_FIELD_CHARS", "120"))
+        self.budget_tokens = budget_tokens
+        self.max_field_chars = max_field_chars
+
+    @staticmethod
+    def relevance(row, terms):
+        """Number of request terms that appear in the row."""
+        if not terms:
+            return 0
+        words = set(WORD_PATTERN.findall(" ".join(row.values()).lower()))
+        return len(terms & words)
+
+    def rank(self, rows, request):
+        terms = set(WORD_PATTERN.findall((request or "").lower())) - IGNORED_TERMS
+        order = sorted(range(len(rows)), key=lambda i: (-self.relevance(rows[i], terms), i))
+        return [rows[i] for i in order]
+
+    @staticmethod
+    def _columns(rows):
+        return [column for column in ("key", "summary", "status", "priority", "assignee",
+                                      "reporter", "created", "updated")
+                if any(column in row for row in rows)]
+
+    @staticmethod
+    def _line(row, columns):
+        return "|".join(row.get(column, "").replace("|", "/").replace("\n", " ") for column in columns)
+
+    def _encode(self, rows):
+        columns = self._columns(rows)
+        return "\n".join(["|".join(columns)] + [self._line(row, columns) for row in rows])
+
+    def pack(self, rows, request=None, reserved_tokens=0):
+        """Pack rows into a table; returns (table_text, stats).
+
+        ``reserved_tokens`` is the size of the surrounding prompt, which
+        comes out of the same budget.
+        """
+        rows = [{column: truncate(str(value), self.max_field_chars) for column, value in row.items()}
+                for row in rows]
+        ranked = self.rank(rows, request)
+
+        # Costed against every column any row has; the final table only keeps
+        # the columns of the rows that made it in, so it can only be smaller
+        columns = self._columns(ranked)
+        used = reserved_tokens + estimate_tokens("|".join(columns))
+        packed = []
+        for row in ranked:
+            cost = estimate_tokens(self._line(row, columns)) + 1
+            if used + cost > self.budget_tokens:
+                # Keep going: a shorter row further down may still fit
+                continue
+            packed.append(row)
+            used += cost
+        text = self._encode(packed) if packed else ""
+
+        stats = {
+            "tickets_included": len(packed),
+            "tickets_dropped": len(rows) - len(packed),
+            "tokens_used": estimate_tokens(text) + reserved_tokens,
+            "token_budget": self.budget_tokens
+        }
+        if stats["tickets_dropped"]:
+            logger.info(f"Prompt packer dropped {stats['tickets_dropped']} of {len(rows)} rows to fit "
+                        f"{self.budget_tokens} tokens")
+        return text, stats
@@ -0,0 +1,119 @@
+"""In-process coalescing of identical concurrent calls ("singleflight").
+
+When several callers ask for the same key while a call for it is still in
+flight, only the first one (the leader) does the work; the others wait for
+it and get the same result or exception. Nothing is kept once the call
+finishes, so this only removes duplicate concurrent work and never serves
+stale data; caching stays with the response caches.
+
+Results are shared between callers, so they must be treated as read-only.
+"""
+import asyncio
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight call that followers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key, from threads or from asyncio."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._async_inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return fn(*args, **kwargs), sharing the call with concurrent callers of the same key."""
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._inflight[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs), sharing the call with concurrent callers of the same key.
+
+        The shared call runs as its own task, so a caller that is cancelled
+        (a timed-out analysis part, a closed stream) does not cancel it for
+        the others.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.calls += 1
+            task = self._async_inflight.get((loop, key))
+            if task is None:
+                task = loop.create_task(fn(*args, **kwargs))
+                self._async_inflight[(loop, key)] = task
+                task.add_done_callback(lambda finished: self._async_done(loop, key, finished))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _async_done(self, loop, key, task):
+        with self._lock:
+            self._async_inflight.pop((loop, key), None)
+        # Retrieve the exception so an error nobody waited for is not reported as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "coalesced_rate": round(self.coalesced / self.calls, 3) if self.calls else 0.0,
+                "in_flight": len(self._inflight) + len(self._async_inflight)
+            }
+
+
+# One group per kind of call ("jira", "llm"), shared by all threads of this worker
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_singleflight(name):
+    """Get the worker-wide coalescing group for a kind of call."""
+    group = _groups.get(name)
+    if group is None:
+        with _groups_lock:
+            group = _groups.setdefault(name, SingleFlight(name))
+    return group
@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+from batch_analysis import TokenBudget, is_complete, should_store
+from llm_service import MockLLM
+
+COMPLETE = {"summary": "Login fails", "category": "Bug", "response_suggestion": "Thanks, we are on it.",
+            "timed_out": []}
+
+
+class TokenBudgetTest(unittest.TestCase):
+
+    def test_spends_up_to_the_budget(self):
+        budget = TokenBudget(100)
+        self.assertTrue(budget.acquire(60))
+        self.assertTrue(budget.acquire(40))
+        cancelled = threading.Event()
+        threading.Timer(0.2, cancelled.set).start()
+        started = time.time()
+        self.assertFalse(budget.acquire(1, cancelled=cancelled.is_set))
+        self.assertGreaterEqual(time.time() - started, 0.15)
+
+    def test_recorded_tokens_count(self):
+        budget = TokenBudget(100)
+        budget.record(100)
+        self.assertFalse(budget.acquire(1, cancelled=lambda: True))
+
+    def test_old_spend_leaves_the_window(self):
+        budget = TokenBudget(100)
+        budget.acquire(100)
+        budget._spent[0] = (time.time() - 61, 100)
+        self.assertTrue(budget.acquire(100, cancelled=lambda: False))
+
+    def test_oversized_request_gets_through_alone(self):
+        self.assertTrue(TokenBudget(100).acquire(500))
+
+    def test_zero_disables_the_limit(self):
+        budget = TokenBudget(0)
+        budget.record(10 ** 9)
+        self.assertTrue(budget.acquire(10 ** 9))
+
+
+class IsCompleteTest(unittest.TestCase):
+
+    def test_complete_analysis(self):
+        self.assertTrue(is_complete(COMPLETE))
+
+    def test_failed_parts_are_not_complete(self):
+        self.assertFalse(is_complete(dict(COMPLETE, timed_out=["summary"])))
+        self.assertFalse(is_complete(dict(COMPLETE, summary="Error: HTTP 500")))
+        self.assertFalse(is_complete(dict(COMPLETE, category="Could not parse response. Raw response: {}")))
+        self.assertFalse(is_complete(dict(COMPLETE, response_suggestion=None)))
+        self.assertFalse(is_complete(dict(COMPLETE, error="Failed to fetch ticket")))
+
+    def test_mock_answers_are_never_stored(self):
+        self.assertFalse(should_store(MockLLM(), COMPLETE))
+
+
+if __name__ == "__main__":
+    unittest.main()
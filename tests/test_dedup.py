@@ -0,0 +1,68 @@
+import unittest
+from dedup import DuplicateIndex, find_reusable_analysis, issue_sort_key, minhash, similarity
+
+LOGIN = "Login page shows a blank screen after entering the password on Firefox"
+LOGIN_AGAIN = "Login page shows a blank screen after entering the password on Firefox!!"
+PAYMENT = "Payment gateway returns HTTP 502 when the basket contains more than ten items"
+
+
+class FakeStore:
+
+    def __init__(self, analyses):
+        self.analyses = analyses
+
+    def get(self, jira_url, pat, key):
+        return self.analyses.get(key)
+
+
+class MinHashTest(unittest.TestCase):
+
+    def test_signatures_estimate_similarity(self):
+        self.assertEqual(minhash(LOGIN), minhash(LOGIN_AGAIN))
+        self.assertEqual(similarity(minhash(LOGIN), minhash(LOGIN)), 1.0)
+        self.assertLess(similarity(minhash(LOGIN), minhash(PAYMENT)), 0.2)
+
+    def test_empty_text_has_no_signature(self):
+        self.assertIsNone(minhash(""))
+        self.assertIsNone(minhash("  ...  "))
+
+
+class DuplicateIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = DuplicateIndex(threshold=0.6)
+        self.index.add("WEB-10", LOGIN)
+        self.index.add("WEB-2", LOGIN_AGAIN)
+        self.index.add("WEB-3", PAYMENT)
+
+    def test_query_finds_near_duplicates(self):
+        self.assertEqual([key for key, _ in self.index.query(LOGIN, exclude="WEB-10")], ["WEB-2"])
+        self.assertEqual(self.index.query("Something else entirely about release notes"), [])
+
+    def test_clusters_start_with_the_oldest_ticket(self):
+        self.assertEqual(self.index.clusters(), [{"keys": ["WEB-2", "WEB-10"], "similarity": 1.0}])
+        self.assertEqual(self.index.clusters(keys=["WEB-3"]), [])
+
+    def test_re_adding_replaces_and_remove_forgets(self):
+        self.index.add("WEB-2", PAYMENT)
+        self.assertEqual([key for key, _ in self.index.query(PAYMENT, exclude="WEB-3")], ["WEB-2"])
+        self.index.remove("WEB-2")
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.clusters(), [])
+
+    def test_reuses_only_original_analyses(self):
+        store = FakeStore({
+            "WEB-2": {"summary": "copied", "duplicate_of": "WEB-1"},
+        })
+        self.assertIsNone(find_reusable_analysis(self.index, "WEB-10", LOGIN, store, "url", "pat"))
+        store.analyses["WEB-2"] = {"summary": "original"}
+        self.assertEqual(find_reusable_analysis(self.index, "WEB-10", LOGIN, store, "url", "pat"),
+                         ("WEB-2", {"summary": "original"}))
+        self.assertIsNone(find_reusable_analysis(None, "WEB-10", LOGIN, store, "url", "pat"))
+
+    def test_issue_sort_key(self):
+        self.assertEqual(sorted(["ABC-100", "ABC-12", "ABC-9"], key=issue_sort_key), ["ABC-9", "ABC-12", "ABC-100"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from jira_client import IssuePager
+
+
+class FakeClient:
+    """Answers searches from a list of issues, like Jira's startAt paging."""
+
+    def __init__(self, count, short_pages=False):
+        self.issues = [{"key": f"TEST-{number}"} for number in range(count)]
+        self.short_pages = short_pages
+        self.requests = []
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=2)
+
+    def search(self, pat, jql, max_results=50, start_at=0, fields=None, expand=None):
+        self.requests.append((start_at, max_results))
+        if self.short_pages:
+            # Jira may cap maxResults below what was asked for
+            max_results = min(max_results, 3)
+        return {"total": len(self.issues), "issues": self.issues[start_at:start_at + max_results]}
+
+
+class IssuePagerTest(unittest.TestCase):
+
+    def pager(self, client, **kwargs):
+        return IssuePager(client, "pat", "project = TEST", **kwargs)
+
+    def test_walks_every_page(self):
+        for prefetch in (False, True):
+            client = FakeClient(12)
+            pager = self.pager(client, page_size=5, prefetch=prefetch)
+            self.assertEqual([issue["key"] for issue in pager], [f"TEST-{n}" for n in range(12)])
+            self.assertEqual(pager.total, 12)
+            self.assertFalse(pager.truncated)
+            self.assertEqual([start for start, _ in client.requests], [0, 5, 10])
+
+    def test_limit_truncates(self):
+        client = FakeClient(12)
+        pager = self.pager(client, page_size=5, limit=7, prefetch=False)
+        self.assertEqual(len(list(pager)), 7)
+        self.assertTrue(pager.truncated)
+        self.assertEqual(pager.total, 12)
+        # The last page only asks for what the limit leaves
+        self.assertEqual(client.requests, [(0, 5), (5, 2)])
+
+    def test_limit_above_total_is_not_truncated(self):
+        pager = self.pager(FakeClient(4), page_size=5, limit=10, prefetch=False)
+        self.assertEqual(len(list(pager)), 4)
+        self.assertFalse(pager.truncated)
+
+    def test_stopping_early_is_truncated(self):
+        pager = self.pager(FakeClient(12), page_size=5, prefetch=True)
+        for number, _ in enumerate(pager):
+            if number == 2:
+                break
+        self.assertTrue(pager.truncated)
+
+    def test_short_pages_advance_by_what_was_returned(self):
+        client = FakeClient(8, short_pages=True)
+        pager = self.pager(client, page_size=5, prefetch=False)
+        self.assertEqual(len(list(pager)), 8)
+        self.assertEqual([start for start, _ in client.requests], [0, 3, 6])
+
+    def test_empty_result(self):
+        pager = self.pager(FakeClient(0), prefetch=False)
+        self.assertEqual(list(pager), [])
+        self.assertEqual(pager.total, 0)
+        self.assertFalse(pager.truncated)
+
+
+if __name__ == "__main__":
+    unittest.main()
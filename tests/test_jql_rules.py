@@ -0,0 +1,61 @@
+import unittest
+from jql_rules import RuleBasedJQLCompiler, normalize_request
+
+
+class RuleBasedJQLCompilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.compiler = RuleBasedJQLCompiler()
+
+    def test_translates_common_shapes(self):
+        self.assertEqual(
+            self.compiler.compile("show me high priority bugs in WEB project", ["WEB"]),
+            'project = "WEB" AND priority in ("High", "Highest") AND issuetype = Bug ORDER BY created DESC'
+        )
+        self.assertEqual(
+            self.compiler.compile("my open tickets"),
+            "assignee = currentUser() AND resolution = Unresolved ORDER BY created DESC"
+        )
+        self.assertEqual(
+            self.compiler.compile("bugs updated in the last 3 days"),
+            "issuetype = Bug AND updated >= -3d ORDER BY created DESC"
+        )
+
+    def test_bare_known_key_is_the_project(self):
+        self.assertEqual(
+            self.compiler.compile("unassigned ops tasks", ["OPS"]),
+            'project = "OPS" AND assignee is EMPTY AND issuetype = Task ORDER BY created DESC'
+        )
+
+    def test_unknown_project_falls_back(self):
+        self.assertIsNone(self.compiler.compile("bugs in Website project", ["WEB"]))
+        self.assertIsNone(self.compiler.compile("project with bugs", ["WEB"]))
+
+    def test_leftover_words_fall_back(self):
+        self.assertIsNone(self.compiler.compile("bugs about the login page"))
+        self.assertIsNone(self.compiler.compile("tickets John closed yesterday"))
+
+    def test_nothing_understood_falls_back(self):
+        self.assertIsNone(self.compiler.compile("show me all tickets"))
+        self.assertIsNone(self.compiler.compile(""))
+
+    def test_hit_rate(self):
+        self.compiler.compile("open bugs")
+        self.compiler.compile("bugs about the login page")
+        self.assertEqual(self.compiler.stats(), {"attempts": 2, "hits": 1, "hit_rate": 0.5})
+
+
+class NormalizeRequestTest(unittest.TestCase):
+
+    def test_drops_filler_and_punctuation(self):
+        self.assertEqual(normalize_request("Show me ALL the open Bugs, please!"), "me open bugs")
+
+    def test_upper_cases_known_keys(self):
+        self.assertEqual(
+            normalize_request("open bugs in web", ["WEB"]),
+            normalize_request("Open bugs in WEB", ["WEB"])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
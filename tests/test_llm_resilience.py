@@ -0,0 +1,89 @@
+import time
+import unittest
+from email.utils import formatdate
+from llm_resilience import CircuitBreaker, RetryPolicy, parse_retry_after, CLOSED, OPEN, HALF_OPEN
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    def expire(self):
+        """Pretend the open period is over."""
+        self.breaker.open_until = time.time() - 1
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()["trips"], 1)
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_lets_one_trial_through(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.expire()
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+
+    def test_trial_success_closes(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.expire()
+        self.breaker.allow()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+
+    def test_trial_failure_opens_again(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.expire()
+        self.breaker.allow()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertGreater(self.breaker.retry_in(), 0)
+
+    def test_retry_after_opens_at_once_for_that_long(self):
+        self.breaker.record_failure(open_for=120)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertGreater(self.breaker.retry_in(), 60)
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_backoff_stays_within_the_cap(self):
+        policy = RetryPolicy(max_retries=3, base_delay=0.5, max_delay=2)
+        for attempt in range(3):
+            self.assertTrue(0 <= policy.delay(attempt) <= 2)
+        self.assertIsNone(policy.delay(3))
+
+    def test_retry_after_is_honoured_up_to_the_cap(self):
+        policy = RetryPolicy(max_retries=2, base_delay=0.5, max_delay=8)
+        self.assertEqual(policy.delay(0, retry_after=3), 3)
+        self.assertIsNone(policy.delay(0, retry_after=30))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("5"), 5.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertAlmostEqual(parse_retry_after(formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
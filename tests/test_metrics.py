@@ -0,0 +1,58 @@
+import unittest
+from metrics import Registry, DependencyMetrics
+
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_samples(self):
+        counter = self.registry.counter("requests_total", "Requests", ("route", "status"))
+        counter.inc(("/a", "200"))
+        counter.inc(("/a", "200"), 2)
+        counter.inc(('/"b"', "500"))
+        self.assertEqual(counter.value(("/a", "200")), 3)
+        self.assertEqual(counter.samples(), [
+            'requests_total{route="/\\"b\\"",status="500"} 1',
+            'requests_total{route="/a",status="200"} 3',
+        ])
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.observe(value)
+        self.assertEqual(histogram.samples(), [
+            'latency_seconds_bucket{le="0.1"} 1',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 4.05",
+            "latency_seconds_count 4",
+        ])
+
+    def test_bucket_bounds_are_inclusive(self):
+        histogram = self.registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        histogram.observe(1)
+        self.assertIn('latency_seconds_bucket{le="1"} 1', histogram.samples())
+
+    def test_render_has_help_and_type(self):
+        self.registry.counter("jobs_total", "Jobs run").inc()
+        self.assertEqual(self.registry.render(),
+                         "# HELP jobs_total Jobs run\n# TYPE jobs_total counter\njobs_total 1\n")
+
+    def test_dependency_errors_by_status_or_exception(self):
+        jira = DependencyMetrics(self.registry, "jira", "Jira API", ("endpoint", "method"))
+        labels = ("search", "GET")
+        jira.observe(labels, 0.2, status=200, sent=10, received=300)
+        jira.observe(labels, 0.1, status=404)
+        jira.observe(labels, 5.0, error=TimeoutError())
+        self.assertEqual(jira.requests.value(labels + ("200",)), 1)
+        self.assertEqual(jira.requests.value(labels + ("error",)), 1)
+        self.assertEqual(jira.errors.value(labels + ("404",)), 1)
+        self.assertEqual(jira.errors.value(labels + ("TimeoutError",)), 1)
+        self.assertEqual(jira.errors.value(labels + ("200",)), 0)
+        self.assertEqual(jira.received.value(labels), 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from prompt_packer import PromptPacker, estimate_tokens, ticket_row, truncate
+
+
+def row(key, summary, **extra):
+    return dict({"key": key, "summary": summary}, **extra)
+
+
+class PromptPackerTest(unittest.TestCase):
+
+    def test_everything_fits_a_large_budget(self):
+        rows = [row("WEB-1", "Login fails", status="Open"), row("WEB-2", "Slow search", status="Done")]
+        text, stats = PromptPacker(budget_tokens=1000).pack(rows)
+        self.assertEqual(text.splitlines(), ["key|summary|status", "WEB-1|Login fails|Open", "WEB-2|Slow search|Done"])
+        self.assertEqual(stats["tickets_included"], 2)
+        self.assertEqual(stats["tickets_dropped"], 0)
+
+    def test_stays_within_the_budget(self):
+        rows = [row(f"WEB-{n}", f"Ticket number {n} with a fairly long summary") for n in range(50)]
+        text, stats = PromptPacker(budget_tokens=200).pack(rows, reserved_tokens=50)
+        self.assertGreater(stats["tickets_dropped"], 0)
+        self.assertLessEqual(stats["tokens_used"], 200)
+        self.assertEqual(stats["tickets_included"] + stats["tickets_dropped"], 50)
+        self.assertEqual(len(text.splitlines()), stats["tickets_included"] + 1)
+
+    def test_relevant_rows_come_first(self):
+        rows = [row("WEB-1", "Update footer"), row("WEB-2", "Payment gateway timeout"), row("WEB-3", "Typo")]
+        text, _ = PromptPacker(budget_tokens=1000).pack(rows, request="show payment tickets")
+        self.assertTrue(text.splitlines()[1].startswith("WEB-2|"))
+        # Ties keep Jira's order
+        self.assertEqual([line.split("|")[0] for line in text.splitlines()[2:]], ["WEB-1", "WEB-3"])
+
+    def test_a_shorter_row_still_fits_after_a_long_one(self):
+        rows = [row("WEB-1", "word " * 100), row("WEB-2", "short")]
+        text, stats = PromptPacker(budget_tokens=30, max_field_chars=1000).pack(rows)
+        self.assertEqual(stats["tickets_included"], 1)
+        self.assertIn("WEB-2", text)
+
+    def test_long_values_and_separators_are_cleaned(self):
+        text, _ = PromptPacker(budget_tokens=1000, max_field_chars=10).pack([row("WEB-1", "a|b\nc " * 10)])
+        line = text.splitlines()[1]
+        self.assertEqual(line.count("|"), 1)
+        self.assertTrue(line.endswith("…"))
+
+    def test_nothing_fits(self):
+        text, stats = PromptPacker(budget_tokens=5).pack([row("WEB-1", "Login fails")], reserved_tokens=5)
+        self.assertEqual(text, "")
+        self.assertEqual(stats["tickets_dropped"], 1)
+
+
+class HelpersTest(unittest.TestCase):
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("hello world"), 4)
+        self.assertEqual(estimate_tokens("a, b."), 4)
+
+    def test_truncate(self):
+        self.assertEqual(truncate("short", 10), "short")
+        self.assertEqual(truncate("a long value", 7), "a long…")
+
+    def test_ticket_row_drops_empty_columns(self):
+        issue = {"key": "WEB-1", "fields": {
+            "summary": "Login fails", "status": {"name": "Open"}, "assignee": None,
+            "created": "2024-03-01T10:00:00.000+0000"
+        }}
+        self.assertEqual(ticket_row(issue),
+                         {"key": "WEB-1", "summary": "Login fails", "status": "Open", "created": "2024-03-01"})
+
+
+if __name__ == "__main__":
+    unittest.main()
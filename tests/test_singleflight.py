@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+import unittest
+from singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        group = SingleFlight("test")
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return {"value": 42}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(group.do("key", slow))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        # Let every follower join the leader's call before it finishes
+        while group.stats()["calls"] < 5:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"value": 42}] * 5)
+        self.assertEqual(group.stats()["coalesced"], 4)
+        self.assertEqual(group.stats()["in_flight"], 0)
+
+    def test_errors_reach_every_waiter(self):
+        group = SingleFlight("test")
+        release = threading.Event()
+
+        def failing():
+            release.wait(5)
+            raise ValueError("boom")
+
+        errors = []
+
+        def call():
+            try:
+                group.do("key", failing)
+            except ValueError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while group.stats()["calls"] < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(errors, ["boom"] * 3)
+        self.assertEqual(group.stats()["executed"], 1)
+
+    def test_nothing_is_kept_after_the_call(self):
+        group = SingleFlight("test")
+        self.assertEqual(group.do("key", lambda: 1), 1)
+        self.assertEqual(group.do("key", lambda: 2), 2)
+        self.assertEqual(group.stats()["executed"], 2)
+
+    def test_async_calls_share_one_task(self):
+        group = SingleFlight("test")
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(*(group.do_async("key", fetch) for _ in range(4)))
+
+        self.assertEqual(asyncio.run(main()), ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_async_errors_reach_every_waiter(self):
+        group = SingleFlight("test")
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def main():
+            return await asyncio.gather(*(group.do_async("key", failing) for _ in range(3)),
+                                        return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertEqual([str(result) for result in results], ["boom"] * 3)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(group.stats()["executed"], 1)
+
+    def test_cancelled_waiter_does_not_cancel_the_call(self):
+        group = SingleFlight("test")
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def main():
+            impatient = asyncio.ensure_future(group.do_async("key", fetch))
+            patient = asyncio.ensure_future(group.do_async("key", fetch))
+            await asyncio.sleep(0.01)
+            impatient.cancel()
+            return await patient
+
+        self.assertEqual(asyncio.run(main()), "result")
+
+
+if __name__ == "__main__":
+    unittest.main()
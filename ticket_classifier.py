@@ -0,0 +1,312 @@
+"""Local ticket categorizer trained on the LLM's own labels.
+
+Every category the LLM assigns is stored with the hashed unigram and bigram
+counts of the ticket, never its text, so classifier.db holds nothing a
+reader could turn back into a summary or description. Once enough examples
+exist, a multinomial naive Bayes model over those counts is trained from them (in a background thread, and again whenever
+enough new labels arrived). categorize_ticket asks it first: a prediction
+whose posterior clears the threshold is returned directly, anything else
+goes to the LLM, whose answer becomes a new training example.
+
+A fifth of the examples are held out at training time to measure how often
+confident predictions agree with the LLM; the model is only used when that
+agreement is high enough. Live agreement is tracked as well, by comparing
+the model's guess with the LLM label whenever the LLM is asked anyway and
+by auditing a small share of confident answers against the LLM.
+"""
+import os
+import re
+import json
+import math
+import time
+import zlib
+import random
+import sqlite3
+import hashlib
+import threading
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+HASH_BUCKETS = 1 << 18
+MAX_TEXT_CHARS = 2000
+
+EXAMPLES_TABLE = """
+    CREATE TABLE IF NOT EXISTS examples (
+        text_hash TEXT PRIMARY KEY,
+        features TEXT,
+        label TEXT,
+        labelled_at REAL
+    )
+"""
+
+
+def ticket_text(ticket_data):
+    """The text the classifier sees: summary and description."""
+    return f"{ticket_data.get('summary') or ''}\n{ticket_data.get('description') or ''}"[:MAX_TEXT_CHARS]
+
+
+def features(text):
+    """Hashed unigram and bigram counts of text, as {bucket: count}."""
+    words = TOKEN_PATTERN.findall(text.lower())
+    counts = {}
+    for term in words + [f"{first} {second}" for first, second in zip(words, words[1:])]:
+        bucket = zlib.crc32(term.encode()) % HASH_BUCKETS
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def _dump_features(counts):
+    return json.dumps(counts, separators=(",", ":"))
+
+
+def _load_features(value):
+    return {int(bucket): count for bucket, count in json.loads(value).items()}
+
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes with Laplace smoothing over sparse hashed features.
+
+    Trained on (features, label) pairs, where features is a features() dict.
+    """
+
+    def __init__(self, examples, alpha=1.0):
+        self.alpha = alpha
+        class_docs = {}
+        class_counts = {}
+        class_totals = {}
+        vocabulary = set()
+        for example, label in examples:
+            class_docs[label] = class_docs.get(label, 0) + 1
+            counts = class_counts.setdefault(label, {})
+            for bucket, count in example.items():
+                counts[bucket] = counts.get(bucket, 0) + count
+                class_totals[label] = class_totals.get(label, 0) + count
+                vocabulary.add(bucket)
+
+        total_docs = sum(class_docs.values())
+        size = max(1, len(vocabulary))
+        self.labels = sorted(class_docs)
+        self.log_priors = {label: math.log(class_docs[label] / total_docs) for label in self.labels}
+        # log P(feature | class) for seen features, and the value for unseen ones
+        self.log_unseen = {label: math.log(alpha / (class_totals.get(label, 0) + alpha * size))
+                           for label in self.labels}
+        self.log_likelihoods = {
+            label: {bucket: math.log((count + alpha) / (class_totals[label] + alpha * size))
+                    for bucket, count in class_counts[label].items()}
+            for label in self.labels
+        }
+
+    def predict(self, text):
+        """Return (label, posterior probability) for text."""
+        return self.predict_features(features(text))
+
+    def predict_features(self, counts):
+        """Return (label, posterior probability) for a features() dict."""
+        scores = {}
+        for label in self.labels:
+            likelihoods = self.log_likelihoods[label]
+            unseen = self.log_unseen[label]
+            scores[label] = self.log_priors[label] + sum(
+                count * likelihoods.get(bucket, unseen) for bucket, count in counts.items()
+            )
+        best = max(scores, key=scores.get)
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / total
+
+
+class TicketClassifier:
+    """Stored LLM labels, the model trained on them and its agreement statistics."""
+
+    def __init__(self, path=None, threshold=None, min_examples=None, retrain_every=None,
+                 min_agreement=None, audit_rate=None):
+        if path is None:
+            path = os.getenv("CLASSIFIER_DB_PATH", "classifier.db")
+        if threshold is None:
+            threshold = float(os.getenv("CLASSIFIER_THRESHOLD", "0.9"))
+        if min_examples is None:
+            min_examples = int(os.getenv("CLASSIFIER_MIN_EXAMPLES", "1000"))
+        if retrain_every is None:
+            retrain_every = int(os.getenv("CLASSIFIER_RETRAIN_EVERY", "200"))
+        if min_agreement is None:
+            min_agreement = float(os.getenv("CLASSIFIER_MIN_AGREEMENT", "0.9"))
+        if audit_rate is None:
+            audit_rate = float(os.getenv("CLASSIFIER_AUDIT_RATE", "0.02"))
+        self.path = path
+        self.threshold = threshold
+        self.min_examples = min_examples
+        self.retrain_every = retrain_every
+        self.min_agreement = min_agreement
+        self.audit_rate = audit_rate
+
+        self.model = None
+        self.enabled = False
+        self.holdout = None
+        self.trained_on = 0
+        self.trained_at = None
+        self.answered = 0
+        self.deferred = 0
+        self.audited = 0
+        self.audit_agreed = 0
+        self.compared = 0
+        self.compared_agreed = 0
+        self._since_training = 0
+        self._training = False
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(examples)")]
+        if "text" in columns:
+            self._drop_stored_text()
+        self._db.execute(EXAMPLES_TABLE)
+        self._db.commit()
+        self._maybe_train(force=True)
+
+    def _drop_stored_text(self):
+        """Replace the ticket text older versions stored with its features."""
+        rows = self._db.execute("SELECT text_hash, text, label, labelled_at FROM examples").fetchall()
+        self._db.execute("DROP TABLE examples")
+        self._db.execute(EXAMPLES_TABLE)
+        self._db.executemany(
+            "INSERT INTO examples VALUES (?, ?, ?, ?)",
+            [(text_hash, _dump_features(features(text or "")), label, labelled_at)
+             for text_hash, text, label, labelled_at in rows]
+        )
+        self._db.commit()
+        # Rewrite the file so the dropped text does not linger in free pages
+        self._db.execute("VACUUM")
+        logger.info(f"Replaced the stored text of {len(rows)} classifier examples with their features")
+
+    def _count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM examples").fetchone()[0]
+
+    def classify(self, ticket_data):
+        """The model's label for a ticket when it is confident enough, else None.
+
+        A share of confident answers (``audit_rate``) also returns None, so
+        the caller asks the LLM and the answer is checked by ``record``.
+        """
+        model = self.model
+        if model is None or not self.enabled:
+            return None
+        label, probability = model.predict(ticket_text(ticket_data))
+        if probability < self.threshold or random.random() < self.audit_rate:
+            with self._lock:
+                self.deferred += 1
+            return None
+        with self._lock:
+            self.answered += 1
+        return label
+
+    def record(self, ticket_data, label):
+        """Store a label the LLM assigned and compare it with the model's guess."""
+        text = ticket_text(ticket_data)
+        if not text.strip():
+            return
+        counts = features(text)
+        model = self.model
+        if model is not None:
+            guess, probability = model.predict_features(counts)
+            with self._lock:
+                self.compared += 1
+                self.compared_agreed += guess == label
+                if self.enabled and probability >= self.threshold:
+                    # A confident answer sent to the LLM anyway: an audit
+                    self.audited += 1
+                    self.audit_agreed += guess == label
+
+        text_hash = hashlib.sha1(text.encode()).hexdigest()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO examples VALUES (?, ?, ?, ?)",
+                             (text_hash, _dump_features(counts), label, time.time()))
+            self._db.commit()
+            self._since_training += 1
+        self._maybe_train()
+
+    def _maybe_train(self, force=False):
+        with self._lock:
+            if self._training or (not force and self._since_training < self.retrain_every):
+                return
+            self._training = True
+        threading.Thread(target=self._train, name="classifier-train", daemon=True).start()
+
+    def _train(self):
+        try:
+            with self._lock:
+                rows = self._db.execute("SELECT features, label FROM examples").fetchall()
+                self._since_training = 0
+            examples = [(_load_features(value), label) for value, label in rows]
+            if len(examples) < self.min_examples:
+                logger.debug(f"Classifier has {len(examples)} of {self.min_examples} examples, not training")
+                return
+
+            started = time.time()
+            random.Random(len(examples)).shuffle(examples)
+            cut = len(examples) // 5
+            held_out, training = examples[:cut], examples[cut:]
+            holdout = self._evaluate(NaiveBayesModel(training), held_out)
+            model = NaiveBayesModel(examples)
+
+            with self._lock:
+                self.model = model
+                self.holdout = holdout
+                self.trained_on = len(examples)
+                self.trained_at = time.time()
+                self.enabled = holdout["confident_agreement"] >= self.min_agreement
+            logger.info(f"Trained classifier on {len(examples)} labels in {time.time() - started:.1f}s: "
+                        f"{holdout}, {'enabled' if self.enabled else 'disabled'}")
+        except Exception as e:
+            logger.error(f"Classifier training failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._training = False
+
+    def _evaluate(self, model, examples):
+        """Agreement of the model with held-out LLM labels, overall and when confident."""
+        agreed = confident = confident_agreed = 0
+        for counts, label in examples:
+            guess, probability = model.predict_features(counts)
+            agreed += guess == label
+            if probability >= self.threshold:
+                confident += 1
+                confident_agreed += guess == label
+        total = max(1, len(examples))
+        return {
+            "examples": len(examples),
+            "agreement": round(agreed / total, 3),
+            "confident_agreement": round(confident_agreed / confident, 3) if confident else 0.0,
+            "coverage": round(confident / total, 3)
+        }
+
+    def stats(self):
+        examples = self._count()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "examples": examples,
+                "trained_on": self.trained_on,
+                "threshold": self.threshold,
+                "holdout": self.holdout,
+                "answered": self.answered,
+                "deferred": self.deferred,
+                "audit_agreement": round(self.audit_agreed / self.audited, 3) if self.audited else None,
+                "llm_agreement": round(self.compared_agreed / self.compared, 3) if self.compared else None
+            }
+
+
+# Shared by all categorization paths of this worker
+_ticket_classifier = None
+_ticket_classifier_lock = threading.Lock()
+
+
+def get_ticket_classifier():
+    """Get the worker-wide ticket classifier."""
+    global _ticket_classifier
+    if _ticket_classifier is None:
+        with _ticket_classifier_lock:
+            if _ticket_classifier is None:
+                _ticket_classifier = TicketClassifier()
+    return _ticket_classifier
@@ -0,0 +1,190 @@
+"""In-memory full-text index over Jira tickets, ranked with BM25.
+
+One index is kept per Jira instance and credential. With the ticket mirror
+enabled it is loaded from the mirror the first time it is searched and then
+updated incrementally as the mirror syncs, so chat retrieval never has to
+query Jira. Without the mirror it holds the tickets the app fetched anyway
+(project pages, query results), up to CHAT_INDEX_MAX_TICKETS, and forgets
+the least recently fetched ones first.
+"""
+import os
+import math
+import heapq
+import threading
+import logging
+from collections import Counter
+from jira_client import trim_issue
+from jira_cache import credential_scope
+from prompt_packer import WORD_PATTERN, IGNORED_TERMS
+from ticket_mirror import get_ticket_mirror
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# What a search hit carries back for the prompt
+STORED_FIELDS = ["summary", "status", "priority", "assignee", "updated"]
+
+
+def tokenize(text):
+    """Lower-cased terms of text, without words that carry no meaning for search."""
+    return [term for term in WORD_PATTERN.findall((text or "").lower()) if term not in IGNORED_TERMS]
+
+
+def issue_text(issue):
+    """The searchable text of an issue: key, summary, description and comments."""
+    fields = issue.get("fields") or {}
+    parts = [issue.get("key") or "", fields.get("summary") or "", fields.get("description") or ""]
+    comment = fields.get("comment") or {}
+    for entry in comment.get("comments") or []:
+        parts.append(entry.get("body") or "")
+    return "\n".join(part for part in parts if isinstance(part, str))
+
+
+class TicketIndex:
+    """Inverted index of ticket text with Okapi BM25 ranking.
+
+    Documents are replaced when an issue is added again, so the index can
+    be fed every page a sync fetches. With ``max_documents`` the documents
+    added longest ago are dropped once the index grows past it.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, max_documents=None):
+        self.k1 = k1
+        self.b = b
+        self.max_documents = max_documents
+        self._postings = {}
+        self._terms = {}
+        self._lengths = {}
+        self._docs = {}
+        self._total_length = 0
+        self.searches = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, issues):
+        """Index (or re-index) issues; older versions than the indexed one are ignored."""
+        for issue in issues:
+            key = issue.get("key")
+            if not key:
+                continue
+            updated = (issue.get("fields") or {}).get("updated") or ""
+            terms = Counter(tokenize(issue_text(issue)))
+            with self._lock:
+                current = self._docs.get(key)
+                if current is not None and (current["fields"].get("updated") or "") > updated:
+                    continue
+                self._remove(key)
+                for term, count in terms.items():
+                    self._postings.setdefault(term, {})[key] = count
+                self._terms[key] = list(terms)
+                length = sum(terms.values())
+                self._lengths[key] = length
+                self._total_length += length
+                self._docs[key] = trim_issue(issue, STORED_FIELDS)
+                if self.max_documents is not None and len(self._docs) > self.max_documents:
+                    # Dicts keep insertion order and re-added keys move to the end
+                    self._remove(next(iter(self._docs)))
+
+    def remove(self, keys):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def _remove(self, key):
+        if key not in self._docs:
+            return
+        del self._docs[key]
+        self._total_length -= self._lengths.pop(key)
+        for term in self._terms.pop(key):
+            docs = self._postings[term]
+            del docs[key]
+            if not docs:
+                del self._postings[term]
+
+    def search(self, query, k=5):
+        """The k best-matching issues for the query, best first, as [(issue, score)]."""
+        terms = set(tokenize(query))
+        with self._lock:
+            self.searches += 1
+            count = len(self._docs)
+            if not terms or not count:
+                return []
+            average_length = self._total_length / count
+            scores = {}
+            for term in terms:
+                docs = self._postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for key, frequency in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[key] / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+            best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self._docs[key], round(score, 3)) for key, score in best]
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._docs), "terms": len(self._postings), "searches": self.searches}
+
+
+# One index per (Jira instance, credential scope), shared by this worker
+_indexes = {}
+_indexes_lock = threading.Lock()
+_subscribed = False
+
+
+def _on_mirror_sync(jira_url, scope, issues, removed_keys):
+    index = _indexes.get((jira_url, scope))
+    if index is None:
+        return
+    index.add(issues)
+    index.remove(removed_keys)
+
+
+def get_ticket_index(jira_url, pat, mirrored=True):
+    """Get the search index of this instance and credential.
+
+    ``mirrored`` says whether the ticket mirror is enabled: if so the index
+    holds every mirrored ticket, otherwise it starts empty and is filled by
+    add_fetched.
+    """
+    global _subscribed
+    target = (jira_url, credential_scope(pat))
+    index = _indexes.get(target)
+    if index is not None:
+        return index
+    with _indexes_lock:
+        if target not in _indexes:
+            if not mirrored:
+                _indexes[target] = TicketIndex(max_documents=int(os.getenv("CHAT_INDEX_MAX_TICKETS", "20000")))
+                return _indexes[target]
+            mirror = get_ticket_mirror()
+            if not _subscribed:
+                mirror.subscribe(_on_mirror_sync)
+                _subscribed = True
+            index = TicketIndex()
+            # Subscribed before loading, so no sync in between is missed
+            _indexes[target] = index
+            index.add(mirror.scan(jira_url, pat))
+            logger.info(f"Loaded {len(index)} mirrored tickets into the search index for {jira_url}")
+        return _indexes[target]
+
+
+def add_fetched(jira_url, pat, issues):
+    """Index tickets fetched from Jira; only for use while the ticket mirror is disabled."""
+    if issues:
+        get_ticket_index(jira_url, pat, mirrored=False).add(issues)
+
+
+def index_stats():
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    stats = [index.stats() for index in indexes]
+    return {
+        "indexes": len(stats),
+        "documents": sum(s["documents"] for s in stats),
+        "terms": sum(s["terms"] for s in stats),
+        "searches": sum(s["searches"] for s in stats)
+    }
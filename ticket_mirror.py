@@ -0,0 +1,367 @@
+"""Local SQLite mirror of Jira issues.
+
+Each (Jira instance, credential, project) is populated once by paging
+through the project and then kept fresh by delta syncs that only fetch
+issues with ``updated >= -Nm``. Readers pass an explicit staleness bound:
+a mirror older than that is delta-synced before answering, and a project
+that has never been mirrored returns None while the first full sync runs
+in the background, so callers can fall back to a live query.
+
+Mirrors are scoped by credential as well as instance, because two PATs
+on the same Jira may be allowed to see different issues.
+"""
+import os
+import time
+import json
+import math
+import sqlite3
+import threading
+import logging
+from jira_client import get_jira_client, trim_issue
+from jira_cache import credential_scope
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Superset of the fields the views, the chat context, the search index and the stats need
+MIRROR_FIELDS = [
+    "summary", "description", "status", "priority", "issuetype", "assignee", "reporter",
+    "created", "updated", "resolutiondate", "comment",
+]
+
+
+class TicketMirror:
+    """SQLite copy of the issues of recently viewed projects."""
+
+    def __init__(self, path=None, sync_interval=None, full_sync_interval=None, idle_timeout=None):
+        if path is None:
+            path = os.getenv("MIRROR_DB_PATH", "ticket_mirror.db")
+        if sync_interval is None:
+            sync_interval = float(os.getenv("MIRROR_SYNC_INTERVAL", "120"))
+        if full_sync_interval is None:
+            full_sync_interval = float(os.getenv("MIRROR_FULL_SYNC_INTERVAL", "86400"))
+        if idle_timeout is None:
+            idle_timeout = float(os.getenv("MIRROR_IDLE_TIMEOUT", "3600"))
+        self.path = path
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+        self.idle_timeout = idle_timeout
+
+        self.reads = 0
+        self.fallbacks = 0
+        self.full_syncs = 0
+        self.delta_syncs = 0
+        self.sync_errors = 0
+
+        self._lock = threading.Lock()
+        self._sync_locks = {}
+        self._targets = {}
+        self._populating = set()
+        self._populate_slots = threading.BoundedSemaphore(int(os.getenv("MIRROR_POPULATE_CONCURRENCY", "2")))
+        self._listeners = []
+        self._syncer = None
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS issues (
+                jira_url TEXT,
+                scope TEXT,
+                project_key TEXT,
+                issue_key TEXT,
+                created TEXT,
+                updated TEXT,
+                issue TEXT,
+                PRIMARY KEY (jira_url, scope, issue_key)
+            );
+            CREATE INDEX IF NOT EXISTS issues_project ON issues (jira_url, scope, project_key, created);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                jira_url TEXT,
+                scope TEXT,
+                project_key TEXT,
+                last_sync REAL,
+                last_full_sync REAL,
+                PRIMARY KEY (jira_url, scope, project_key)
+            );
+        """)
+        self._db.commit()
+
+    def subscribe(self, listener):
+        """Call ``listener(jira_url, scope, issues, removed_keys)`` whenever a sync changes the mirror."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _notify(self, jira_url, scope, issues, removed_keys):
+        for listener in list(self._listeners):
+            try:
+                listener(jira_url, scope, issues, removed_keys)
+            except Exception as e:
+                logger.error(f"Mirror listener failed: {str(e)}")
+
+    def _sync_lock(self, target):
+        with self._lock:
+            return self._sync_locks.setdefault(target, threading.Lock())
+
+    def _state(self, jira_url, scope, project_key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT last_sync, last_full_sync FROM sync_state WHERE jira_url = ? AND scope = ? AND project_key = ?",
+                (jira_url, scope, project_key)
+            ).fetchone()
+        return {"last_sync": row[0], "last_full_sync": row[1]} if row else None
+
+    def last_synced(self, jira_url, pat, project_key):
+        """When the project was last synced (epoch seconds), or None if never."""
+        state = self._state(jira_url, credential_scope(pat), project_key)
+        return state["last_sync"] if state else None
+
+    def sync(self, jira_url, pat, project_key, full=False):
+        """Bring the mirror of one project up to date and return what was done.
+
+        The first sync, and one every ``full_sync_interval``, pages through
+        the whole project (and drops issues that no longer match); the rest
+        only fetch issues updated since the previous sync.
+        """
+        scope = credential_scope(pat)
+        target = (jira_url, scope, project_key)
+        with self._sync_lock(target):
+            state = self._state(jira_url, scope, project_key)
+            started = time.time()
+            full = full or state is None or started - state["last_full_sync"] >= self.full_sync_interval
+            if full:
+                jql = f'project = "{project_key}" ORDER BY created ASC'
+            else:
+                # Relative minutes avoid any server/user timezone mismatch; one
+                # extra minute covers JQL's minute granularity
+                minutes = math.ceil((started - state["last_sync"]) / 60) + 1
+                jql = f'project = "{project_key}" AND updated >= -{minutes}m ORDER BY updated ASC'
+
+            pager = get_jira_client(jira_url).iter_search(pat, jql, page_size=100, fields=MIRROR_FIELDS)
+            seen = []
+            page = []
+            try:
+                for issue in pager:
+                    page.append(issue)
+                    if len(page) >= 100:
+                        seen.extend(self._upsert(jira_url, scope, project_key, page))
+                        page = []
+                seen.extend(self._upsert(jira_url, scope, project_key, page))
+            except Exception:
+                with self._lock:
+                    self.sync_errors += 1
+                raise
+
+            removed = []
+            with self._lock:
+                if full:
+                    # Anything not returned by a full sync was deleted or moved
+                    seen_keys = set(seen)
+                    removed = [row[0] for row in self._db.execute(
+                        "SELECT issue_key FROM issues WHERE jira_url = ? AND scope = ? AND project_key = ?",
+                        (jira_url, scope, project_key)
+                    ) if row[0] not in seen_keys]
+                    self._db.executemany(
+                        "DELETE FROM issues WHERE jira_url = ? AND scope = ? AND issue_key = ?",
+                        [(jira_url, scope, key) for key in removed]
+                    )
+                    self.full_syncs += 1
+                else:
+                    self.delta_syncs += 1
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?)",
+                    (jira_url, scope, project_key, started,
+                     started if full else state["last_full_sync"])
+                )
+                self._db.commit()
+            if removed:
+                self._notify(jira_url, scope, [], removed)
+
+        result = {
+            "mode": "full" if full else "delta",
+            "fetched": len(seen),
+            "deleted": len(removed),
+            "seconds": round(time.time() - started, 3)
+        }
+        logger.info(f"Mirror sync of {project_key} on {jira_url}: {result}")
+        return result
+
+    def _upsert(self, jira_url, scope, project_key, issues):
+        if not issues:
+            return []
+        rows = [
+            (jira_url, scope, project_key, issue["key"], issue["fields"].get("created"),
+             issue["fields"].get("updated"), json.dumps(issue))
+            for issue in issues
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+        self._notify(jira_url, scope, issues, [])
+        return [issue["key"] for issue in issues]
+
+    def read(self, jira_url, pat, project_key, max_staleness, limit=None, fields=None):
+        """Read a project's issues, newest first, no older than ``max_staleness`` seconds.
+
+        Returns {"issues", "total", "synced_at"}, or None when the project
+        has not been mirrored yet or could not be brought within the bound;
+        the caller should then query Jira directly.
+        """
+        scope = credential_scope(pat)
+        state = self._fresh_state(jira_url, pat, project_key, max_staleness)
+        if state is None:
+            return None
+
+        with self._lock:
+            total = self._db.execute(
+                "SELECT COUNT(*) FROM issues WHERE jira_url = ? AND scope = ? AND project_key = ?",
+                (jira_url, scope, project_key)
+            ).fetchone()[0]
+            rows = self._db.execute(
+                "SELECT issue FROM issues WHERE jira_url = ? AND scope = ? AND project_key = ? "
+                "ORDER BY created DESC LIMIT ?",
+                (jira_url, scope, project_key, -1 if limit is None else limit)
+            ).fetchall()
+            self.reads += 1
+
+        issues = [json.loads(row[0]) for row in rows]
+        if fields is not None:
+            issues = [trim_issue(issue, fields) for issue in issues]
+        return {"issues": issues, "total": total, "synced_at": state["last_sync"]}
+
+    def read_columns(self, jira_url, pat, project_key, max_staleness, paths):
+        """Read selected JSON paths of every issue of a project, with the same staleness rules as read().
+
+        ``paths`` are SQLite JSON paths such as "$.fields.status.name"; the
+        values are extracted by SQLite, so no issue is decoded in Python.
+        Returns {"rows": [tuple, ...], "synced_at"} or None.
+        """
+        scope = credential_scope(pat)
+        state = self._fresh_state(jira_url, pat, project_key, max_staleness)
+        if state is None:
+            return None
+
+        columns = ", ".join("json_extract(issue, ?)" for _ in paths)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {columns} FROM issues WHERE jira_url = ? AND scope = ? AND project_key = ?",
+                list(paths) + [jira_url, scope, project_key]
+            ).fetchall()
+            self.reads += 1
+        return {"rows": rows, "synced_at": state["last_sync"]}
+
+    def _fresh_state(self, jira_url, pat, project_key, max_staleness):
+        """Sync state of a project no older than max_staleness, or None if it cannot be had."""
+        scope = credential_scope(pat)
+        self._register(jira_url, pat, project_key)
+        state = self._state(jira_url, scope, project_key)
+        if state is None:
+            self._populate_in_background(jira_url, pat, project_key)
+            with self._lock:
+                self.fallbacks += 1
+            return None
+
+        if time.time() - state["last_sync"] > max_staleness:
+            try:
+                self.sync(jira_url, pat, project_key)
+            except Exception as e:
+                logger.warning(f"Mirror sync of {project_key} failed: {str(e)}")
+                with self._lock:
+                    self.fallbacks += 1
+                return None
+            state = self._state(jira_url, scope, project_key)
+        return state
+
+    def scan(self, jira_url, pat):
+        """Every mirrored issue this credential can see on the instance, across projects."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT issue FROM issues WHERE jira_url = ? AND scope = ?",
+                (jira_url, credential_scope(pat))
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def track(self, jira_url, pat, project_keys):
+        """Keep these projects mirrored, starting a background first sync for new ones."""
+        scope = credential_scope(pat)
+        for project_key in project_keys:
+            self._register(jira_url, pat, project_key)
+            if self._state(jira_url, scope, project_key) is None:
+                self._populate_in_background(jira_url, pat, project_key)
+
+    def _populate_in_background(self, jira_url, pat, project_key):
+        target = (jira_url, credential_scope(pat), project_key)
+        with self._lock:
+            if target in self._populating:
+                return
+            self._populating.add(target)
+
+        def populate():
+            try:
+                # Tracking many projects at once must not flood Jira with full syncs
+                with self._populate_slots:
+                    self.sync(jira_url, pat, project_key, full=True)
+            except Exception as e:
+                logger.warning(f"Initial mirror sync of {project_key} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._populating.discard(target)
+
+        threading.Thread(target=populate, name=f"mirror-{project_key}", daemon=True).start()
+
+    def _register(self, jira_url, pat, project_key):
+        """Remember a project as recently read so the background syncer keeps it fresh."""
+        with self._lock:
+            self._targets[(jira_url, credential_scope(pat), project_key)] = (pat, time.time())
+            if self._syncer is None and self.sync_interval > 0:
+                self._syncer = threading.Thread(target=self._sync_loop, name="mirror-sync", daemon=True)
+                self._syncer.start()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.sync_interval)
+            now = time.time()
+            with self._lock:
+                targets = list(self._targets.items())
+            for (jira_url, scope, project_key), (pat, last_read) in targets:
+                if now - last_read > self.idle_timeout:
+                    # Nobody has looked at it for a while; stop syncing it
+                    with self._lock:
+                        self._targets.pop((jira_url, scope, project_key), None)
+                    continue
+                state = self._state(jira_url, scope, project_key)
+                if state is None or now - state["last_sync"] < self.sync_interval:
+                    continue
+                try:
+                    self.sync(jira_url, pat, project_key)
+                except Exception as e:
+                    logger.warning(f"Background mirror sync of {project_key} failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            projects, issues = self._db.execute(
+                "SELECT (SELECT COUNT(*) FROM sync_state), (SELECT COUNT(*) FROM issues)"
+            ).fetchone()
+            return {
+                "projects": projects,
+                "issues": issues,
+                "reads": self.reads,
+                "fallbacks": self.fallbacks,
+                "full_syncs": self.full_syncs,
+                "delta_syncs": self.delta_syncs,
+                "sync_errors": self.sync_errors,
+                "actively_synced": len(self._targets)
+            }
+
+
+# Shared by the web routes of this worker
+_ticket_mirror = None
+_ticket_mirror_lock = threading.Lock()
+
+
+def get_ticket_mirror():
+    """Get the worker-wide ticket mirror."""
+    global _ticket_mirror
+    if _ticket_mirror is None:
+        with _ticket_mirror_lock:
+            if _ticket_mirror is None:
+                _ticket_mirror = TicketMirror()
+    return _ticket_mirror